@@ -5,52 +5,179 @@
 ################################################################
 ############################ START #############################
 ################################################################
-from pyjdg import *
-
-def assign_material():
-    Properties.Material.Add(
-        "Structural_Steel",
-        [Density([(DENSITY, 7.85e-09)]),
-        Elastic([(YOUNGS_MODULUS, 200000.0),
-                (POISSONS_RATIO, 0.3)])],
-        iMaterialID=1
+import fnmatch
+import os
+try:
+    from pyjdg import *
+except ImportError:
+    # Headless use: only the GUI / PSJ calls need pyjdg
+    pass
+from inp_reader import iter_records
+
+# name: (density, Young's modulus, Poisson's ratio)
+MATERIALS = {
+    "Structural_Steel": (7.85e-09, 200000.0, 0.3),
+}
+
+# Properties.Solid settings of each property template
+PROPERTY_TEMPLATES = {
+    "SOLID": {"iCordM": -2, "iFLG": -1},
+}
+
+# (part name pattern, material, template), first match wins
+DEFAULT_RULES = [("*", "Structural_Steel", "SOLID")]
+
+PROPERTY_ID_START = 1000
+PROPERTY_COLOR = 13351846
+PROGRESS_STEP = 500             # per-part mode: parts between progress lines
+
+def read_material_rules(rules_file):
+    """
+    Material mapping table, Abaqus-like keyword blocks:
+
+        *MATERIAL     rows "name, density, young, poisson" (added to MATERIALS)
+        *RULES        rows "part name pattern, material[, template]"
+
+    Patterns use * and ? wildcards and ignore case; patterns starting with
+    '*' are quoted ("*BOLT*") so they are not read as keywords. The first
+    matching rule gives the material of a part, parts matching no rule are
+    skipped.
+    Returns (materials, rules).
+    """
+    materials = dict(MATERIALS)
+    rules = []
+    for keyword, params, fields in iter_records(rules_file):
+        if fields is None:
+            if keyword not in ('MATERIAL', 'RULES'):
+                raise ValueError(f"Unknown keyword *{keyword} in {rules_file} "
+                                 "(quote patterns starting with '*')")
+            continue
+        if keyword == 'MATERIAL' and len(fields) >= 4:
+            materials[fields[0]] = tuple(float(v) for v in fields[1:4])
+        elif keyword == 'RULES' and len(fields) >= 2:
+            template = fields[2].upper() if len(fields) > 2 else "SOLID"
+            rules.append((fields[0].strip('"'), fields[1], template))
+        else:
+            raise ValueError(f"Invalid row {fields} in {rules_file}")
+
+    for pattern, material, template in rules:
+        if material not in materials:
+            raise ValueError(f"Unknown material {material} in {rules_file}")
+        if template not in PROPERTY_TEMPLATES:
+            raise ValueError(f"Unknown property template {template} in {rules_file}")
+    return materials, rules
+
+def group_parts(parts, rules):
+    """{(material, template): [part, ...]} and the parts matching no rule."""
+    patterns = [(pattern.upper(), material, template) for pattern, material, template in rules]
+    groups, unmatched = {}, []
+    for part in parts:
+        name = part.name.upper()
+        for pattern, material, template in patterns:
+            if fnmatch.fnmatchcase(name, pattern):
+                groups.setdefault((material, template), []).append(part)
+                break
+        else:
+            unmatched.append(part)
+    return groups, unmatched
+
+def _add_solid(targets, name, property_id, material_id, template):
+    Properties.Solid(
+        crlTargets=targets,
+        strName=name,
+        iPropertyId=property_id,
+        iPropertyColor=PROPERTY_COLOR,
+        crMaterial=Material(material_id),
+        dDynaRemeshVal1=DFLT_DBL,
+        dDynaRemeshVal2=DFLT_DBL,
+        dDispHG=DFLT_DBL,
+        **PROPERTY_TEMPLATES[template]
     )
-    print("Completed: Created material Structural_Steel")
+
+def assign_material(rules_file=None, per_part=False):
+    # Parts are grouped by (material, template): one property per group with
+    # all its parts as targets, instead of one kernel call per part.
+    # per_part=True keeps one property per part (named after the part).
+    if rules_file:
+        materials, rules = read_material_rules(rules_file)
+    else:
+        materials, rules = dict(MATERIALS), DEFAULT_RULES
 
     # Select all part
     all_parts = JPT.GetAllParts()
     print(f"Total parts retrieved: {len(all_parts)}")
+    groups, unmatched = group_parts(all_parts, rules)
 
-    property_id_start = 1000
-    property_color = 13351846
-
-    for idx, part in enumerate(all_parts):
-        Properties.Solid(
-            crlTargets=[Part(part.key)],
-            strName=part.name,  
-            iPropertyId=property_id_start + idx,
-            iPropertyColor=property_color,
-            crMaterial=Material(1),
-            iCordM=-2,
-            dDynaRemeshVal1=DFLT_DBL,
-            dDynaRemeshVal2=DFLT_DBL,
-            dDispHG=DFLT_DBL,
-            iFLG=-1
+    # Only the materials in use are created
+    material_ids = {}
+    for material, _ in groups:
+        if material in material_ids:
+            continue
+        material_ids[material] = len(material_ids) + 1
+        density, young, poisson = materials[material]
+        Properties.Material.Add(
+            material,
+            [Density([(DENSITY, density)]),
+            Elastic([(YOUNGS_MODULUS, young),
+                    (POISSONS_RATIO, poisson)])],
+            iMaterialID=material_ids[material]
         )
-        print(f"Assigned material to Part '{part.name}' (ID: {part.key}) with Property ID {property_id_start + idx}")
+    print(f"Completed: Created {len(material_ids)} material(s): {', '.join(material_ids)}")
+
+    property_id = PROPERTY_ID_START
+    done = 0
+    for (material, template), parts in groups.items():
+        if per_part:
+            for part in parts:
+                _add_solid([Part(part.key)], part.name, property_id,
+                           material_ids[material], template)
+                property_id += 1
+                done += 1
+                if done % PROGRESS_STEP == 0:
+                    print(f"  {done}/{len(all_parts)} parts assigned")
+        else:
+            name = material if template == "SOLID" else f"{material}_{template}"
+            _add_solid([Part(part.key) for part in parts], name, property_id,
+                       material_ids[material], template)
+            property_id += 1
+            done += len(parts)
+        print(f"Assigned {material} ({template}) to {len(parts)} part(s)")
 
-    print("Completed: Assigned material to all visible parts")
+    if unmatched:
+        print(f"Skipped {len(unmatched)} part(s) matching no rule, e.g. "
+              + ", ".join(part.name for part in unmatched[:5]))
+    print(f"Completed: Assigned material to {done} of {len(all_parts)} parts "
+          f"with {property_id - PROPERTY_ID_START} properties")
+    return done, len(unmatched)
 
 def onGetButton1Clicked(dlg):
-    assign_material()
-    JPT.MessageBoxPSJ("Export successful", JPT.MsgBoxType.MB_INFORMATION_YESNOCANCEL)
+    rules_file = dlg.get_item_text(name="Material rules")
+    if not isinstance(rules_file, str) or not rules_file.strip():
+        rules_file = None           # all parts -> Structural_Steel
+    elif not os.path.isfile(rules_file):
+        JPT.MessageBoxPSJ(f"Material rules file not found:\n{rules_file}",
+                          JPT.MsgBoxType.MB_INFORMATION)
+        return
+    # GUI keeps one property per part, named after the part (as before the rules)
+    try:
+        done, skipped = assign_material(rules_file, per_part=True)
+    except ValueError as e:
+        JPT.MessageBoxPSJ(str(e), JPT.MsgBoxType.MB_INFORMATION)
+        return
+    msg = f"Export successful\n{done} parts assigned"
+    if skipped:
+        msg += f", {skipped} parts matched no rule"
+    JPT.MessageBoxPSJ(msg, JPT.MsgBoxType.MB_INFORMATION_YESNOCANCEL)
 
 def main():
     dlg = JDGCreator(title="Auto material", include_apply=False)
     dlg.add_groupbox(name="GroupBox1", text="Auto material assignment", layout="Window")
+    dlg.add_label(name="Label", text="Material rules (optional, default Structural_Steel):",
+                  layout="GroupBox1")
+    dlg.add_browser(layout="GroupBox1", name="Material rules", mode="file")
 
     dlg.generate_window()
     dlg.on_dlg_ok(callfunc=onGetButton1Clicked)
 
 if __name__=='__main__':
-    main()
\ No newline at end of file
+    main()
@@ -3,29 +3,23 @@
 # 23/10/2023
 
 import tkinter as tk
-from pyjdg import *
-
-def check_blank_lines_in_inp(file_path):
-    with open(file_path, 'r') as f:
-        lines = f.readlines()
-
-    blank_lines = [i+1 for i, line in enumerate(lines) if line.strip() == ""]
-    result = ""
-
-    if blank_lines:
-        result += f"🔍 {file_path}\nFound {len(blank_lines)} blank lines at:\n"
-        for line_num in blank_lines:
-            result += f"  - Line {line_num}\n"
-    else:
-        result += f"✅ {file_path}: No blank lines found.\n"
-    
-    return result
-
-def process_files(file_path_list):
-    all_results = ""
-    for file in file_path_list:
-        all_results += check_blank_lines_in_inp(file) + "\n"
-    
+try:
+    from pyjdg import *
+except ImportError:
+    # Headless use (mapping_cli.py): only the GUI callbacks need PSJ
+    pass
+from inp_lint import MAX_LOCATIONS, lint_file, lint_files
+
+def check_blank_lines_in_inp(file_path, max_locations=MAX_LOCATIONS):
+    # Blank lines plus orphan data lines, *FILM rows without a header and
+    # duplicate IDs (inp_lint); only the first locations of each are listed
+    return lint_file(file_path, max_locations).summary() + "\n"
+
+def process_files(file_path_list, jobs=None):
+    # Files are checked side by side on a process pool
+    reports = lint_files(file_path_list, jobs)
+    all_results = "\n\n".join(report.summary() for report in reports)
+
     JPT.MessageBoxPSJ(all_results.strip(), JPT.MsgBoxType.MB_INFORMATION_YESNOCANCEL)
 
 def onGetButton1Clicked(dlg):
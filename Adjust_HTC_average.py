@@ -5,6 +5,7 @@
 ###   1. ID file (Element IDs)
 ###   2. Result file (to be exported)
 ###   3. HTC file (ONLY ONE VALUE, e.g. 1e5)
+###   or a correction table instead of 1. and 3. (see read_corrections)
 ### Output:
 ###   Updated result file
 ##############################################
@@ -13,28 +14,23 @@
 ##############################################
 
 import os
-import re
-from pyjdg import *
+try:
+    from pyjdg import *
+except ImportError:
+    # Headless use (mapping_cli.py): only the GUI callbacks need PSJ
+    pass
+from inp_reader import iter_records, leading_int, read_id_groups
+from inp_reader import read_ids as read_id_list
+from htc_patch import SCALE, SET, Corrections, patch_htc, patch_values
+from line_scan import IdSet
+from perf_trace import phase, traced
 
 
 # ============================================================
 # READ IDS FROM FILE #1
 # ============================================================
 def read_ids(id_file):
-
-    ids = set()
-
-    with open(id_file, 'r') as f:
-        for line in f:
-            line = line.strip()
-            if not line or line.startswith('*') or line.startswith('**'):
-                continue
-            try:
-                ids.add(int(line.split(',')[0]))
-            except:
-                pass
-
-    return ids
+    return set(read_id_list(id_file))
 
 
 # ============================================================
@@ -49,7 +45,7 @@ def read_htc_value(htc_file):
                 continue
             try:
                 return float(line)
-            except:
+            except ValueError:
                 continue
 
     raise ValueError("No valid HTC value found in HTC file")
@@ -58,52 +54,107 @@ def read_htc_value(htc_file):
 # ============================================================
 # UPDATE HTC IN RESULT FILE (SAFE FORMAT)
 # ============================================================
-def update_htc(id_file, result_file, htc_file):
-
-    ids = read_ids(id_file)
-    htc_value = read_htc_value(htc_file)
-
-    base, ext = os.path.splitext(result_file)
-    out_file = base + "_HTC_UPDATED" + ext
-
-    count = 0
+def update_htc(id_file, result_file, htc_file, out_file=None, in_place=False):
+    """
+    Set the HTC (last number) of the lines of the listed IDs to the HTC
+    value, written as %.6e. Fields wide enough are overwritten in place in
+    a copy of the file (or in result_file itself with in_place=True),
+    see htc_patch.
+    """
+    with traced("update-htc", ids=id_file, results=result_file, in_place=in_place) as run:
+        with phase("parse ids") as p:
+            ids = read_ids(id_file)
+            htc_value = read_htc_value(htc_file)
+            p.rows = len(ids)
+
+        if in_place:
+            out_file = result_file
+        elif out_file is None:
+            base, ext = os.path.splitext(result_file)
+            out_file = base + "_HTC_UPDATED" + ext
+
+        # join (ID lookup) and write happen in one streaming pass
+        with phase("patch") as p:
+            count = patch_htc(result_file, IdSet(ids), f"{htc_value:.6e}", out_file)
+            p.rows = run.rows = count
 
-    # Regex:
-    # group(1): element ID
-    # group(2): middle content
-    # group(3): delimiter before HTC
-    # group(4): HTC value (last number)
-    pattern = re.compile(
-        r'^(\s*\d+)(.*?)([,\s]+)([-+0-9.Ee]+)\s*$'
-    )
-
-    with open(result_file, 'r', encoding='utf-8', errors='ignore') as fin, \
-         open(out_file, 'w', encoding='utf-8') as fout:
-
-        for line in fin:
+    return out_file, count
 
-            m = pattern.match(line)
-            if not m:
-                fout.write(line)
-                continue
 
-            try:
-                eid = int(m.group(1))
-            except:
-                fout.write(line)
-                continue
-
-            if eid in ids:
-                new_line = (
-                    m.group(1)
-                    + m.group(2)
-                    + m.group(3)
-                    + f"{htc_value:.6e}\n"
-                )
-                fout.write(new_line)
-                count += 1
-            else:
-                fout.write(line)
+# ============================================================
+# CORRECTION TABLE (ID / GROUP -> HTC / TEMP, SCALE FACTORS)
+# ============================================================
+def read_corrections(table_file):
+    """
+    Correction table, Abaqus-like keyword blocks:
+
+        *GROUPS, INPUT=ports.inp    ID file defining groups (one per *ELSET,
+                                    else the file name), relative to the table
+        *HTC                        rows "ID or group, value" : set HTC
+        *TEMP                       rows "ID or group, value" : set TEMP
+        *HTC, SCALE                 rows "ID or group, factor": scale HTC
+        *TEMP, SCALE                rows "ID or group, factor": scale TEMP
+
+    Rows are applied in file order, as separate runs of the tool would be.
+    """
+    base_dir = os.path.dirname(os.path.abspath(table_file))
+    corrections = Corrections()
+    groups = {}
+    batch = None                        # consecutive ID rows of one block
+
+    def flush():
+        nonlocal batch
+        if batch is not None and batch[2]:
+            corrections.add(*batch)
+        batch = None
+
+    # one row per line: a trailing ',' must not join the next row
+    for keyword, params, fields in iter_records(table_file, join_continuations=False):
+        if fields is None:
+            flush()
+            if keyword == 'GROUPS':
+                target = params.get('INPUT')
+                if not isinstance(target, str) or not target:
+                    raise ValueError(f"*GROUPS needs INPUT=<ID file> in {table_file}")
+                path = os.path.join(base_dir, target.strip('"'))
+                groups.update((name.upper(), ids) for name, ids in read_id_groups([path]))
+            continue
+
+        if keyword not in ('HTC', 'TEMP') or len(fields) < 2:
+            raise ValueError(f"Invalid correction row {fields} in {table_file}")
+        mode = SCALE if 'SCALE' in params else SET
+        value = float(fields[1])
+
+        eid = leading_int(fields[0])
+        if eid is not None:
+            if batch is None or batch[:2] != (keyword, mode):
+                flush()
+                batch = (keyword, mode, [], [])
+            batch[2].append(eid)
+            batch[3].append(value)
+            continue
+
+        flush()
+        ids = groups.get(fields[0].upper())
+        if ids is None:
+            raise ValueError(f"Unknown group {fields[0]} in {table_file}")
+        corrections.add(keyword, mode, ids, [value] * len(ids))
+
+    flush()
+    return corrections
+
+
+def apply_corrections(table_file, result_file, out_file=None, in_place=False):
+
+    corrections = read_corrections(table_file)
+
+    if in_place:
+        out_file = result_file
+    elif out_file is None:
+        base, ext = os.path.splitext(result_file)
+        out_file = base + "_CORRECTED" + ext
+
+    count = patch_values(result_file, corrections, out_file)
 
     return out_file, count
 
@@ -116,16 +167,20 @@ def onOkClicked(dlg):
     id_file  = dlg.get_item_text(name="ID file")
     res_file = dlg.get_item_text(name="Result file")
     htc_file = dlg.get_item_text(name="HTC file")
+    table_file = dlg.get_item_text(name="Correction table")
 
-    if not id_file or not res_file or not htc_file:
+    if not res_file or (not table_file and (not id_file or not htc_file)):
         JPT.MessageBoxPSJ(
-            "Please select all 3 files!",
+            "Please select all 3 files (or a result file and a correction table)!",
             JPT.MsgBoxType.MB_INFORMATION_YESNOCANCEL
         )
         return
 
     try:
-        out_file, n = update_htc(id_file, res_file, htc_file)
+        if table_file:
+            out_file, n = apply_corrections(table_file, res_file)
+        else:
+            out_file, n = update_htc(id_file, res_file, htc_file)
     except Exception as e:
         JPT.MessageBoxPSJ(
             str(e),
@@ -134,7 +189,7 @@ def onOkClicked(dlg):
         return
 
     msg = (
-        f"Updated HTC elements : {n}\n"
+        f"Updated elements : {n}\n"
         f"Output file:\n{out_file}"
     )
 
@@ -162,6 +217,9 @@ def main():
     dlg.add_label(layout="Window", name="L3", text="HTC file (single value):")
     dlg.add_browser(layout="Window", name="HTC file", mode="file")
 
+    dlg.add_label(layout="Window", name="L4", text="Correction table (optional, replaces ID / HTC file):")
+    dlg.add_browser(layout="Window", name="Correction table", mode="file")
+
     dlg.add_groupbox(layout="Window", name="G1", text="PROCESS")
 
     dlg.add_layout(
@@ -9,251 +9,250 @@
 #############################################3
 ### Witer: Thanh Trung Nguyen (IKEDA)
 ### Update: 23/12/2025
+import bisect
 import numpy as np
-import re
-import csv
 import os
-from tkinter import filedialog, Tk
-from pyjdg import *
+try:
+    from tkinter import filedialog, Tk
+except ImportError:
+    # Headless use (mapping_cli.py) passes the output file explicitly
+    pass
+try:
+    from pyjdg import *
+except ImportError:
+    # Headless use (mapping_cli.py): only the GUI callbacks need PSJ
+    pass
 from pathlib import Path
-
-import matplotlib.pyplot as plt
-from mpl_toolkits.mplot3d.art3d import Poly3DCollection
+from inp_reader import read_film
+from mesh_cache import load_mesh, load_results
+from mesh_preview import MAX_FACES, MAX_LABELS
+from perf_trace import phase, traced
 
 
 # ============================================================
 # PLOT - Additional option to visualize results
 # ============================================================
-def plot_results(nodes, elements, results, result_index=0, title='VALUE', cmap='jet'):
-    fig = plt.figure(figsize=(10, 8))
-    ax = fig.add_subplot(111, projection='3d')
-
-    triangles, colors, centers, labels = [], [], [], []
-
-    for eid in sorted(elements.keys()):
-        nids = elements[eid]
-        if len(nids) < 3:
-            continue
-
-        tri = [nodes[nid] for nid in nids[:3]]
-        triangles.append(tri)
-
-        val = results.get(eid, (np.nan, np.nan))[result_index]
-        colors.append(val)
-
-        c = np.mean(tri, axis=0)
-        centers.append(c)
-        labels.append(f"{val:.2f}" if not np.isnan(val) else "NaN")
-
-    poly = Poly3DCollection(triangles, edgecolors='k')
-    poly.set_array(np.array(colors))
-    poly.set_cmap(cmap)
-    poly.set_clim(np.nanmin(colors), np.nanmax(colors))
-    ax.add_collection3d(poly)
-
-    for c, lab in zip(centers, labels):
-        ax.text(c[0], c[1], c[2], lab, fontsize=8)
-
-    ax.auto_scale_xyz(*zip(*[p for t in triangles for p in t]))
-    ax.set_title(title)
-    fig.colorbar(poly, ax=ax)
-    plt.tight_layout()
-    plt.show()
+def plot_results(mesh, results, result_index=0, title='VALUE', cmap='jet',
+                 out_file=None, labels=MAX_LABELS, max_faces=MAX_FACES):
+    # Vectorised / clustered preview (mesh_preview). labels caps the value
+    # labels (0 = none); out_file saves the image offscreen, no window.
+    # Imported here so the batch CLI does not need matplotlib
+    from mesh_preview import render_preview
+    return render_preview(mesh, results[:, result_index], title, cmap,
+                          out_file, max_faces, labels)
 
 
 # ============================================================
 # READ INPUT
 # ============================================================
-def read_nodes(inp_file):
-    nodes = {}
-    with open(inp_file, 'r') as f:
-        lines = f.readlines()
-
-    node_section = False
-    for line in lines:
-        if line.strip().startswith('*NODE'):
-            node_section = True
-            continue
-        if node_section:
-            if line.strip().startswith('*') or line.strip().startswith('**'):
-                break
-            parts = re.split(r',\s*', line.strip())
-            if len(parts) >= 4:
-                try:
-                    nodes[int(parts[0])] = list(map(float, parts[1:4]))
-                except:
-                    pass
-    return nodes
-
-
-def read_elements(inp_file):
-    elements = {}
-    with open(inp_file, 'r') as f:
-        lines = f.readlines()
-
-    elem_section = False
-    for line in lines:
-        if line.strip().startswith('*ELEMENT'):
-            elem_section = True
-            continue
-        if elem_section:
-            if line.strip().startswith('*') or line.strip().startswith('**'):
-                break
-            parts = re.split(r',\s*', line.strip())
-            if len(parts) >= 4:
-                try:
-                    elements[int(parts[0])] = list(map(int, parts[1:]))
-                except:
-                    pass
-    return elements
-
-
-def read_results(csv_file):
-    results = {}
-    with open(csv_file, 'r', encoding='utf-8') as f:
-        reader = csv.reader(f)
-        for row in reader:
-            if len(row) < 4:
-                continue
-            try:
-                results[int(row[0])] = (float(row[2]), float(row[3]))
-            except:
-                pass
-    return results
+def read_mesh(inp_file):
+    # *NODE + *ELEMENT as NumPy arrays, memory-mapped from the on-disk
+    # cache next to the file when it did not change since the last parse
+    with phase("parse mesh") as p:
+        mesh = load_mesh(inp_file)
+        p.rows = len(mesh)
+    return mesh
+
+
+def read_results(csv_file, mesh):
+    # (n_elements, 2) [temp, htc] per mesh element row, NaN = not mapped
+    with phase("parse results") as p:
+        films = read_film(csv_file)
+        p.rows = len(films)
+    with phase("join", rows=len(mesh)):
+        return mesh.result_table(films)
 
 
 # ============================================================
 # DEFINE ELEMENT TOPOLOGY (Tri6)
 # ============================================================
-def corner_nodes(nids):
-    # For T3 or T6, the first 3 nodes are corner nodes
-    return nids[:3]
-
-
-def tri_edges(nids):
-    c = corner_nodes(nids)
-    return [
-        tuple(sorted((c[0], c[1]))),
-        tuple(sorted((c[1], c[2]))),
-        tuple(sorted((c[2], c[0])))
-    ]
-
-
-def longest_edge(nodes, nids):
-    c = corner_nodes(nids)
-    edges = [
-        (c[0], c[1]),
-        (c[1], c[2]),
-        (c[2], c[0])
-    ]
-    lengths = [
-        np.linalg.norm(np.array(nodes[e[0]]) - np.array(nodes[e[1]]))
-        for e in edges
-    ]
-    return tuple(sorted(edges[np.argmax(lengths)]))
-
-
-def common_edge(e1, e2, elements):
-    c1 = set(corner_nodes(elements[e1]))
-    c2 = set(corner_nodes(elements[e2]))
-    s = c1 & c2
+def common_edge(c1, c2):
+    # c1, c2 = the 3 corner nodes (for T3 or T6, the first 3 nodes)
+    s = set(c1) & set(c2)
     return tuple(sorted(s)) if len(s) == 2 else None
 
 
+def build_edge_tables(mesh):
+    """Edge adjacency and longest edges of all elements, built once.
+
+    Corner edge k of an element is (c[k], c[k+1]).
+    Returns
+      neighbor     : (M, 3) element across edge k, -1 unless exactly
+                     2 elements share that edge
+      longest_k    : (M,) k of the longest corner edge
+      longest_edge : (M,) edge index of the longest corner edge, -1 for
+                     non-triangles
+    """
+    n = len(mesh)
+    is_tri = mesh.is_tri
+    c = mesh.corners.astype(np.int64)
+    lo = np.minimum(c, np.roll(c, -1, axis=1))
+    hi = np.maximum(c, np.roll(c, -1, axis=1))
+
+    # Unique edge index per (element, k)
+    edge = np.full((n, 3), -1, dtype=np.int64)
+    if is_tri.any():
+        pairs = np.stack([lo[is_tri], hi[is_tri]], axis=-1).reshape(-1, 2)
+        _, inverse = np.unique(pairs, axis=0, return_inverse=True)
+        edge[is_tri] = inverse.reshape(-1, 3)
+
+    # Element across each manifold edge (edge shared by exactly 2 elements)
+    flat = edge.ravel()
+    slots = np.flatnonzero(flat >= 0)
+    slots = slots[np.argsort(flat[slots], kind='stable')]
+    sorted_edge = flat[slots]
+    starts = np.flatnonzero(np.r_[True, sorted_edge[1:] != sorted_edge[:-1]])
+    counts = np.diff(np.r_[starts, sorted_edge.size])
+    first = starts[counts == 2]
+    s1, s2 = slots[first], slots[first + 1]
+
+    neighbor = np.full(3 * n, -1, dtype=np.int64)
+    neighbor[s1] = s2 // 3
+    neighbor[s2] = s1 // 3
+    neighbor = neighbor.reshape(n, 3)
+
+    longest_k = mesh.longest_edge_local()
+    longest_edge = edge[np.arange(n), longest_k]
+
+    return neighbor, longest_k, longest_edge
+
+
 # ============================================================
 # CORE PROPAGATION 
 # ============================================================
-def propagate_results(nodes, elements, results):
-
-    valid = [e for e in elements if e in results]
-    nan_elems = [e for e in elements if e not in results]
-
-    if not valid or not nan_elems:
+def propagate_results(mesh, results):
+    """Copy results into unmapped elements until nothing changes.
+
+    results : (n_elements, 2) [temp, htc] per mesh row, NaN = not mapped,
+              updated in place. Returns the number of assigned elements.
+
+    Gives the same assignment as repeating the original pass
+    (CASE 1 / CASE 2 rules) until it assigns nothing, but the edge tables
+    are built once and only OA pairs next to newly assigned elements are
+    visited again.
+    """
+    mapped = ~np.isnan(results[:, 0])
+    is_tri = mesh.is_tri
+    nan_set = set(np.flatnonzero(~mapped).tolist())
+
+    if not nan_set:
         return 0
 
-    nan_set = set(nan_elems)
-
-    # build edge adjacency (based on corner nodes only) - đã debug
-    edge2elem = {}
-    for e, n in elements.items():
-        if len(n) < 3:
-            continue
-        for ed in tri_edges(n):
-            edge2elem.setdefault(ed, []).append(e)
-
-    # OA pairs (valid-valid via longest edge)      đã debug
-    edge2valid = {}
-    for e in valid:
-        le = longest_edge(nodes, elements[e])
-        edge2valid.setdefault(le, []).append(e)
-
-    oa_pairs = [p for p in edge2valid.values() if len(p) == 2]
-
-    new_assigned = 0
-
-    for e1, e2 in oa_pairs:
-
-        A = O = None
-
-        # find A (touches NaN)
-        for e in (e1, e2):
-            for ed in tri_edges(elements[e]):
-                nei = edge2elem.get(ed, [])
-                if len(nei) == 2:
-                    other = nei[0] if nei[1] == e else nei[1]
-                    if other in nan_set:
+    neighbor, longest_k, longest_edge = build_edge_tables(mesh)
+    corners = mesh.corners.tolist()
+    nbr = neighbor.tolist()
+    lk = longest_k.tolist()
+    le = longest_edge.tolist()
+
+    # OA pairs = exactly 2 valid elements sharing their longest edge
+    groups = {}      # longest edge -> valid elements (sorted rows)
+    pairs = {}       # first row -> (e1, e2)
+    pair_of = {}     # element -> first row of its pair
+    active = set()   # pairs to visit in the next pass
+
+    def add_valid(rows):
+        for e in rows:
+            g = groups.setdefault(le[e], [])
+            if len(g) == 2:
+                key = g[0]
+                del pairs[key]
+                pair_of.pop(g[0], None)
+                pair_of.pop(g[1], None)
+                active.discard(key)
+            bisect.insort(g, e)
+            if len(g) == 2:
+                pairs[g[0]] = (g[0], g[1])
+                pair_of[g[0]] = pair_of[g[1]] = g[0]
+                active.add(g[0])
+
+    add_valid(np.flatnonzero(mapped & is_tri).tolist())
+
+    total = 0
+
+    while active and nan_set:
+        # Pairs are visited in first-row order, like the original pass
+        worklist = sorted(active)
+        active = set()
+        new_rows = []
+
+        for key in worklist:
+            e1, e2 = pairs[key]
+
+            A = O = None
+
+            # find A (touches NaN)
+            for e in (e1, e2):
+                for other in nbr[e]:
+                    if other >= 0 and other in nan_set:
                         A = e
                         O = e2 if e == e1 else e1
                         break
-            if A:
-                break
-
-        if A is None:
-            continue
+                if A is not None:
+                    break
 
-        # find B/C
-        for ed in tri_edges(elements[A]):
-            nei = edge2elem.get(ed, [])
-            if len(nei) != 2:
+            if A is None:
                 continue
 
-            B = nei[0] if nei[1] == A else nei[1]
-            if B not in nan_set:
-                continue
+            # find B/C
+            for B in nbr[A]:
+                if B < 0 or B not in nan_set:
+                    continue
+
+                C = nbr[B][lk[B]]
+                if C < 0 or C not in nan_set:
+                    continue
+
+                if le[C] != le[B]:
+                    continue
+
+                # CONDITION 1 / 2
+                edge_n = common_edge(corners[A], corners[O])
+                edge_m = common_edge(corners[B], corners[C])
+                if not edge_n or not edge_m:
+                    continue
+
+                if len(set(edge_n) & set(edge_m)) == 1:
+                    # CASE 2
+                    results[B] = results[A]
+                    results[C] = results[O]
+                else:
+                    # CASE 1
+                    results[B] = results[O]
+                    results[C] = results[A]
+
+                nan_set.remove(B)
+                nan_set.remove(C)
+                new_rows += (B, C)
+
+                # Revisit this pair and every pair touching B or C
+                active.add(key)
+                for x in (B, C):
+                    for nb in nbr[x]:
+                        if nb in pair_of:
+                            active.add(pair_of[nb])
+                break
 
-            leB = longest_edge(nodes, elements[B])
-            nei2 = edge2elem.get(leB, [])
-            if len(nei2) != 2:
-                continue
+        if not new_rows:
+            break
 
-            C = nei2[0] if nei2[1] == B else nei2[1]
-            if C not in nan_set:
-                continue
+        total += len(new_rows)
+        add_valid(sorted(new_rows))
 
-            if longest_edge(nodes, elements[C]) != leB:
-                continue
+    return total
 
-            # CONDITION 1 / 2
-            edge_n = common_edge(A, O, elements)
-            edge_m = common_edge(B, C, elements)
-            if not edge_n or not edge_m:
-                continue
 
-            if len(set(edge_n) & set(edge_m)) == 1:
-                # CASE 2
-                results[B] = results[A]
-                results[C] = results[O]
-            else:
-                # CASE 1
-                results[B] = results[O]
-                results[C] = results[A]
-
-            nan_set.remove(B)
-            nan_set.remove(C)
-            new_assigned += 2
-            break
+def load_propagated(inp_file, csv_file):
+    # Mesh + propagated results. TEMP / HTC preview and export share the
+    # cached arrays, so only the first of them parses and propagates.
+    mesh = read_mesh(inp_file)
+
+    def compute():
+        results = read_results(csv_file, mesh)
+        with phase("propagate", rows=len(mesh)):
+            propagate_results(mesh, results)
+        return results
 
-    return new_assigned
+    return mesh, load_results(inp_file, csv_file, compute, tag="propagated")
 
 
 # ============================================================
@@ -267,27 +266,30 @@ def select_output_folder():
     return folder
 
 
-def maincode(inp_file, csv_file):
-    nodes = read_nodes(inp_file)
-    elements = read_elements(inp_file)
-    results = read_results(csv_file)
+def export_copied_results(inp_file, csv_file, output_inp):
+    # Copy step + *FILM export, no GUI. Returns the number of elements.
+    with traced("copy", model=inp_file, results=csv_file) as run:
+        mesh, results = load_propagated(inp_file, csv_file)
 
-    while True:
-        if propagate_results(nodes, elements, results) == 0:
-            break
+        with phase("write", rows=len(mesh)):
+            order = np.argsort(mesh.elem_ids, kind='stable')
+            with open(output_inp, 'w') as f:
+                f.write("*FILM\n")
+                for eid, v in zip(mesh.elem_ids[order].tolist(), results[order].tolist()):
+                    f.write(f"{eid},FPOS,{v[0]},{v[1]}\n")
+        run.rows = len(mesh)
+
+    return len(mesh)
 
+
+def maincode(inp_file, csv_file):
     output_folder = select_output_folder()
     if not output_folder:
         return
 
     os.makedirs(output_folder, exist_ok=True)
     output_inp = os.path.join(output_folder, 'COPIED RESULTS.inp')
-
-    with open(output_inp, 'w') as f:
-        f.write("*FILM\n")
-        for eid in sorted(elements):
-            v = results.get(eid, (np.nan, np.nan))
-            f.write(f"{eid},FPOS,{v[0]},{v[1]}\n")
+    export_copied_results(inp_file, csv_file, output_inp)
 
     print("Export DONE")
     JPT.ClearLog()
@@ -302,21 +304,34 @@ def onGetButton1Clicked(dlg):
 
 
 def onGetButton2Clicked(dlg):
-    n = read_nodes(dlg.get_item_text(name="File Ndelm"))
-    e = read_elements(dlg.get_item_text(name="File Ndelm"))
-    r = read_results(dlg.get_item_text(name="Mapping results"))
-    while propagate_results(n, e, r):
-        pass
-    plot_results(n, e, r, 0, "TEMPERATURE")
+    mesh, r = load_propagated(dlg.get_item_text(name="File Ndelm"),
+                              dlg.get_item_text(name="Mapping results"))
+    plot_results(mesh, r, 0, "TEMPERATURE")
 
 
 def onGetButton3Clicked(dlg):
-    n = read_nodes(dlg.get_item_text(name="File Ndelm"))
-    e = read_elements(dlg.get_item_text(name="File Ndelm"))
-    r = read_results(dlg.get_item_text(name="Mapping results"))
-    while propagate_results(n, e, r):
-        pass
-    plot_results(n, e, r, 1, "HTC")
+    mesh, r = load_propagated(dlg.get_item_text(name="File Ndelm"),
+                              dlg.get_item_text(name="Mapping results"))
+    plot_results(mesh, r, 1, "HTC")
+
+
+def onGetButton4Clicked(dlg):
+    # TEMP / HTC images next to the mapped results, rendered offscreen one
+    # after the other on a background thread so the PSJ session stays usable
+    from mesh_preview import export_previews_async
+    csv_file = dlg.get_item_text(name="Mapping results")
+    mesh, r = load_propagated(dlg.get_item_text(name="File Ndelm"), csv_file)
+    stem = os.path.splitext(csv_file)[0]
+    images = [(r[:, index], f"{stem}_{title}.png", title)
+              for index, title in enumerate(("TEMPERATURE", "HTC"))]
+
+    def done(path, error):
+        if error is None:
+            print(f"Preview saved: {path}")
+        else:
+            print(f"Preview failed: {path}: {type(error).__name__}: {error}")
+
+    export_previews_async(mesh, images, done=done)
 
 
 def main():
@@ -344,6 +359,12 @@ def main():
                    bk_color=15790320, layout="Layout1.3")
     dlg.on_button_clicked(name="Button2", callfunc=onGetButton3Clicked)
 
+    dlg.add_layout(name="Layout1.4", margin=[200, 0, 0, 0],
+                   orientation=orientation.horizontal, layout="GroupBox1")
+    dlg.add_button(name="Button3", text="PNG", width=60, height=22,
+                   bk_color=15790320, layout="Layout1.4")
+    dlg.on_button_clicked(name="Button3", callfunc=onGetButton4Clicked)
+
     dlg.generate_window()
     dlg.on_dlg_ok(callfunc=onGetButton1Clicked)
 
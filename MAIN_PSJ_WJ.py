@@ -1,9 +1,21 @@
 ### Mapping_WJ ###
 ### Author: Ikeda (Trung Thanh) ###
 
+import math
 import os
-from tkinter import filedialog, Tk
-from pyjdg import *
+try:
+    from tkinter import filedialog, Tk
+except ImportError:
+    # Headless use (mapping_cli.py) passes the output folder explicitly
+    pass
+try:
+    from pyjdg import *
+except ImportError:
+    # Headless use (mapping_cli.py): only the GUI callbacks need PSJ
+    pass
+
+from heat_writer import HeatWriter
+from perf_trace import phase, traced
 
 def select_output_folder():
     # Use Tkinter to select a folder for saving the results.
@@ -13,32 +25,20 @@ def select_output_folder():
     root.destroy()
     return folder
 
-def generate_heat_files(input_mapping_path: str):
+def iter_mapping_rows(input_mapping_path: str):
     """
-    Reads the input mapping file and exports 3 files with fixed names:
-      - Film Property: _HEAT_filmprop_WJ.inp
-      - SFILM: _HEAT_sfilm_WJ.inp
-      - Surface Map: _HEAT_surface_WJ.inp
-    The files are saved in a folder selected by the user.
+    Yields (element_id, temp_kelvin, htc_value) for every 'id, face, temp, htc'
+    data line of the mapping file. Lines that cannot be read are reported
+    and skipped. A film store folder is read from its columns.
     """
-    # Choose the output folder.
-    output_folder = select_output_folder()
-    if not output_folder:
-        print("No folder selected, export aborted!")
+    if os.path.isdir(input_mapping_path):
+        from film_store import load_film_store
+        store = load_film_store(input_mapping_path)
+        for eid, temp_kelvin, htc_value in store.iter_rows():
+            yield str(eid), temp_kelvin, htc_value
         return
 
-    # Use fixed output file names.
-    output_filmprop_path = os.path.join(output_folder, "_HEAT_filmprop_WJ.inp")
-    output_sfilm_path = os.path.join(output_folder, "_HEAT_sfilm_WJ.inp")
-    output_surface_map_path = os.path.join(output_folder, "_HEAT_surface_WJ.inp")
-
-    with open(input_mapping_path, 'r') as fin, \
-         open(output_filmprop_path, 'w') as fout_filmprop, \
-         open(output_sfilm_path, 'w') as fout_sfilm, \
-         open(output_surface_map_path, 'w') as fout_surface_map:
-
-        fout_sfilm.write("*SFILM\n")
-        index = 1
+    with open(input_mapping_path, 'r') as fin:
         for line in fin:
             line = line.strip()
             if not line or line.startswith('*'):
@@ -48,7 +48,6 @@ def generate_heat_files(input_mapping_path: str):
             if len(parts) != 4:
                 continue
 
-            node_id = parts[0]
             try:
                 temp_kelvin = float(parts[2])
                 htc_value = float(parts[3])
@@ -56,24 +55,158 @@ def generate_heat_files(input_mapping_path: str):
                 print(f"⚠️ ERROR: Cannot read TEMP or HTC from line: {line}")
                 continue
 
-            htc_scaled = htc_value / 1_000_000
+            yield parts[0], temp_kelvin, htc_value
 
-            # Write Film Property file data.
-            fout_filmprop.write(f"*FILM PROPERTY, NAME=FPnwjc1_{index}\n")
-            fout_filmprop.write(f"{htc_scaled:e}, 0.0\n")
-            fout_filmprop.write(f"{htc_scaled:e}, 140.0\n")
-            fout_filmprop.write(f"{htc_scaled * 1.25:e}, 160.0\n")
-            fout_filmprop.write(f"{htc_scaled * 2.5:e}, 200.0\n")
+def write_film_property(fout, name, htc_scaled):
+    fout.write(f"*FILM PROPERTY, NAME={name}\n")
+    fout.write(f"{htc_scaled:e}, 0.0\n")
+    fout.write(f"{htc_scaled:e}, 140.0\n")
+    fout.write(f"{htc_scaled * 1.25:e}, 160.0\n")
+    fout.write(f"{htc_scaled * 2.5:e}, 200.0\n")
 
-            # Write Surface Map file data (without blank lines between blocks).
-            fout_surface_map.write(f"*SURFACE, NAME=SEwj_{index} , TYPE=ELEMENT\n")
-            fout_surface_map.write(f"{node_id}, SPOS\n")
+def generate_heat_files(input_mapping_path: str, output_folder: str = None,
+                        compact: bool = False, htc_tol: float = 0.01, temp_tol: float = 0.0,
+                        threaded: bool = True):
+    """
+    Reads the input mapping file and exports 3 files with fixed names:
+      - Film Property: _HEAT_filmprop_WJ.inp
+      - SFILM: _HEAT_sfilm_WJ.inp
+      - Surface Map: _HEAT_surface_WJ.inp
+    The files are saved in output_folder, or in a folder selected by the
+    user when output_folder is not given.
+    compact=True writes shared film properties and grouped surfaces instead
+    of one of each per element (see write_compact_heat_files).
+    Rows are written in blocks by heat_writer.HeatWriter (threaded=True:
+    a background thread writes while the next block is parsed).
+    Returns the number of exported elements (None if aborted).
+    """
+    # Choose the output folder.
+    if output_folder is None:
+        output_folder = select_output_folder()
+    if not output_folder:
+        print("No folder selected, export aborted!")
+        return
+    os.makedirs(output_folder, exist_ok=True)
+
+    with traced("wj", mapping=input_mapping_path, compact=compact) as run:
+        if compact:
+            run.rows = write_compact_heat_files(input_mapping_path, output_folder,
+                                                htc_tol, temp_tol)
+            return run.rows
+
+        # parse and write overlap (writer thread): one phase
+        with phase("parse+write") as p:
+            with HeatWriter(output_folder, threaded=threaded) as writer:
+                writer.extend(iter_mapping_rows(input_mapping_path))
+            p.rows = run.rows = writer.count
+
+    return writer.count
+
+# ============================================================
+# COMPACT OUTPUT
+# ============================================================
+# HTC is binned on a log scale: every bin spans a factor (1 + htc_tol)^2
+# and is represented by its geometric centre, so the relative HTC error
+# is at most htc_tol. TEMP is binned with a width of 2 * temp_tol around
+# multiples of 2 * temp_tol (absolute error <= temp_tol). A tolerance of
+# 0 keeps the exact values and only merges identical ones.
+IDS_PER_LINE = 16
+
+def htc_bin(htc, htc_tol):
+    """(bin key, representative value) of one scaled HTC value."""
+    if htc_tol <= 0 or htc <= 0:
+        return ('=', htc), htc
+    width = 2.0 * math.log1p(htc_tol)
+    k = round(math.log(htc) / width)
+    return k, math.exp(k * width)
 
-            # Write SFILM file data (temperature in Celsius using exponential format).
+def temp_bin(temp, temp_tol):
+    if temp_tol <= 0:
+        return ('=', temp), temp
+    width = 2.0 * temp_tol
+    k = round(temp / width)
+    return k, k * width
+
+def write_compact_heat_files(input_mapping_path: str, output_folder: str,
+                             htc_tol: float = 0.01, temp_tol: float = 0.0):
+    """
+    Compact variant of generate_heat_files:
+      - one *FILM PROPERTY per HTC bin
+      - one *ELSET + *SURFACE per (TEMP bin, HTC bin) group
+      - one SFILM line per group
+    The introduced error is written to _HEAT_report_WJ.txt.
+    Returns the number of exported elements.
+    """
+    film_props = {}     # htc key -> (index, representative htc)
+    groups = {}         # (temp key, htc key) -> [representative temp, element ids]
+    n_rows = 0
+    htc_err_max = htc_err_sum = 0.0
+    temp_err_max = temp_err_sum = 0.0
+
+    with phase("parse+bin") as p:
+        for node_id, temp_kelvin, htc_value in iter_mapping_rows(input_mapping_path):
+            htc_scaled = htc_value / 1_000_000
             temp_celsius = temp_kelvin - 273.15
-            fout_sfilm.write(f"SEwj_{index}, F, {temp_celsius:e}, FPnwjc1_{index}\n")
-            
-            index += 1
+
+            hk, htc_rep = htc_bin(htc_scaled, htc_tol)
+            tk, temp_rep = temp_bin(temp_celsius, temp_tol)
+            if hk not in film_props:
+                film_props[hk] = (len(film_props) + 1, htc_rep)
+            group = groups.get((tk, hk))
+            if group is None:
+                group = groups[(tk, hk)] = [temp_rep, []]
+            group[1].append(node_id)
+
+            n_rows += 1
+            htc_err = abs(film_props[hk][1] - htc_scaled) / abs(htc_scaled) if htc_scaled else 0.0
+            temp_err = abs(group[0] - temp_celsius)
+            htc_err_max = max(htc_err_max, htc_err)
+            htc_err_sum += htc_err
+            temp_err_max = max(temp_err_max, temp_err)
+            temp_err_sum += temp_err
+        p.rows = n_rows
+
+    # Use fixed output file names.
+    output_filmprop_path = os.path.join(output_folder, "_HEAT_filmprop_WJ.inp")
+    output_sfilm_path = os.path.join(output_folder, "_HEAT_sfilm_WJ.inp")
+    output_surface_map_path = os.path.join(output_folder, "_HEAT_surface_WJ.inp")
+    output_report_path = os.path.join(output_folder, "_HEAT_report_WJ.txt")
+
+    with phase("write", rows=n_rows):
+        with open(output_filmprop_path, 'w') as fout_filmprop:
+            for index, htc_rep in film_props.values():
+                write_film_property(fout_filmprop, f"FPnwjc1_{index}", htc_rep)
+
+        with open(output_sfilm_path, 'w') as fout_sfilm, \
+             open(output_surface_map_path, 'w') as fout_surface_map:
+            fout_sfilm.write("*SFILM\n")
+            for g, ((tk, hk), (temp_rep, ids)) in enumerate(groups.items(), start=1):
+                fout_surface_map.write(f"*ELSET, ELSET=SEwj_{g}_E\n")
+                for i in range(0, len(ids), IDS_PER_LINE):
+                    fout_surface_map.write(", ".join(ids[i:i + IDS_PER_LINE]) + "\n")
+                fout_surface_map.write(f"*SURFACE, NAME=SEwj_{g} , TYPE=ELEMENT\n")
+                fout_surface_map.write(f"SEwj_{g}_E, SPOS\n")
+
+                fout_sfilm.write(f"SEwj_{g}, F, {temp_rep:e}, FPnwjc1_{film_props[hk][0]}\n")
+
+    report = [
+        "WJ compact export",
+        f"Input            : {input_mapping_path}",
+        f"HTC tolerance    : {htc_tol:g} (relative)",
+        f"TEMP tolerance   : {temp_tol:g} (absolute, C)",
+        f"Elements         : {n_rows}",
+        f"Film properties  : {len(film_props)}",
+        f"Surfaces         : {len(groups)}",
+        f"HTC error  max   : {htc_err_max:.6e} (relative)",
+        f"HTC error  mean  : {htc_err_sum / max(n_rows, 1):.6e} (relative)",
+        f"TEMP error max   : {temp_err_max:.6e} C",
+        f"TEMP error mean  : {temp_err_sum / max(n_rows, 1):.6e} C",
+    ]
+    with open(output_report_path, 'w') as fout_report:
+        fout_report.write("\n".join(report) + "\n")
+    print("\n".join(report[4:]))
+
+    return n_rows
 
 # PSJ command: on button click, get input file from dialog and call generate_heat_files.
 def onGetButton1Clicked(dlg):
@@ -10,33 +10,26 @@
 ### Writer: Thanh Trung Nguyen (IKEDA)
 ### Update: 24/12/2025
 ############################################__
-import re
-import csv
-from tkinter import Tk, filedialog
-from pyjdg import *
+from array import array
+try:
+    from tkinter import Tk, filedialog
+except ImportError:
+    # Headless use (mapping_cli.py) never opens a file browser
+    pass
+try:
+    from pyjdg import *
+except ImportError:
+    # Headless use (mapping_cli.py): only the GUI callbacks need PSJ
+    pass
+from inp_reader import read_ids, read_id_groups, read_inp
+from line_scan import AreaTable, scan_groups
 
 
 # ============================================================
 # READ ELEMENT IDS FROM INP
 # ============================================================
 def read_element_ids(inp_file):
-    elem_ids = set()
-
-    with open(inp_file, 'r') as f:
-        for line in f:
-            line = line.strip()
-
-            # Skip empty / comment / keyword
-            if not line or line.startswith('*') or line.startswith('**'):
-                continue
-
-            try:
-                eid = int(re.split(r'[,\s]+', line)[0])
-                elem_ids.add(eid)
-            except:
-                pass
-
-    return elem_ids
+    return set(read_ids(inp_file))
 
 
 # ============================================================
@@ -46,34 +39,97 @@ def compute_average(inp_file, result_file):
 
     elem_ids = read_element_ids(inp_file)
 
-    temp_list = []
-    htc_list  = []
-
-    with open(result_file, 'r', encoding='utf-8') as f:
-        reader = csv.reader(f)
+    # One pass over the result file (line_scan): rows "id, face, temp, htc"
+    # whose id is in elem_ids are summed in file order
+    stats = scan_groups(result_file, [("IDS", elem_ids)])
+    return stats.average(0)
 
-        for row in reader:
-            if len(row) < 4:
-                continue
 
-            try:
-                eid  = int(row[0])
-                temp = float(row[2])
-                htc  = float(row[3])
-            except:
-                continue
+def compute_group_averages(id_files, result_file):
+    """
+    Averages for many ID groups (ID files / *ELSET blocks) in one pass.
+    Returns [(group name, avg_temp, avg_htc, n), ...].
+    """
+    groups = read_id_groups(id_files)
+    stats = scan_groups(result_file, groups)
+    return [(name,) + stats.average(g) for g, name in enumerate(stats.names)]
 
-            if eid in elem_ids:
-                temp_list.append(temp)
-                htc_list.append(htc)
 
-    if not temp_list:
-        return None, None, 0
-
-    avg_temp = sum(temp_list) / len(temp_list)
-    avg_htc  = sum(htc_list)  / len(htc_list)
-
-    return avg_temp, avg_htc, len(temp_list)
+# ============================================================
+# STREAMING STATISTICS (COUNT / MEAN / MIN / MAX / STD / AREA-WEIGHTED)
+# ============================================================
+STAT_COLUMNS = ("count", "mean", "min", "max", "std", "weighted_mean")
+
+
+def element_areas(model_inp):
+    """AreaTable of the elements of an INP model, None without a mesh."""
+    from mesh_cache import load_mesh        # numpy only needed here
+    mesh = load_mesh(model_inp)
+    if not len(mesh):
+        return None
+    try:
+        areas = mesh.areas()
+    except KeyError as e:
+        print(f"No element areas: node {e} is missing in {model_inp}")
+        return None
+    return AreaTable(mesh.elem_ids, areas)
+
+
+def model_elset_groups(model_inp):
+    """Groups from a model: every *ELSET and every *ELEMENT, ELSET=... block."""
+    model = read_inp(model_inp, ('ELEMENT', 'ELSET'))
+    groups = {}
+    for block in model.elements.blocks:
+        if block.elset:
+            groups.setdefault(block.elset, array('q')).extend(block.ids)
+    for name, ids in model.elsets.items():
+        groups.setdefault(name, array('q')).extend(ids)
+    return list(groups.items())
+
+
+def compute_statistics(id_files, result_file, model_inp=None, by_elset=False, groups=None):
+    """
+    One pass over the result file for all groups:
+      - groups: [(name, ids), ...] given as they are (first)
+      - one group per ID file (or per *ELSET inside it)
+      - by_elset: one group per ELSET of model_inp as well
+    Area-weighted means use the element areas of model_inp.
+    Returns [{"group", "lines", "temp": {...}, "htc": {...}}, ...]
+    with the keys of RunningStats.summary().
+    """
+    groups = list(groups or []) + read_id_groups(id_files or [])
+    areas = None
+    if model_inp:
+        if by_elset:
+            groups += model_elset_groups(model_inp)
+        areas = element_areas(model_inp)
+
+    stats = scan_groups(result_file, groups, areas=areas)
+    return [{"group": name,
+             "lines": stats.lines[g],
+             "temp": stats.temp[g].summary(),
+             "htc": stats.htc[g].summary()}
+            for g, name in enumerate(stats.names)]
+
+
+def write_statistics_csv(rows, out_file):
+    header = ["GROUP"]
+    for q in ("TEMP", "HTC"):
+        header += [f"{q}_{c.upper()}" for c in STAT_COLUMNS]
+    header += ["AREA", "N_AREA"]
+
+    def fmt(v):
+        return "" if v is None else (f"{v:.6g}" if isinstance(v, float) else str(v))
+
+    with open(out_file, 'w', encoding='utf-8') as f:
+        f.write(",".join(header) + "\n")
+        for row in rows:
+            values = [row["group"]]
+            for q in ("temp", "htc"):
+                values += [fmt(row[q][c]) for c in STAT_COLUMNS]
+            values += [fmt(row["temp"]["weight"]), fmt(row["temp"]["weighted_count"])]
+            f.write(",".join(values) + "\n")
+    return out_file
 
 
 # ============================================================
@@ -95,19 +151,33 @@ def onAverageClicked(dlg):
     inp_file = dlg.get_item_text(name="INP file")
     res_file = dlg.get_item_text(name="Result file")
 
-    avg_temp, avg_htc, n = compute_average(inp_file, res_file)
+    # All IDs of the file form one group (as compute_average), *ELSET
+    # blocks included. The INP file may also hold the mesh: then
+    # area-weighted means are shown
+    row = compute_statistics(None, res_file, model_inp=inp_file,
+                             groups=[("IDS", read_element_ids(inp_file))])[0]
+    temp, htc = row["temp"], row["htc"]
+    n = temp["count"]
 
-    if avg_temp is None:
+    if not n:
         JPT.MessageBoxPSJ(
             "No matching elements found!",
             JPT.MsgBoxType.MB_INFORMATION_YESNOCANCEL
         )
         return
 
+    def fmt(v):
+        return "n/a" if v is None else f"{v:.4f}"
+
     msg = (
         f"Number of elements : {n}\n"
-        f"Average TEMP       : {avg_temp:.4f}\n"
-        f"Average HTC        : {avg_htc:.4f}"
+        f"Average TEMP       : {temp['mean']:.4f}\n"
+        f"Average HTC        : {htc['mean']:.4f}\n"
+        f"TEMP min / max     : {fmt(temp['min'])} / {fmt(temp['max'])}\n"
+        f"HTC  min / max     : {fmt(htc['min'])} / {fmt(htc['max'])}\n"
+        f"TEMP / HTC std     : {fmt(temp['std'])} / {fmt(htc['std'])}\n"
+        f"Area-weighted TEMP : {fmt(temp['weighted_mean'])}\n"
+        f"Area-weighted HTC  : {fmt(htc['weighted_mean'])}"
     )
 
     print(msg)
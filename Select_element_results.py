@@ -6,76 +6,110 @@
 ###   2. CFD mapping result file
 ### Output:
 ###   INP file with *FILM keyword
+### The result file is scanned in large chunks (line_scan): leading IDs
+### are parsed with NumPy and the selected lines are copied unchanged.
 ##############################################
 ### Writer: Thanh Trung Nguyen (IKEDA)
 ### Update: 25/12/2025
 ##############################################
 
 import os
-import re
-from pyjdg import *
+try:
+    from pyjdg import *
+except ImportError:
+    # Headless use (mapping_cli.py): only the GUI callbacks need PSJ
+    pass
+from inp_reader import read_ids as read_id_list, read_id_groups
+from line_scan import IdSet, extract_lines, scan_groups
+from perf_trace import phase, traced
 
 
 # ============================================================
 # READ IDS FROM FILE #1
 # ============================================================
 def read_ids(id_file):
-
-    ids = set()
-
-    with open(id_file, 'r') as f:
-        for line in f:
-            line = line.strip()
-
-            # Skip empty / comment / keyword
-            if not line or line.startswith('*') or line.startswith('**'):
-                continue
-
-            try:
-                eid = int(line.split(',')[0])
-                ids.add(eid)
-            except:
-                pass
-
-    return ids
+    return IdSet(read_id_list(id_file))
 
 
 # ============================================================
 # EXTRACT RESULTS AND WRITE *FILM INP
 # ============================================================
-def extract_to_inp(id_file, result_file):
-
-    ids = read_ids(id_file)
+def extract_to_inp(id_file, result_file, out_file=None):
 
-    base, _ = os.path.splitext(result_file)
-    out_file = base + "_EXTRACT.inp"
+    with traced("extract", ids=id_file, results=result_file) as run:
+        with phase("parse ids") as p:
+            ids = read_ids(id_file)
+            p.rows = len(ids)
 
-    count = 0
+        if out_file is None:
+            base, _ = os.path.splitext(result_file)
+            out_file = base + "_EXTRACT.inp"
 
-    with open(result_file, 'r', encoding='utf-8') as fin, \
-         open(out_file, 'w', encoding='utf-8') as fout:
+        with phase("scan+write") as p, open(out_file, 'w', encoding='utf-8') as fout:
 
-        # === REQUIRED ABAQUS / ACTRAN KEYWORD ===
-        fout.write("*FILM\n")
+            # === REQUIRED ABAQUS / ACTRAN KEYWORD ===
+            fout.write("*FILM\n")
 
-        for line in fin:
-            stripped = line.strip()
-            if not stripped:
-                continue
+            # Only the first field is used as ID, lines are copied unchanged
+            count = 0
+            for text, n in extract_lines(result_file, ids):
+                fout.write(text)
+                count += n
+            p.rows = run.rows = count
 
-            # Only use first field as ID, keep full line format
-            parts = re.split(r'[,\s]+', stripped)
-
-            try:
-                eid = int(parts[0])
-            except:
-                continue
+    return out_file, count
 
-            if eid in ids:
-                fout.write(line if line.endswith("\n") else line + "\n")
-                count += 1
 
-    return out_file, count
+# ============================================================
+# MANY ID GROUPS IN ONE PASS
+# ============================================================
+def _safe_name(name):
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in name)
+
+
+def extract_groups(id_files, result_file, out_dir=None):
+    """
+    Extract many ID groups (ID files and/or *ELSET blocks) in one pass:
+      <result>_<group>_EXTRACT.inp per group
+      <result>_GROUP_AVERAGES.csv  with TEMP / HTC averages per group
+    Returns [(group, out_file, lines, avg_temp, avg_htc, n_avg), ...].
+    """
+    groups = read_id_groups(id_files)
+    base = os.path.splitext(os.path.basename(result_file))[0]
+    out_dir = out_dir or os.path.dirname(os.path.abspath(result_file))
+    os.makedirs(out_dir, exist_ok=True)
+
+    out_files = [os.path.join(out_dir, f"{base}_{_safe_name(name)}_EXTRACT.inp")
+                 for name, _ in groups]
+    if len(set(out_files)) != len(out_files):
+        raise ValueError("Group names must be unique: "
+                         + ", ".join(str(name) for name, _ in groups))
+
+    fouts = []
+    try:
+        for out_file in out_files:
+            fouts.append(open(out_file, 'w', encoding='utf-8'))
+            # === REQUIRED ABAQUS / ACTRAN KEYWORD ===
+            fouts[-1].write("*FILM\n")
+        stats = scan_groups(result_file, groups, fouts)
+    finally:
+        for f in fouts:
+            f.close()
+
+    report = []
+    for g, (name, _) in enumerate(groups):
+        report.append((name, out_files[g], stats.lines[g]) + stats.average(g))
+
+    avg_file = os.path.join(out_dir, f"{base}_GROUP_AVERAGES.csv")
+    with open(avg_file, 'w', encoding='utf-8') as f:
+        f.write("GROUP,EXTRACTED,N_AVERAGE,AVG_TEMP,AVG_HTC\n")
+        for name, _, lines, avg_temp, avg_htc, n in report:
+            if avg_temp is None:
+                f.write(f"{name},{lines},0,,\n")
+            else:
+                f.write(f"{name},{lines},{n},{avg_temp:.6f},{avg_htc:.6f}\n")
+
+    return report
 
 
 # ============================================================
@@ -0,0 +1,6 @@
+##############################################
+### BENCHMARKS (synthetic inputs, timing of the core functions)
+##############################################
+###   python benchmarks/bench_core.py          every core function, 10k-10M elements
+###   python benchmarks/bench_heat_writer.py   WJ heat file writers
+##############################################
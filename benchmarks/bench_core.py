@@ -0,0 +1,221 @@
+##############################################
+### BENCHMARK: CORE FUNCTIONS ON SYNTHETIC WATER JACKETS
+##############################################
+### Times the core function of every tool on synthetic data
+### (benchmarks/synthetic.py) and reports time, throughput and memory.
+### Every case runs in a fresh process (spawn), so the peak RSS belongs
+### to that case only; input generation / setup is not timed. "setup MB"
+### is the peak RSS before the timed call (imports, mesh of the
+### propagate case), "peak MB" the peak at its end.
+###
+###   python benchmarks/bench_core.py                        (10k, 100k, 1M)
+###   python benchmarks/bench_core.py --elements 10k 10M --cases propagate_results
+###   python benchmarks/bench_core.py --dir bench_data --keep --json results.jsonl
+###
+### read_nodes (COpy_no_pattern) was replaced by inp_reader.read_inp /
+### mesh_cache.load_mesh: the read_inp case parses *NODE + *ELEMENT,
+### load_mesh is timed cold (parse + cache write) and from the cache.
+##############################################
+### Update: 18/10/2026
+##############################################
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import Dataset, make_dataset   # noqa: E402
+
+
+DEFAULT_SIZES = ("10k", "100k", "1M")
+
+
+# ============================================================
+# CASES: setup(ds, out) -> (call, input file); call() -> rows done
+# ============================================================
+def _read_inp(ds, out):
+    from inp_reader import read_inp
+    return (lambda: len(read_inp(ds.model, ('NODE', 'ELEMENT')).elements)), ds.model
+
+
+def _load_mesh_cold(ds, out):
+    from mesh_cache import clear_cache, load_mesh
+    clear_cache(ds.model)
+    return (lambda: len(load_mesh(ds.model))), ds.model
+
+
+def _load_mesh_cached(ds, out):
+    from mesh_cache import load_mesh
+    load_mesh(ds.model)
+    return (lambda: len(load_mesh(ds.model))), ds.model
+
+
+def _propagate(ds, out):
+    import COpy_no_pattern
+    mesh = COpy_no_pattern.read_mesh(ds.model)
+    results = COpy_no_pattern.read_results(ds.film, mesh)
+
+    def call():
+        # fills in place: every run starts from the mapped results
+        COpy_no_pattern.propagate_results(mesh, results.copy())
+        return len(mesh)
+    return call, ds.film
+
+
+def _heat_files(ds, out):
+    from MAIN_PSJ_WJ import generate_heat_files
+    return (lambda: generate_heat_files(ds.mapping, os.path.join(out, "heat"))), ds.mapping
+
+
+def _extract(ds, out):
+    from Select_element_results import extract_to_inp
+    out_file = os.path.join(out, "extract.inp")
+    return (lambda: extract_to_inp(ds.ids, ds.film, out_file)[1]), ds.film
+
+
+def _update_htc(ds, out):
+    from Adjust_HTC_average import update_htc
+    out_file = os.path.join(out, "htc_updated.inp")
+    return (lambda: update_htc(ds.ids, ds.film, ds.htc, out_file)[1]), ds.film
+
+
+def _average(ds, out):
+    from Main_Code_average import compute_average
+    return (lambda: compute_average(ds.ids, ds.film)[2]), ds.film
+
+
+def _unit(ds, out):
+    from chang_unit_CFDmapping import process_file
+    out_file = os.path.join(out, "unit.inp")
+    with open(ds.film, 'rb') as f:
+        lines = sum(block.count(b"\n") for block in iter(lambda: f.read(1 << 24), b""))
+
+    def call():
+        process_file(ds.film, out_file)
+        return lines
+    return call, ds.film
+
+
+CASES = {
+    "read_inp": _read_inp,
+    "load_mesh_cold": _load_mesh_cold,
+    "load_mesh_cached": _load_mesh_cached,
+    "propagate_results": _propagate,
+    "generate_heat_files": _heat_files,
+    "extract_to_inp": _extract,
+    "update_htc": _update_htc,
+    "compute_average": _average,
+    "process_file": _unit,
+}
+
+
+def run_case(name, ds, repeat=1):
+    """Run one case in this process: best time of `repeat` runs."""
+    from perf_trace import peak_rss_mb
+    os.environ["MAPPING_PERF_LOG"] = "off"          # no timing records of the tools
+    os.environ["MAPPING_PERF_PRINT"] = "0"
+    ds = Dataset(*ds)
+    out = tempfile.mkdtemp(prefix=f"{name}_", dir=ds.folder)
+    try:
+        call, input_file = CASES[name](ds, out)
+        setup = peak_rss_mb()
+        best, rows = None, 0
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            rows = call()
+            dt = time.perf_counter() - t0
+            best = dt if best is None else min(best, dt)
+        return {
+            "case": name,
+            "seconds": round(best, 4),
+            "rows": rows,
+            "rows_per_s": round(rows / best) if best else None,
+            "input_mb": round(os.path.getsize(input_file) / 1e6, 2),
+            "mb_per_s": round(os.path.getsize(input_file) / 1e6 / best, 1) if best else None,
+            "setup_rss_mb": None if setup is None else round(setup, 1),
+            "peak_rss_mb": None if peak_rss_mb() is None else round(peak_rss_mb(), 1),
+        }
+    finally:
+        shutil.rmtree(out, ignore_errors=True)
+
+
+# ============================================================
+# MAIN
+# ============================================================
+def parse_size(text):
+    """'10k' / '2.5M' / '100000' -> elements."""
+    text = text.strip().lower().replace("_", "")
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    return int(float(text[:-1] if scale > 1 else text) * scale)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Time the core mapping functions on synthetic Tri6 water jackets.")
+    parser.add_argument("--elements", nargs="+", default=list(DEFAULT_SIZES),
+                        help="model sizes, e.g. 10k 1M 10M (default: 10k 100k 1M)")
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument("--repeat", type=int, default=1, help="runs per case, best is kept")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--holes", type=float, default=0.05,
+                        help="unmapped share of the *FILM results (default 0.05)")
+    parser.add_argument("--dir", default=None, help="data folder (default: temp folder)")
+    parser.add_argument("--keep", action="store_true", help="keep the generated files")
+    parser.add_argument("--json", default=None, help="append one JSON line per case")
+    args = parser.parse_args(argv)
+
+    # only what this script created is removed, never a given --dir itself
+    if args.dir is None:
+        work_dir = tempfile.mkdtemp(prefix="bench_core_")
+        created = [work_dir]
+    else:
+        work_dir = args.dir
+        created = [] if os.path.exists(work_dir) else [work_dir]
+        os.makedirs(work_dir, exist_ok=True)
+    ctx = get_context("spawn")
+    try:
+        for size in [parse_size(s) for s in args.elements]:
+            t0 = time.perf_counter()
+            folder = os.path.join(work_dir, f"wj_{size}")
+            if not os.path.exists(folder):
+                created.append(folder)
+            ds = make_dataset(folder, size, args.seed,
+                              hole_fraction=args.holes)
+            print(f"\n{ds.elements:,} elements  (model {os.path.getsize(ds.model) / 1e6:.0f} MB, "
+                  f"data ready in {time.perf_counter() - t0:.1f} s)")
+            print(f"  {'case':<22}{'time':>10}{'rows/s':>14}{'MB/s':>9}"
+                  f"{'setup MB':>10}{'peak MB':>10}")
+            for name in args.cases:
+                with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+                    try:
+                        res = pool.submit(run_case, name, tuple(ds), args.repeat).result()
+                    except Exception as e:
+                        print(f"  {name:<22}FAILED: {type(e).__name__}: {e}")
+                        continue
+                print(f"  {name:<22}{res['seconds']:>9.3f}s{res['rows_per_s'] or 0:>14,}"
+                      f"{res['mb_per_s'] or 0:>9.1f}{res['setup_rss_mb'] or 0:>10.0f}"
+                      f"{res['peak_rss_mb'] or 0:>10.0f}")
+                if args.json:
+                    res.update(elements=ds.elements, seed=args.seed, holes=args.holes,
+                               host=platform.node(), python=platform.python_version(),
+                               time=time.strftime("%Y-%m-%dT%H:%M:%S"))
+                    with open(args.json, 'a', encoding='utf-8') as f:
+                        f.write(json.dumps(res) + "\n")
+    finally:
+        if not args.keep:
+            for path in reversed(created):
+                shutil.rmtree(path, ignore_errors=True)
+        else:
+            print(f"\nFiles kept in {work_dir}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+##############################################
+### BENCHMARK: WJ HEAT FILE WRITERS
+##############################################
+### Compares the old per-line writer of MAIN_PSJ_WJ.generate_heat_files
+### (up to 9 write() calls per row) with heat_writer.HeatWriter
+### (block formatting, one write per block, optional writer thread) on
+### synthetic mapping_WJ inputs, and checks that the outputs are equal.
+###
+###   python benchmarks/bench_heat_writer.py                 (1M and 10M rows)
+###   python benchmarks/bench_heat_writer.py --rows 200000 --keep
+##############################################
+### Update: 18/10/2026
+##############################################
+
+import argparse
+import filecmp
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from MAIN_PSJ_WJ import generate_heat_files, iter_mapping_rows   # noqa: E402
+from heat_writer import FILMPROP_NAME, SFILM_NAME, SURFACE_NAME    # noqa: E402
+
+
+# ============================================================
+# INPUT
+# ============================================================
+def make_mapping_file(path, rows, seed=0):
+    """'id, SPOS, temp[K], htc' rows below a *FILM line."""
+    rng = random.Random(seed)
+    with open(path, 'w') as f:
+        f.write("*FILM\n")
+        chunk = []
+        for eid in range(1, rows + 1):
+            chunk.append(f"{eid}, SPOS, {rng.uniform(300.0, 450.0):.4f}, "
+                         f"{rng.lognormvariate(7.0, 1.0):.4f}\n")
+            if len(chunk) == 100000:
+                f.write("".join(chunk))
+                chunk = []
+        f.write("".join(chunk))
+
+
+# ============================================================
+# REFERENCE: PER-LINE WRITER (generate_heat_files before heat_writer)
+# ============================================================
+def per_line_heat_files(input_mapping_path, output_folder):
+    with open(os.path.join(output_folder, FILMPROP_NAME), 'w') as fout_filmprop, \
+         open(os.path.join(output_folder, SFILM_NAME), 'w') as fout_sfilm, \
+         open(os.path.join(output_folder, SURFACE_NAME), 'w') as fout_surface_map:
+
+        fout_sfilm.write("*SFILM\n")
+        index = 1
+        for node_id, temp_kelvin, htc_value in iter_mapping_rows(input_mapping_path):
+            htc_scaled = htc_value / 1_000_000
+
+            fout_filmprop.write(f"*FILM PROPERTY, NAME=FPnwjc1_{index}\n")
+            fout_filmprop.write(f"{htc_scaled:e}, 0.0\n")
+            fout_filmprop.write(f"{htc_scaled:e}, 140.0\n")
+            fout_filmprop.write(f"{htc_scaled * 1.25:e}, 160.0\n")
+            fout_filmprop.write(f"{htc_scaled * 2.5:e}, 200.0\n")
+
+            fout_surface_map.write(f"*SURFACE, NAME=SEwj_{index} , TYPE=ELEMENT\n")
+            fout_surface_map.write(f"{node_id}, SPOS\n")
+
+            temp_celsius = temp_kelvin - 273.15
+            fout_sfilm.write(f"SEwj_{index}, F, {temp_celsius:e}, FPnwjc1_{index}\n")
+
+            index += 1
+
+    return index - 1
+
+
+# ============================================================
+# MAIN
+# ============================================================
+CASES = (
+    ("per-line", per_line_heat_files),
+    ("batched", lambda inp, out: generate_heat_files(inp, out, threaded=False)),
+    ("batched+thread", lambda inp, out: generate_heat_files(inp, out, threaded=True)),
+)
+
+
+def run(rows, work_dir, created):
+    """One input size; new files / folders are added to `created`."""
+    inp = os.path.join(work_dir, f"mapping_{rows}_WJ.inp")
+    if not os.path.exists(inp):
+        created.append(inp)
+    t0 = time.perf_counter()
+    make_mapping_file(inp, rows)
+    print(f"\n{rows:,} rows  (input {os.path.getsize(inp) / 1e6:.0f} MB, "
+          f"generated in {time.perf_counter() - t0:.1f} s)")
+
+    ref_dir = None
+    for name, func in CASES:
+        out = os.path.join(work_dir, f"{name}_{rows}")
+        if not os.path.exists(out):
+            created.append(out)
+        os.makedirs(out, exist_ok=True)
+        t0 = time.perf_counter()
+        n = func(inp, out)
+        dt = time.perf_counter() - t0
+
+        if ref_dir is None:
+            ref_dir, ref_dt, same = out, dt, ""
+        else:
+            equal = all(filecmp.cmp(os.path.join(ref_dir, f), os.path.join(out, f), shallow=False)
+                        for f in (FILMPROP_NAME, SFILM_NAME, SURFACE_NAME))
+            same = "identical" if equal else "DIFFERENT OUTPUT"
+        print(f"  {name:<16}{dt:8.2f} s  {n / dt / 1e6:6.2f} Mrow/s  "
+              f"x{ref_dt / dt:4.2f}  {same}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    parser.add_argument("--dir", default=None, help="work folder (default: temp folder)")
+    parser.add_argument("--keep", action="store_true", help="keep the generated files")
+    args = parser.parse_args(argv)
+    os.environ["MAPPING_PERF_LOG"] = "off"              # no timing records of the tools
+    os.environ["MAPPING_PERF_PRINT"] = "0"
+
+    # only what this script created is removed, never a given --dir itself
+    if args.dir is None:
+        work_dir = tempfile.mkdtemp(prefix="bench_heat_")
+        created = [work_dir]
+    else:
+        work_dir = args.dir
+        created = [] if os.path.exists(work_dir) else [work_dir]
+        os.makedirs(work_dir, exist_ok=True)
+    try:
+        for rows in args.rows:
+            run(rows, work_dir, created)
+    finally:
+        if not args.keep:
+            for path in reversed(created):
+                if os.path.isdir(path):
+                    shutil.rmtree(path, ignore_errors=True)
+                elif os.path.exists(path):
+                    os.remove(path)
+        else:
+            print(f"\nFiles kept in {work_dir}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,232 @@
+##############################################
+### SYNTHETIC WATER-JACKET DATA FOR BENCHMARKS
+##############################################
+### Reproducible (seeded) inputs at any size, 10k to 10M elements:
+###   <name>_model.inp    Tri6 (S6) surface mesh: inner / outer wall of an
+###                       annular channel around each cylinder bore, quads
+###                       split on the diagonal, mid-side nodes on the walls
+###   <name>_film.inp     *FILM "id,FPOS,temp[K],htc" mapping results with
+###                       rectangular holes (unmapped patches) for the copy
+###   <name>_mapping_WJ.inp  "id, SPOS, temp[K], htc" below *FILM
+###   <name>_ids.inp      *ELSET with a random share of the element IDs
+###   <name>_htc.txt      single HTC value (Adjust_HTC_average)
+###   <name>_htc_table.inp  *HTC, SCALE correction table of the ID subset
+### Node / element IDs start at a new 1,000,000 block per wall, as in
+### assembled models. Files are formatted in blocks with NumPy.
+##############################################
+### Update: 18/10/2026
+##############################################
+
+import os
+from collections import namedtuple
+
+import numpy as np
+
+
+BORES = 4                       # cylinders in line
+BORE_RADIUS = 40.0              # inner channel wall [mm]
+CHANNEL_WIDTH = 8.0             # outer wall radius = inner + width
+BORE_PITCH = 95.0
+HEIGHT = 120.0
+ID_BLOCK = 1_000_000            # first node / element ID of wall k: k * ID_BLOCK + 1
+BLOCK_ROWS = 200_000            # lines formatted per write
+
+Dataset = namedtuple("Dataset", "folder elements model film mapping ids htc table")
+
+
+# ============================================================
+# MESH
+# ============================================================
+class Wall:
+    """One cylindrical Tri6 wall, nc x na quads split in 2 triangles."""
+
+    def __init__(self, center, radius, nc, na, first_id):
+        self.center, self.radius = center, radius
+        self.nc, self.na = nc, na
+        self.first_id = first_id
+
+    def node_coords(self):
+        """(ids, xyz) of the corners, then the horizontal, vertical and
+        diagonal mid-side nodes."""
+        nc, na = self.nc, self.na
+        parts = [
+            np.meshgrid(np.arange(nc), np.arange(na + 1), indexing='ij'),        # corners
+            np.meshgrid(np.arange(nc) + 0.5, np.arange(na + 1), indexing='ij'),  # H mids
+            np.meshgrid(np.arange(nc), np.arange(na) + 0.5, indexing='ij'),      # V mids
+            np.meshgrid(np.arange(nc) + 0.5, np.arange(na) + 0.5, indexing='ij'),  # D mids
+        ]
+        t = np.concatenate([p[0].ravel() for p in parts]) * (2 * np.pi / nc)
+        z = np.concatenate([p[1].ravel() for p in parts]) * (HEIGHT / na)
+        xyz = np.stack([self.center + self.radius * np.cos(t),
+                        self.radius * np.sin(t), z], axis=1)
+        return self.first_id + np.arange(len(t), dtype=np.int64), xyz
+
+    def elements(self):
+        """(M, 6) S6 connectivity (node IDs), quad (i, j) gives rows 2k, 2k+1."""
+        nc, na = self.nc, self.na
+        n_c = nc * (na + 1)
+        n_h = nc * (na + 1)
+        n_v = nc * na
+        i, j = np.meshgrid(np.arange(nc), np.arange(na), indexing='ij')
+        i, j = i.ravel(), j.ravel()
+        i1 = (i + 1) % nc                       # closed ring
+
+        def corner(a, b): return a * (na + 1) + b
+        def hmid(a, b): return n_c + a * (na + 1) + b
+        def vmid(a, b): return n_c + n_h + a * na + b
+        def dmid(a, b): return n_c + n_h + n_v + a * na + b
+
+        a, b, c, d = corner(i, j), corner(i1, j), corner(i1, j + 1), corner(i, j + 1)
+        tri1 = np.stack([a, b, c, hmid(i, j), vmid(i1, j), dmid(i, j)], axis=1)
+        tri2 = np.stack([a, c, d, dmid(i, j), hmid(i, j + 1), vmid(i, j)], axis=1)
+        conn = np.stack([tri1, tri2], axis=1).reshape(-1, 6)
+        return conn + self.first_id
+
+
+def water_jacket_walls(elements):
+    """Walls of a water jacket with about `elements` Tri6 elements."""
+    walls = 2 * BORES
+    quads = max(elements // (2 * walls), 1)
+    perimeter = 2 * np.pi * (BORE_RADIUS + CHANNEL_WIDTH / 2)
+    nc = max(int(round(np.sqrt(quads * perimeter / HEIGHT))), 3)
+    na = max(quads // nc, 1)
+    out = []
+    for k in range(walls):
+        bore, outer = divmod(k, 2)
+        radius = BORE_RADIUS + outer * CHANNEL_WIDTH
+        out.append(Wall(bore * BORE_PITCH, radius, nc, na, k * ID_BLOCK + 1))
+    return out
+
+
+def _write_rows(f, fmt, rows):
+    """rows (N, k) with the k fields of fmt, formatted in blocks."""
+    for s in range(0, len(rows), BLOCK_ROWS):
+        block = rows[s:s + BLOCK_ROWS]
+        f.write((fmt * len(block)) % tuple(block.ravel().tolist()))
+
+
+def write_model(path, walls):
+    """*NODE + *ELEMENT, TYPE=S6 of the walls. Returns the element IDs."""
+    elem_ids = []
+    with open(path, 'w') as f:
+        f.write("** synthetic water jacket (benchmarks/synthetic.py)\n*NODE\n")
+        for wall in walls:
+            ids, xyz = wall.node_coords()
+            rows = np.empty((len(ids), 4), dtype=object)
+            rows[:, 0] = ids
+            rows[:, 1:] = xyz
+            _write_rows(f, "%d, %.6f, %.6f, %.6f\n", rows)
+        for k, wall in enumerate(walls):
+            conn = wall.elements()
+            ids = wall.first_id + np.arange(len(conn), dtype=np.int64)
+            f.write(f"*ELEMENT, TYPE=S6, ELSET=WJ_{k + 1}\n")
+            _write_rows(f, "%d, %d, %d, %d, %d, %d, %d\n", np.column_stack([ids, conn]))
+            elem_ids.append(ids)
+    return np.concatenate(elem_ids)
+
+
+# ============================================================
+# RESULTS
+# ============================================================
+def result_fields(walls, rng):
+    """TEMP [K] and HTC [W/m2K] per element: smooth field plus noise."""
+    temp, htc = [], []
+    for k, wall in enumerate(walls):
+        i, j = np.meshgrid(np.arange(wall.nc), np.arange(wall.na), indexing='ij')
+        t = np.repeat((i.ravel() + 0.5) * (2 * np.pi / wall.nc), 2)
+        z = np.repeat((j.ravel() + 0.5) / wall.na, 2)
+        temp.append(350.0 + 40.0 * z + 8.0 * np.cos(t + k) + rng.normal(0.0, 0.5, t.size))
+        htc.append(np.exp(8.5 + 0.8 * np.sin(2 * t) - 0.5 * z + rng.normal(0.0, 0.1, t.size)))
+    return np.concatenate(temp), np.concatenate(htc)
+
+
+def hole_mask(walls, rng, hole_fraction=0.05, hole_size=8):
+    """True = mapped. Holes are hole_size x hole_size quad patches (both
+    triangles), placed at random until about hole_fraction is unmapped."""
+    masks = []
+    total = sum(2 * w.nc * w.na for w in walls)
+    patches = int(round(hole_fraction * total / (2 * hole_size * hole_size)))
+    per_wall = np.bincount(rng.integers(0, len(walls), patches), minlength=len(walls))
+    for wall, n in zip(walls, per_wall):
+        mapped = np.ones((wall.nc, wall.na), dtype=bool)
+        size_a = min(hole_size, wall.na)
+        for i0, j0 in zip(rng.integers(0, wall.nc, n), rng.integers(0, wall.na - size_a + 1, n)):
+            rows = np.arange(i0, i0 + hole_size) % wall.nc
+            mapped[rows, j0:j0 + size_a] = False
+        masks.append(np.repeat(mapped.ravel(), 2))
+    return np.concatenate(masks)
+
+
+def write_film(path, elem_ids, temp, htc, face="FPOS", header=True):
+    """'id,FPOS,temp,htc' rows (CFD mapping result)."""
+    rows = np.empty((len(elem_ids), 3), dtype=object)
+    rows[:, 0], rows[:, 1], rows[:, 2] = elem_ids, temp, htc
+    with open(path, 'w') as f:
+        if header:
+            f.write("*FILM\n")
+        _write_rows(f, f"%d,{face},%.4f,%.6e\n", rows)
+
+
+def write_mapping_wj(path, elem_ids, temp, htc):
+    """mapping_WJ input of MAIN_PSJ_WJ: 'id, SPOS, temp[K], htc' below *FILM."""
+    rows = np.empty((len(elem_ids), 3), dtype=object)
+    rows[:, 0], rows[:, 1], rows[:, 2] = elem_ids, temp, htc
+    with open(path, 'w') as f:
+        f.write("*FILM\n")
+        _write_rows(f, "%d, SPOS, %.4f, %.4f\n", rows)
+
+
+def write_id_file(path, ids, name="BENCH_IDS", per_line=16):
+    with open(path, 'w') as f:
+        f.write(f"*ELSET, ELSET={name}\n")
+        full = len(ids) - len(ids) % per_line
+        if full:
+            _write_rows(f, ", ".join(["%d"] * per_line) + "\n", ids[:full].reshape(-1, per_line))
+        if len(ids) > full:
+            f.write(", ".join(str(v) for v in ids[full:].tolist()) + "\n")
+
+
+def write_htc_files(htc_path, table_path, ids, rng, htc_value=1.0e5):
+    with open(htc_path, 'w') as f:
+        f.write(f"** HTC value for Adjust_HTC_average\n{htc_value:.6e}\n")
+    factors = np.round(rng.uniform(0.8, 1.2, len(ids)), 3)
+    rows = np.empty((len(ids), 2), dtype=object)
+    rows[:, 0], rows[:, 1] = ids, factors
+    with open(table_path, 'w') as f:
+        f.write("*HTC, SCALE\n")
+        _write_rows(f, "%d, %.3f\n", rows)
+
+
+# ============================================================
+# DATASET
+# ============================================================
+def make_dataset(folder, elements, seed=0, hole_fraction=0.05, hole_size=8,
+                 id_fraction=0.1, reuse=True):
+    """Write every input of one size into `folder` (kept when it exists
+    and reuse=True). Returns a Dataset of the paths."""
+    os.makedirs(folder, exist_ok=True)
+    name = os.path.join(folder, f"wj_{elements}")
+    ds = Dataset(folder, elements, name + "_model.inp", name + "_film.inp",
+                 name + "_mapping_WJ.inp", name + "_ids.inp", name + "_htc.txt",
+                 name + "_htc_table.inp")
+    if reuse and all(os.path.isfile(p) for p in ds[2:]):
+        return ds._replace(elements=_count_elements(ds.mapping))
+
+    rng = np.random.default_rng(seed)
+    walls = water_jacket_walls(elements)
+    elem_ids = write_model(ds.model, walls)
+    temp, htc = result_fields(walls, rng)
+    mapped = hole_mask(walls, rng, hole_fraction, hole_size)
+    write_film(ds.film, elem_ids[mapped], temp[mapped], htc[mapped])
+    write_mapping_wj(ds.mapping, elem_ids, temp, htc)
+
+    subset = np.sort(rng.choice(elem_ids, max(int(len(elem_ids) * id_fraction), 1),
+                                replace=False))
+    write_id_file(ds.ids, subset)
+    write_htc_files(ds.htc, ds.table, subset, rng)
+    return ds._replace(elements=len(elem_ids))
+
+
+def _count_elements(mapping_path):
+    with open(mapping_path, 'rb') as f:
+        return sum(block.count(b"\n") for block in iter(lambda: f.read(1 << 24), b"")) - 1
@@ -0,0 +1,397 @@
+##############################################
+### GEOMETRIC REMAPPING OF CFD RESULTS
+##############################################
+### Maps TEMP / HTC of a CFD surface mesh onto any .inp surface mesh by
+### position, so element IDs do not have to match:
+###   nearest       value of the closest CFD face centroid
+###   idw           inverse-distance weighting of the k closest centroids
+###   barycentric   closest point on the nearest CFD faces (quads split
+###                 in two triangles), values interpolated from
+###                 area-weighted CFD nodal values
+### Only surface elements (mesh_store.surface_corners) are mapped, on both
+### sides; face centroids use all 3 / 4 corners.
+### Centroids are indexed once (scipy cKDTree when installed, else a
+### NumPy uniform grid) and target faces are queried in chunks, all
+### vectorised. Meshes come from mesh_cache / mesh_store, CFD values
+### from read_film (text or .film store); output is *FILM text or a
+### .film store.
+##############################################
+### Update: 18/10/2026
+##############################################
+
+import os
+
+import numpy as np
+
+from inp_reader import read_film
+from mesh_cache import load_mesh
+
+
+METHODS = ("nearest", "idw", "barycentric")
+CHUNK_ROWS = 1 << 16            # target faces per query block
+IDW_NEIGHBORS = 4
+IDW_POWER = 2.0
+BARY_CANDIDATES = 8             # CFD triangles tested per target face
+POINTS_PER_CELL = 4             # grid index: mean CFD centroids per cell
+BOX_WIDTHS = (2, 3, 5, 9, 17)   # grid index: searched box widths (cells)
+CANDIDATE_CELLS = 1 << 22       # grid index: (query, cell) pairs per batch
+DENSE_CELLS = 1 << 23           # grid index: cell table instead of a search
+
+
+# ============================================================
+# POINT INDEX
+# ============================================================
+class GridIndex:
+    """k-nearest-neighbour queries on a uniform grid of cells.
+
+    Points are sorted by cell; a query searches the box of w x w x w
+    cells centred on it (w = 2, 3, 5, 9, 17) and is final once its k-th
+    distance is no more than the distance to the edge of the box (every
+    point outside is further). Queries still open after the largest box
+    are compared with all points.
+    """
+
+    def __init__(self, xyz, cell=None):
+        self.xyz = np.ascontiguousarray(xyz, dtype=np.float64)
+        n = len(self.xyz)
+        self.lo = self.xyz.min(axis=0) if n else np.zeros(3)
+        extent = (self.xyz.max(axis=0) - self.lo) if n else np.ones(3)
+        if cell is None:
+            # surface meshes: points spread over ~ the two largest extents
+            e = np.sort(np.maximum(extent, 1e-12 * max(extent.max(), 1.0)))[::-1]
+            cell = np.sqrt(e[0] * e[1] * POINTS_PER_CELL / max(n, 1))
+            cell = max(cell, e[0] / 2 ** 20)
+        self.cell = float(cell)
+        self.dims = np.floor(extent / self.cell).astype(np.int64) + 1
+
+        key = self._keys(self._cells(self.xyz))
+        self.order = np.argsort(key, kind='stable')
+        sorted_keys = key[self.order]
+        self.cell_keys, self.cell_starts = np.unique(sorted_keys, return_index=True)
+        self.cell_ends = np.r_[self.cell_starts[1:], n]
+
+        # key -> cell slot (-1 = empty) as a table when the grid is small
+        self.slot_of = None
+        n_cells = int(np.prod(self.dims))
+        if n_cells <= DENSE_CELLS:
+            self.slot_of = np.full(n_cells, -1, dtype=np.int32)
+            self.slot_of[self.cell_keys] = np.arange(self.cell_keys.size, dtype=np.int32)
+
+    def _cells(self, xyz):
+        return np.clip(np.floor((xyz - self.lo) / self.cell).astype(np.int64), 0, self.dims - 1)
+
+    def _keys(self, cells):
+        return cells[:, 0] + self.dims[0] * (cells[:, 1] + self.dims[1] * cells[:, 2])
+
+    def _candidates(self, start, w):
+        """(query, point) pairs of the points in the w cells from `start`
+        along each axis, grouped by query."""
+        span = np.arange(w)
+        offsets = np.stack(np.meshgrid(span, span, span, indexing='ij'), axis=-1).reshape(-1, 3)
+        around = start[:, None, :] + offsets[None, :, :]
+        inside = ((around >= 0) & (around < self.dims)).all(axis=2)
+        owner = np.broadcast_to(np.arange(len(start))[:, None], inside.shape)[inside]
+        keys = self._keys(around[inside])
+
+        if self.slot_of is not None:
+            slot = self.slot_of[keys]
+        else:
+            pos = np.minimum(np.searchsorted(self.cell_keys, keys), max(self.cell_keys.size - 1, 0))
+            slot = np.where(self.cell_keys[pos] == keys, pos, -1) if self.cell_keys.size \
+                else np.full(keys.size, -1)
+        hit = slot >= 0
+        owner, pos_c = owner[hit], slot[hit]
+        starts, counts = self.cell_starts[pos_c], self.cell_ends[pos_c] - self.cell_starts[pos_c]
+
+        total = int(counts.sum())
+        first = np.repeat(np.cumsum(counts) - counts, counts)
+        points = self.order[np.repeat(starts, counts) + np.arange(total) - first]
+        return np.repeat(owner, counts), points
+
+    def _bound(self, xyz, start, w):
+        """Distance from each query to the outside of its searched box
+        (inf on sides where the box already reaches the grid edge)."""
+        gap_lo = np.where(start > 0, xyz - (self.lo + start * self.cell), np.inf)
+        end = start + w
+        gap_hi = np.where(end < self.dims, self.lo + end * self.cell - xyz, np.inf)
+        return np.minimum(gap_lo, gap_hi).min(axis=1)
+
+    def _search(self, xyz, start, part, w, k, dist, idx):
+        owner, points = self._candidates(start, w)
+        diff = xyz[part[owner]] - self.xyz[points]
+        d2 = np.einsum('ij,ij->i', diff, diff)
+
+        # k smallest per query from a (query, candidate) table
+        n_per = np.bincount(owner, minlength=part.size)
+        col = np.arange(owner.size) - (np.cumsum(n_per) - n_per)[owner]
+        width = max(int(n_per.max()), k)
+        table = np.full((part.size, width), np.inf)
+        table[owner, col] = d2
+        ids = np.full((part.size, width), -1, dtype=np.int64)
+        ids[owner, col] = points
+        if width > k:
+            sel = np.argpartition(table, k - 1, axis=1)[:, :k]
+            table = np.take_along_axis(table, sel, axis=1)
+            ids = np.take_along_axis(ids, sel, axis=1)
+        o = np.argsort(table, axis=1, kind='stable')
+        dist[part] = np.sqrt(np.take_along_axis(table, o, axis=1))
+        idx[part] = np.take_along_axis(ids, o, axis=1)
+
+    def _brute_force(self, xyz, part, k, dist, idx):
+        n = len(self.xyz)
+        kk = min(k, n)
+        step = max(1, CANDIDATE_CELLS // n)
+        for lo in range(0, part.size, step):
+            rows = part[lo:lo + step]
+            d = np.sqrt(((xyz[rows, None, :] - self.xyz[None, :, :]) ** 2).sum(axis=2))
+            near = np.argpartition(d, kk - 1, axis=1)[:, :kk]
+            dn = np.take_along_axis(d, near, axis=1)
+            o = np.argsort(dn, axis=1, kind='stable')
+            dist[rows, :kk] = np.take_along_axis(dn, o, axis=1)
+            idx[rows, :kk] = np.take_along_axis(near, o, axis=1)
+
+    def query(self, xyz, k):
+        """(dist, idx), both (Q, k): inf / -1 where fewer than k points."""
+        xyz = np.asarray(xyz, dtype=np.float64).reshape(-1, 3)
+        q = len(xyz)
+        dist = np.full((q, k), np.inf)
+        idx = np.full((q, k), -1, dtype=np.int64)
+        if not len(self.xyz) or not q:
+            return dist, idx
+
+        # cell coordinate of each query (may lie outside the grid)
+        u = (xyz - self.lo) / self.cell
+        pending = np.arange(q)
+        # k > 2 rarely fits the 2-cell box (its edge is only >= 0.5 cell away)
+        for w in BOX_WIDTHS[1 if k > 2 else 0:]:
+            if not pending.size:
+                break
+            # box centred on the query: >= (w - 1) / 2 cells to every edge
+            corner = np.floor(u + 0.5 * (1 - w % 2)).astype(np.int64) - w // 2
+            batch = max(1, CANDIDATE_CELLS // w ** 3 // 4)
+            still = []
+            for lo in range(0, pending.size, batch):
+                part = pending[lo:lo + batch]
+                self._search(xyz, corner[part], part, w, k, dist, idx)
+                still.append(part[dist[part, k - 1] > self._bound(xyz[part], corner[part], w)])
+            pending = np.concatenate(still)
+        if pending.size:
+            self._brute_force(xyz, pending, k, dist, idx)
+        return dist, idx
+
+
+class TreeIndex:
+    """scipy cKDTree with the GridIndex query interface."""
+
+    def __init__(self, xyz):
+        from scipy.spatial import cKDTree
+        self.n = len(xyz)
+        self.tree = cKDTree(xyz)
+
+    def query(self, xyz, k):
+        try:
+            dist, idx = self.tree.query(xyz, k=k, workers=-1)
+        except TypeError:
+            # scipy < 1.6
+            dist, idx = self.tree.query(xyz, k=k)
+        dist = np.asarray(dist, dtype=np.float64).reshape(len(xyz), k)
+        idx = np.asarray(idx, dtype=np.int64).reshape(len(xyz), k)
+        idx[idx >= self.n] = -1
+        return dist, idx
+
+
+def build_index(xyz, use_scipy=None):
+    """TreeIndex when scipy is installed (or use_scipy=True), else GridIndex."""
+    if use_scipy is not False:
+        try:
+            return TreeIndex(xyz)
+        except ImportError:
+            if use_scipy:
+                raise
+    return GridIndex(xyz)
+
+
+# ============================================================
+# SOURCE (CFD) FACES
+# ============================================================
+class SourceFaces:
+    """Mapped CFD surface faces: centroids, values and corner triangles
+    (F, 2, 3) node rows, a triangle face repeats its triangle."""
+
+    def __init__(self, mesh, values):
+        ok = (mesh.surface_corners > 0) & ~np.isnan(values).any(axis=1)
+        rows = np.flatnonzero(ok)
+        self.coords = mesh.coords
+        self.values = np.ascontiguousarray(values[rows])
+        self.centroids = mesh.centroids(rows)
+        self.triangles = mesh.face_triangles(rows)
+        self.quad = mesh.surface_corners[rows] == 4
+        self._node_values = None
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def node_values(self):
+        """(N, 2) per mesh node: area-weighted mean of its mapped faces."""
+        if self._node_values is None:
+            xyz = self.coords[self.triangles]                   # (F, 2, 3, 3)
+            n = np.cross(xyz[..., 1, :] - xyz[..., 0, :], xyz[..., 2, :] - xyz[..., 0, :])
+            area = 0.5 * np.sqrt(np.einsum('fti,fti->ft', n, n)) + 1e-300
+            area[~self.quad, 1] = 0.0                           # repeated triangle
+            rows = self.triangles.ravel()
+            area = area.ravel()
+            values = np.repeat(self.values, 2, axis=0)
+            weight = np.bincount(rows, np.repeat(area, 3), minlength=len(self.coords))
+            out = np.empty((len(self.coords), 2))
+            for j in range(2):
+                out[:, j] = np.bincount(rows, np.repeat(area * values[:, j], 3),
+                                        minlength=len(self.coords))
+            with np.errstate(invalid='ignore', divide='ignore'):
+                self._node_values = out / weight[:, None]
+        return self._node_values
+
+
+def load_source(cfd_mesh_file, cfd_result_file):
+    """SourceFaces of a CFD mesh .inp and its result (ID-matched once)."""
+    mesh = load_mesh(cfd_mesh_file)
+    return SourceFaces(mesh, mesh.result_table(read_film(cfd_result_file)))
+
+
+# ============================================================
+# INTERPOLATION
+# ============================================================
+def _closest_on_triangles(p, a, b, c):
+    """Barycentric (u, v, w) of the point of triangle abc closest to p,
+    all arrays (..., 3) (Ericson, Real-Time Collision Detection 5.1.5)."""
+    def dot(x, y):
+        return np.einsum('...i,...i->...', x, y)
+
+    ab, ac, ap = b - a, c - a, p - a
+    bp, cp = p - b, p - c
+    d1, d2 = dot(ab, ap), dot(ac, ap)
+    d3, d4 = dot(ab, bp), dot(ac, bp)
+    d5, d6 = dot(ab, cp), dot(ac, cp)
+    va, vb, vc = d3 * d6 - d5 * d4, d5 * d2 - d1 * d6, d1 * d4 - d3 * d2
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        denom = va + vb + vc
+        v, w = vb / denom, vc / denom
+        bary = np.stack([1.0 - v - w, v, w], axis=-1)
+
+        # regions, lowest priority first (later ones win)
+        def put(mask, u_, v_, w_):
+            bary[mask] = np.stack([u_, v_, w_], axis=-1)[mask]
+
+        t = (d4 - d3) / ((d4 - d3) + (d5 - d6))
+        put((va <= 0) & (d4 - d3 >= 0) & (d5 - d6 >= 0), 0 * t, 1 - t, t)
+        t = d2 / (d2 - d6)
+        put((vb <= 0) & (d2 >= 0) & (d6 <= 0), 1 - t, 0 * t, t)
+        one, zero = np.ones_like(d1), np.zeros_like(d1)
+        put((d6 >= 0) & (d5 <= d6), zero, zero, one)
+        t = d1 / (d1 - d3)
+        put((vc <= 0) & (d1 >= 0) & (d3 <= 0), 1 - t, t, 0 * t)
+        put((d3 >= 0) & (d4 <= d3), zero, one, zero)
+        put((d1 <= 0) & (d2 <= 0), one, zero, zero)
+
+    # degenerate triangles: nearest corner
+    bad = ~np.isfinite(bary).all(axis=-1)
+    if bad.any():
+        corner = np.argmin(np.stack([dot(ap, ap), dot(bp, bp), dot(cp, cp)], axis=-1), axis=-1)
+        bary[bad] = np.eye(3)[corner[bad]]
+    return bary
+
+
+def _map_chunk(source, index, points, method, k, power):
+    if method == "nearest":
+        dist, idx = index.query(points, 1)
+        return source.values[idx[:, 0]], dist[:, 0]
+
+    if method == "idw":
+        dist, idx = index.query(points, k)
+        found = idx >= 0
+        with np.errstate(divide='ignore'):
+            w = np.where(found, 1.0 / np.maximum(dist, 1e-300) ** power, 0.0)
+        exact = dist[:, 0] == 0.0
+        w[exact] = 0.0
+        w[exact, 0] = 1.0
+        values = np.einsum('qk,qkj->qj', w, source.values[np.maximum(idx, 0)])
+        return values / w.sum(axis=1)[:, None], dist[:, 0]
+
+    # barycentric: best triangle of the BARY_CANDIDATES nearest faces
+    _, idx = index.query(points, BARY_CANDIDATES)
+    found = np.repeat(idx >= 0, 2, axis=1)
+    tri = source.triangles[np.maximum(idx, 0)].reshape(len(points), -1, 3)  # (Q, 2K, 3)
+    xyz = source.coords[tri]                                    # (Q, K, 3, 3)
+    p = np.broadcast_to(points[:, None, :], xyz.shape[:2] + (3,))
+    bary = _closest_on_triangles(p, xyz[..., 0, :], xyz[..., 1, :], xyz[..., 2, :])
+    closest = np.einsum('qkc,qkci->qki', bary, xyz)
+    dist = np.sqrt(((closest - p) ** 2).sum(axis=-1))
+    dist[~found] = np.inf
+    best = np.argmin(dist, axis=1)
+    rows = np.arange(len(points))
+    values = np.einsum('qc,qcj->qj', bary[rows, best], source.node_values[tri[rows, best]])
+    return values, dist[rows, best]
+
+
+def remap_points(source, points, method="nearest", k=IDW_NEIGHBORS, power=IDW_POWER,
+                 max_distance=None, index=None, chunk_rows=CHUNK_ROWS):
+    """(P, 2) [temp, htc] at target points, NaN beyond max_distance or
+    where nothing is mapped. `index` can be reused across calls."""
+    if method not in METHODS:
+        raise ValueError(f"Unknown method {method}, expected one of {METHODS}")
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    out = np.full((len(points), 2), np.nan)
+    if not len(source):
+        return out
+    index = index or build_index(source.centroids)
+
+    valid = np.flatnonzero(~np.isnan(points).any(axis=1))
+    for lo in range(0, valid.size, chunk_rows):
+        rows = valid[lo:lo + chunk_rows]
+        values, dist = _map_chunk(source, index, points[rows], method, k, power)
+        if max_distance is not None:
+            values[dist > max_distance] = np.nan
+        out[rows] = values
+    return out
+
+
+# ============================================================
+# FILES
+# ============================================================
+def remap_to_mesh(source, target_inp, method="nearest", max_distance=None, **kw):
+    """(target mesh, (M, 2) values per target element row), NaN for
+    elements that are not surface elements."""
+    mesh = load_mesh(target_inp)
+    return mesh, remap_points(source, mesh.centroids(), method,
+                              max_distance=max_distance, **kw)
+
+
+def remap_files(cfd_mesh_file, cfd_result_file, target_inp, out_file=None,
+                method="nearest", face="FPOS", max_distance=None, store=False, **kw):
+    """Map a CFD result onto the faces of target_inp and write *FILM rows
+    (or a .film store) for every mapped target element.
+    Returns (out_file, mapped, unmapped)."""
+    from film_store import FilmStore, write_film_inp, write_film_store
+
+    source = load_source(cfd_mesh_file, cfd_result_file)
+    mesh, values = remap_to_mesh(source, target_inp, method, max_distance, **kw)
+
+    ok = ~np.isnan(values).any(axis=1)
+    order = np.argsort(mesh.elem_ids, kind='stable')
+    order = order[ok[order]]
+    films = FilmStore(None, mesh.elem_ids[order].astype(np.int64),
+                      np.zeros(order.size, dtype=np.uint8),
+                      values[order, 0], values[order, 1], [face])
+
+    stem = os.path.splitext(target_inp)[0] + "_REMAP"
+    if store:
+        out_file = out_file or stem + ".film"
+        write_film_store(films, out_file,
+                         source={"cfd_mesh": os.path.abspath(cfd_mesh_file),
+                                 "cfd_result": os.path.abspath(cfd_result_file),
+                                 "method": method})
+    else:
+        out_file = out_file or stem + ".inp"
+        write_film_inp(films, out_file)
+    return out_file, int(order.size), int(len(mesh) - order.size)
@@ -2,54 +2,405 @@
 # OUT_Temp = IN_TEMP - 273.15
 # OUT_HTC = IN_HTC/1000^2
 ## Witer: Ikeda
+#
+# Large files are split into byte-range chunks (cut at line ends) that are
+# converted on separate cores; the *FILM block state at each chunk start is
+# found in one forward pass over the chunks (last keyword line of each
+# chunk) before they are submitted. Several files are
+# converted concurrently through the same process pool.
+#
+# Numeric kernels:
+#   "python" : float() / format per line
+#   "numpy"  : fields located on the raw bytes, bulk float64 parse and
+#              vectorised arithmetic
+#   "auto"   : numpy for *FILM blocks with many lines when it is installed
+#
+# A film store folder (film_store.py, binary columns) is converted column
+# by column into a store of the same name in the output folder.
+#
+# Command line:
+#   python chang_unit_CFDmapping.py [files/folder ...] [-o OUT] [-j JOBS]
+#                                   [--kernel auto|python|numpy]
+# Without arguments every .txt file next to this script is converted into
+# ./output_files (the original behaviour).
 
+import argparse
 import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
 
-# access folder input
-current_dir = os.path.dirname(os.path.abspath(__file__))
+from perf_trace import phase, traced
 
-input_folder = current_dir
-output_folder = os.path.join(current_dir, "output_files")
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
-if not os.path.exists(output_folder):
-    os.makedirs(output_folder)
+KELVIN_OFFSET = 273.15
+HTC_SCALE = 1_000_000
 
-def process_file(input_path, output_path):
-    with open(input_path, "r", encoding="utf-8") as f:
-        lines = f.readlines()
+CHUNK_SIZE = 32 << 20          # bytes per chunk
+NUMPY_MIN_LINES = 2000         # "auto" uses numpy above this many film lines
 
-    new_lines = []
-    inside_film = False
 
-    for line in lines:
-        stripped = line.strip()
-        if stripped.startswith("*FILM"):
-            inside_film = True
-            new_lines.append(line)
+# ============================================================
+# LINE CONVERSION
+# ============================================================
+def _fmt(value):
+    return f"{value:.10g}"
+
+
+def _convert_python(stripped):
+    # Returns the converted line, or None when the line is kept as is
+    parts = stripped.split(",")
+    if len(parts) >= 4:
+        try:
+            val3 = float(parts[2]) - KELVIN_OFFSET           # TEMP
+            val4 = float(parts[3]) / HTC_SCALE               # HTC
+            parts[2] = _fmt(val3)
+            parts[3] = _fmt(val4)
+            return ",".join(parts) + "\n"
+        except ValueError:
+            pass
+    return None
+
+
+def _ranges(starts, ends):
+    # Concatenated index ranges [starts[i], ends[i]) + one terminator index
+    lengths = ends - starts + 1
+    offsets = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return np.repeat(starts, lengths) + (np.arange(lengths.sum()) - offsets)
+
+
+_BLANK_BYTES = (9, 10, 11, 12, 13, 32)
+
+
+def _blank_fields(buf, starts, ends):
+    """True for the fields buf[starts:ends] that are empty or whitespace
+    only: np.fromstring reads them as -1.0, float() rejects them."""
+    idx = _ranges(starts, ends)
+    filled = ~np.isin(buf[np.minimum(idx, buf.size - 1)], _BLANK_BYTES)
+    ends_at = np.cumsum(ends - starts + 1) - 1
+    filled[ends_at] = False
+    return np.add.reduceat(filled, ends_at - (ends - starts)) == 0
+
+
+def _parse_fields(buf, starts, ends):
+    """float64 values of the byte fields buf[starts:ends], or None when one
+    of them is not a plain number (the caller then uses float())."""
+    idx = _ranges(starts, ends)
+    data = buf[np.minimum(idx, buf.size - 1)].copy()
+    data[np.cumsum(ends - starts + 1) - 1] = ord(",")
+    text = data[:-1].tobytes().decode("ascii")
+    try:
+        with warnings.catch_warnings():
+            # older NumPy warns and stops at bad data, newer raises
+            warnings.simplefilter("ignore", DeprecationWarning)
+            values = np.fromstring(text, dtype=np.float64, sep=",")
+    except ValueError:
+        return None
+    return values if values.size == starts.size else None
+
+
+def _convert_numpy(stripped_lines):
+    """Convert many film data lines at once. Same result as _convert_python.
+
+    Field positions are located on the raw bytes and TEMP / HTC are parsed
+    in bulk; only the output formatting is done per line.
+    """
+    blob = "\n".join(stripped_lines)
+    data = blob.encode("utf-8")
+    if len(data) != len(blob) or not stripped_lines:
+        # non-ASCII text: byte offsets != str offsets
+        return [_convert_python(s) for s in stripped_lines]
+
+    buf = np.frombuffer(data, dtype=np.uint8)
+    n = len(stripped_lines)
+    newlines = np.flatnonzero(buf == 10)
+    line_start = np.r_[0, newlines + 1]
+    line_end = np.r_[newlines, buf.size]
+
+    commas = np.flatnonzero(buf == 44)
+    comma_line = np.searchsorted(line_start, commas, side="right") - 1
+    count = np.bincount(comma_line, minlength=n)
+    first = np.searchsorted(comma_line, np.arange(n))
+
+    rows = np.flatnonzero(count >= 3)           # >= 4 fields
+    out = [None] * n
+    if not rows.size:
+        return out
+
+    f = first[rows]
+    c2, c3 = commas[f + 1], commas[f + 2]
+    c4 = np.where(count[rows] >= 4, commas[np.minimum(f + 3, commas.size - 1)], line_end[rows])
+
+    # lines with a blank TEMP / HTC field: float() rules line by line
+    blank = _blank_fields(buf, c2 + 1, c3) | _blank_fields(buf, c3 + 1, c4)
+    if blank.any():
+        for i in rows[blank].tolist():
+            out[i] = _convert_python(stripped_lines[i])
+        keep = ~blank
+        rows, c2, c3, c4 = rows[keep], c2[keep], c3[keep], c4[keep]
+        if not rows.size:
+            return out
+
+    temp = _parse_fields(buf, c2 + 1, c3)
+    htc = _parse_fields(buf, c3 + 1, c4)
+    if temp is None or htc is None:
+        return [_convert_python(s) for s in stripped_lines]
+
+    temp = (temp - KELVIN_OFFSET).tolist()
+    htc = (htc / HTC_SCALE).tolist()
+    head = (c2 + 1 - line_start[rows]).tolist()
+    tail = (c4 - line_start[rows]).tolist()
+
+    # "%.10g" gives the same text as _fmt()
+    for i, h, t, vt, vh in zip(rows.tolist(), head, tail, temp, htc):
+        s = stripped_lines[i]
+        out[i] = "%s%.10g,%.10g%s\n" % (s[:h], vt, vh, s[t:])
+    return out
+
+
+def _split_lines(text):
+    # Split on "\n" only, like iterating over a text file
+    # (str.splitlines() would also split on \x0b, \x1c, \u2028, ...)
+    lines = text.split("\n")
+    last = lines.pop()
+    lines = [line + "\n" for line in lines]
+    if last:
+        lines.append(last)
+    return lines
+
+
+def film_blocks(lines, inside_film):
+    """Row ranges [(start, end), ...] of *FILM data lines, and the *FILM
+    state after the last line. Only lines containing '*' are inspected."""
+    blocks = []
+    start = 0 if inside_film else None      # first data row of the open block
+    for i in [i for i, line in enumerate(lines) if "*" in line]:
+        stripped = lines[i].strip()
+        if not stripped.startswith("*"):
             continue
-        if inside_film and stripped.startswith("*") and not stripped.startswith("*FILM"):
-            inside_film = False
-
-        if inside_film and not stripped.startswith("*"):
-            parts = stripped.split(",")
-            if len(parts) >= 4:
-                try:
-                    val3 = float(parts[2]) - 273.15           # TEMP
-                    val4 = float(parts[3]) / 1_000_000         # HTC
-                    parts[2] = f"{val3:.10g}"
-                    parts[3] = f"{val4:.10g}"
-                    line = ",".join(parts) + "\n"
-                except ValueError:
-                    pass
-        new_lines.append(line)
-
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.writelines(new_lines)
-
-# Confirm output file processing
-for filename in os.listdir(input_folder):
-    if filename.endswith(".txt"):
-        input_path = os.path.join(input_folder, filename)
-        output_path = os.path.join(output_folder, filename)
-        process_file(input_path, output_path)
-        print(f"Finished: {filename}")
+        if start is not None and start < i:
+            blocks.append((start, i))
+        start = i + 1 if stripped.startswith("*FILM") else None
+    if start is not None and start < len(lines):
+        blocks.append((start, len(lines)))
+    return blocks, start is not None
+
+
+def convert_text(text, inside_film, kernel="auto"):
+    """Convert one block of text (universal newlines already applied).
+
+    Returns (converted text, *FILM state at the end of the block).
+    """
+    out = _split_lines(text)
+    blocks, inside_film = film_blocks(out, inside_film)
+
+    for start, end in blocks:
+        stripped = [line.strip() for line in out[start:end]]
+        use_numpy = np is not None and (
+            kernel == "numpy" or (kernel == "auto" and len(stripped) >= NUMPY_MIN_LINES))
+        if use_numpy:
+            converted = _convert_numpy(stripped)
+        else:
+            converted = [_convert_python(s) for s in stripped]
+        out[start:end] = [old if new is None else new
+                          for old, new in zip(out[start:end], converted)]
+
+    return "".join(out), inside_film
+
+
+def _decode(data):
+    # Same text as reading the file with open(..., "r", encoding="utf-8")
+    return data.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+
+
+# ============================================================
+# CHUNKS
+# ============================================================
+def split_chunks(input_path, chunk_size=CHUNK_SIZE):
+    """Byte ranges [start, end) covering the file, each ending at a line end."""
+    size = os.path.getsize(input_path)
+    bounds = [0]
+    with open(input_path, "rb") as f:
+        pos = chunk_size
+        while pos < size:
+            f.seek(pos)
+            f.readline()                # move to the start of the next line
+            end = f.tell()
+            if end >= size:
+                break
+            if end > bounds[-1]:
+                bounds.append(end)
+            pos = max(end, bounds[-1]) + chunk_size
+    bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _last_keyword_state(data, inside_film):
+    """*FILM state after the block `data` (whole lines): the state of its
+    last keyword line (first non-blank byte '*'), else unchanged."""
+    pos = len(data)
+    while True:
+        pos = data.rfind(b"*", 0, pos)
+        if pos < 0:
+            return inside_film
+        line_start = data.rfind(b"\n", 0, pos) + 1
+        if not data[line_start:pos].strip():
+            line_end = data.find(b"\n", pos)
+            line = data[line_start:line_end if line_end >= 0 else None]
+            return _decode(line).strip().startswith("*FILM")
+
+
+def film_states(input_path, chunks):
+    """*FILM state at the start of each chunk of split_chunks(), from one
+    forward pass over the file (only keyword lines are looked at)."""
+    states = []
+    inside_film = False
+    with open(input_path, "rb") as f:
+        for start, end in chunks:
+            states.append(inside_film)
+            f.seek(start)
+            inside_film = _last_keyword_state(f.read(end - start), inside_film)
+    return states
+
+
+def convert_chunk(input_path, start, end, inside_film, kernel="auto"):
+    with open(input_path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    text, _ = convert_text(_decode(data), inside_film, kernel)
+    return text
+
+
+# ============================================================
+# FILES
+# ============================================================
+def convert_store(input_path, output_path):
+    from film_store import load_film_store, write_film_store
+    store = load_film_store(input_path)
+    float32 = store.temp.dtype == np.float32
+    converted = type(store)(output_path, np.array(store.ids), np.array(store.faces),
+                            store.temp.astype(np.float64) - KELVIN_OFFSET,
+                            store.htc.astype(np.float64) / HTC_SCALE, store.labels)
+    del store
+    write_film_store(converted, output_path, float32)
+
+
+def process_file(input_path, output_path, kernel="auto", chunk_size=CHUNK_SIZE):
+    """Convert one file in this process, streaming chunk by chunk."""
+    with traced("unit", input=input_path, kernel=kernel) as run:
+        if os.path.isdir(input_path):
+            with phase("convert store"):
+                convert_store(input_path, output_path)
+            return
+
+        inside_film = False
+        lines = 0
+        with open(input_path, "rb") as fin, \
+             open(output_path, "w", encoding="utf-8") as fout:
+            for start, end in split_chunks(input_path, chunk_size):
+                with phase("read", nbytes=end - start):
+                    fin.seek(start)
+                    data = _decode(fin.read(end - start))
+                with phase("convert") as p:
+                    text, inside_film = convert_text(data, inside_film, kernel)
+                    p.rows = text.count("\n")
+                    lines += p.rows
+                with phase("write", nbytes=len(text)):
+                    fout.write(text)
+        run.rows, run.nbytes = lines, os.path.getsize(input_path)
+
+
+def convert_files(jobs_list, jobs=None, kernel="auto", chunk_size=CHUNK_SIZE):
+    """Convert [(input_path, output_path), ...] on a process pool.
+
+    All chunks of all files share one pool, so small files run side by
+    side and large files are split over every core. Chunk results are
+    written in order and at most 2 x jobs chunks are kept in memory.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1:
+        for input_path, output_path in jobs_list:
+            process_file(input_path, output_path, kernel, chunk_size)
+            yield input_path
+        return
+
+    # Stores are a few vector operations, no need for the pool
+    for input_path, output_path in jobs_list:
+        if os.path.isdir(input_path):
+            convert_store(input_path, output_path)
+            yield input_path
+    jobs_list = [job for job in jobs_list if not os.path.isdir(job[0])]
+
+    tasks = []                          # (file index, start, end, *FILM state)
+    remaining = []
+    for k, (input_path, _) in enumerate(jobs_list):
+        chunks = split_chunks(input_path, chunk_size)
+        remaining.append(len(chunks))
+        states = film_states(input_path, chunks)
+        tasks += [(k, start, end, state) for (start, end), state in zip(chunks, states)]
+
+    outputs = {}
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        pending = []
+        next_task = 0
+        while next_task < len(tasks) or pending:
+            while next_task < len(tasks) and len(pending) < 2 * jobs:
+                k, start, end, state = tasks[next_task]
+                pending.append((k, pool.submit(convert_chunk, jobs_list[k][0],
+                                                start, end, state, kernel)))
+                next_task += 1
+
+            k, fut = pending.pop(0)
+            if k not in outputs:
+                outputs[k] = open(jobs_list[k][1], "w", encoding="utf-8")
+            outputs[k].write(fut.result())
+            remaining[k] -= 1
+            if remaining[k] == 0:
+                outputs.pop(k).close()
+                yield jobs_list[k][0]
+
+
+# ============================================================
+# MAIN
+# ============================================================
+def main(argv=None):
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+
+    parser = argparse.ArgumentParser(description="K -> C and HTC / 1e6 for CFD *FILM files")
+    parser.add_argument("inputs", nargs="*", help="files or folders (default: .txt next to this script)")
+    parser.add_argument("-o", "--output-folder", default=None)
+    parser.add_argument("-j", "--jobs", type=int, default=None)
+    parser.add_argument("--kernel", choices=("auto", "python", "numpy"), default="auto")
+    parser.add_argument("--chunk-mb", type=int, default=CHUNK_SIZE >> 20)
+    args = parser.parse_args(argv)
+
+    # access folder input
+    inputs = args.inputs or [current_dir]
+    output_folder = args.output_folder or os.path.join(current_dir, "output_files")
+
+    if not os.path.exists(output_folder):
+        os.makedirs(output_folder)
+
+    files = []
+    for path in inputs:
+        if os.path.isfile(os.path.join(path, "meta.json")):      # film store
+            files.append(path)
+        elif os.path.isdir(path):
+            files += [os.path.join(path, name) for name in sorted(os.listdir(path))
+                      if name.endswith(".txt")]
+        else:
+            files.append(path)
+
+    jobs_list = [(p, os.path.join(output_folder, os.path.basename(os.path.normpath(p))))
+                 for p in files]
+
+    # Confirm output file processing
+    for input_path in convert_files(jobs_list, args.jobs, args.kernel, args.chunk_mb << 20):
+        print(f"Finished: {os.path.basename(input_path)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+##############################################
+### BINARY COLUMNAR STORE FOR CFD MAPPING RESULTS
+##############################################
+### A mapping result ('id, FPOS, temp, htc' rows) parsed once and kept
+### as a folder of .npy columns:
+###     <name>.film/
+###         ids.npy      int32 (int64 when an ID does not fit)
+###         faces.npy    uint8, index into the face labels of meta.json
+###         temp.npy     float64 (float32 on request)
+###         htc.npy      float64 (float32 on request)
+###         meta.json    format, version, rows, face labels, source file
+### The columns are memory-mapped on load (members of an .npz cannot be),
+### so opening a 30M row store costs no parsing. Every tool that reads a
+### result file accepts a store folder instead; text is only written
+### when an .inp is emitted (write_film_inp, extraction, ...).
+##############################################
+### Update: 18/10/2026
+##############################################
+
+import json
+import os
+
+import numpy as np
+
+from inp_reader import read_film
+
+
+STORE_FORMAT = "film-store"
+STORE_VERSION = 1
+STORE_SUFFIX = ".film"
+META_NAME = "meta.json"
+
+BLOCK_ROWS = 1 << 20            # rows formatted / scanned per block
+
+_INT32 = np.iinfo(np.int32)
+
+
+# ============================================================
+# STORE
+# ============================================================
+def is_film_store(path):
+    return os.path.isfile(os.path.join(path, META_NAME))
+
+
+def store_path(result_file):
+    """Default store folder of a text result file."""
+    return os.path.splitext(result_file)[0] + STORE_SUFFIX
+
+
+class FilmStore:
+    """Film columns with the attributes of inp_reader.FilmTable
+    (ids, faces, temp, htc, labels), as NumPy arrays."""
+
+    __slots__ = ('path', 'ids', 'faces', 'temp', 'htc', 'labels')
+
+    def __init__(self, path, ids, faces, temp, htc, labels):
+        self.path = path
+        self.ids = ids
+        self.faces = faces
+        self.temp = temp
+        self.htc = htc
+        self.labels = list(labels)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def as_dict(self):
+        """{eid: (temp, htc)} - last row wins, like FilmTable.as_dict()."""
+        return dict(zip(self.ids.tolist(), zip(self.temp.tolist(), self.htc.tolist())))
+
+    def blocks(self, block_rows=BLOCK_ROWS):
+        """(first row, end row) ranges of at most block_rows rows."""
+        n = len(self)
+        return [(lo, min(lo + block_rows, n)) for lo in range(0, n, block_rows)]
+
+    def iter_rows(self, block_rows=BLOCK_ROWS):
+        """(element_id, temp, htc) Python values, block by block."""
+        for lo, hi in self.blocks(block_rows):
+            yield from zip(self.ids[lo:hi].tolist(), self.temp[lo:hi].tolist(),
+                           self.htc[lo:hi].tolist())
+
+    def format_rows(self, rows):
+        """'id, FACE, temp, htc' text lines of the given rows."""
+        rows = np.asarray(rows, dtype=np.int64)
+        labels = self.labels
+        faces = [labels[c] for c in self.faces[rows].tolist()]
+        if self.temp.dtype == np.float32:
+            template = "%d, %s, %.9g, %.9g\n"       # round-trips float32
+        else:
+            template = "%d, %s, %r, %r\n"           # shortest round-trip text
+        return "".join([template % row for row in zip(
+            self.ids[rows].tolist(), faces, self.temp[rows].tolist(), self.htc[rows].tolist())])
+
+
+def load_film_store(path):
+    """FilmStore of a store folder, columns memory-mapped (read-only)."""
+    with open(os.path.join(path, META_NAME), 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    if meta.get("format") != STORE_FORMAT or meta.get("version") != STORE_VERSION:
+        raise ValueError(f"Not a film store (version {STORE_VERSION}): {path}")
+
+    columns = {name: np.load(os.path.join(path, name + ".npy"), mmap_mode='r')
+               for name in ("ids", "faces", "temp", "htc")}
+    if any(len(col) != meta["rows"] for col in columns.values()):
+        raise ValueError(f"Damaged film store: {path}")
+    return FilmStore(path, labels=meta["labels"], **columns)
+
+
+def _save_column(folder, name, arr):
+    # np.save appends '.npy' to names that do not end with it
+    tmp = os.path.join(folder, name + ".tmp.npy")
+    np.save(tmp, np.ascontiguousarray(arr))
+    os.replace(tmp, os.path.join(folder, name + ".npy"))
+
+
+def write_film_store(films, out_dir, float32=False, source=None):
+    """Write a FilmTable / FilmStore as a store folder. meta.json is
+    written last, so a partly written store is never read."""
+    ids = np.asarray(films.ids, dtype=np.int64)
+    if not ids.size or (ids.min() >= _INT32.min and ids.max() <= _INT32.max):
+        ids = ids.astype(np.int32)
+    float_type = np.float32 if float32 else np.float64
+    columns = {
+        "ids": ids,
+        "faces": np.asarray(films.faces, dtype=np.uint8),
+        "temp": np.asarray(films.temp, dtype=float_type),
+        "htc": np.asarray(films.htc, dtype=float_type),
+    }
+
+    os.makedirs(out_dir, exist_ok=True)
+    meta_path = os.path.join(out_dir, META_NAME)
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+    for name, arr in columns.items():
+        _save_column(out_dir, name, arr)
+
+    meta = {
+        "format": STORE_FORMAT,
+        "version": STORE_VERSION,
+        "rows": int(ids.size),
+        "labels": list(films.labels),
+        "source": source,
+    }
+    tmp = meta_path + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=1)
+    os.replace(tmp, meta_path)
+    return out_dir
+
+
+# ============================================================
+# CONVERSION
+# ============================================================
+def convert_to_store(result_file, out_dir=None, float32=False):
+    """Parse a text result file once (read_film rules) into a store.
+    Returns (store folder, rows)."""
+    out_dir = out_dir or store_path(result_file)
+    films = read_film(result_file)
+    st = os.stat(result_file)
+    source = {"file": os.path.abspath(result_file), "size": st.st_size,
+              "mtime_ns": st.st_mtime_ns}
+    write_film_store(films, out_dir, float32, source)
+    return out_dir, len(films)
+
+
+def write_film_inp(films, out_file, block_rows=BLOCK_ROWS):
+    """Emit a store (or FilmTable) as a *FILM .inp text file."""
+    store = films if isinstance(films, FilmStore) else FilmStore(
+        None, np.asarray(films.ids), np.asarray(films.faces, dtype=np.uint8),
+        np.asarray(films.temp), np.asarray(films.htc), films.labels)
+    with open(out_file, 'w', encoding='utf-8') as fout:
+        fout.write("*FILM\n")
+        for lo, hi in store.blocks(block_rows):
+            fout.write(store.format_rows(np.arange(lo, hi)))
+    return out_file, len(store)
@@ -0,0 +1,159 @@
+##############################################
+### BATCHED WRITER FOR THE WJ HEAT FILES
+##############################################
+### Writes _HEAT_filmprop / _HEAT_sfilm / _HEAT_surface (same text as the
+### per-line writer in MAIN_PSJ_WJ) from blocks of rows:
+###   - the rows of a block are formatted with one %-template per file and
+###     joined with str.join (one buffer per file and block)
+###   - each buffer is written with a single write() call
+###   - optionally a background thread does the writing, so parsing /
+###     formatting of the next block overlaps with the file I/O
+##############################################
+### Update: 18/10/2026
+##############################################
+
+import os
+import queue
+import threading
+from itertools import islice
+
+
+FILMPROP_NAME = "_HEAT_filmprop_WJ.inp"
+SFILM_NAME = "_HEAT_sfilm_WJ.inp"
+SURFACE_NAME = "_HEAT_surface_WJ.inp"
+
+BATCH_ROWS = 65536              # rows formatted per block
+FILE_BUFFER = 1 << 20           # io buffer of each output file
+QUEUE_DEPTH = 4                 # blocks waiting for the writer thread
+
+# "%e" gives the same text as f"{x:e}"
+FILMPROP_ROW = ("*FILM PROPERTY, NAME=FPnwjc1_%d\n"
+                "%e, 0.0\n"
+                "%e, 140.0\n"
+                "%e, 160.0\n"
+                "%e, 200.0\n")
+SURFACE_ROW = "*SURFACE, NAME=SEwj_%d , TYPE=ELEMENT\n%s, SPOS\n"
+SFILM_ROW = "SEwj_%d, F, %e, FPnwjc1_%d\n"
+
+
+# ============================================================
+# BLOCK FORMATTING
+# ============================================================
+def format_block(first_index, ids, temps_kelvin, htc_values):
+    """Text of one block of rows for (filmprop, surface, sfilm)."""
+    index = range(first_index, first_index + len(ids))
+    htc_scaled = [h / 1_000_000 for h in htc_values]
+    temp_celsius = [t - 273.15 for t in temps_kelvin]
+
+    filmprop = "".join([FILMPROP_ROW % (i, h, h, h * 1.25, h * 2.5)
+                        for i, h in zip(index, htc_scaled)])
+    surface = "".join([SURFACE_ROW % (i, nid) for i, nid in zip(index, ids)])
+    sfilm = "".join([SFILM_ROW % (i, t, i) for i, t in zip(index, temp_celsius)])
+    return filmprop, surface, sfilm
+
+
+# ============================================================
+# WRITER THREAD
+# ============================================================
+class _WriterThread(threading.Thread):
+    """Writes (file, text) items from a bounded queue."""
+
+    def __init__(self, depth=QUEUE_DEPTH):
+        super().__init__(daemon=True)
+        self.items = queue.Queue(maxsize=depth)
+        self.error = None
+
+    def run(self):
+        while True:
+            item = self.items.get()
+            if item is None:
+                return
+            if self.error is None:
+                try:
+                    for f, text in item:
+                        f.write(text)
+                except BaseException as e:
+                    # any failure: keep draining so put() never blocks,
+                    # raise in put() / close()
+                    self.error = e
+
+    def put(self, item):
+        if self.error is not None:
+            raise self.error
+        self.items.put(item)
+
+    def close(self):
+        self.items.put(None)
+        self.join()
+        if self.error is not None:
+            raise self.error
+
+
+# ============================================================
+# WRITER
+# ============================================================
+class HeatWriter:
+    """
+    with HeatWriter(folder, threaded=True) as w:
+        w.extend(rows)          # rows: (element_id, temp_kelvin, htc_value)
+    w.count                     # number of written rows
+    """
+
+    def __init__(self, output_folder, threaded=False, batch_rows=BATCH_ROWS):
+        self.batch_rows = batch_rows
+        self.count = 0
+        self.files = []
+        try:
+            for name in (FILMPROP_NAME, SURFACE_NAME, SFILM_NAME):
+                path = os.path.join(output_folder, name)
+                self.files.append(open(path, 'w', buffering=FILE_BUFFER))
+        except OSError:
+            self._close_files()
+            raise
+        self.thread = _WriterThread() if threaded else None
+        if self.thread is not None:
+            self.thread.start()
+        self._write([(self.files[2], "*SFILM\n")])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _write(self, items):
+        if self.thread is None:
+            for f, text in items:
+                f.write(text)
+        else:
+            self.thread.put(items)
+
+    def write_block(self, ids, temps_kelvin, htc_values):
+        """Write one block of rows given as columns."""
+        if not ids:
+            return
+        texts = format_block(self.count + 1, ids, temps_kelvin, htc_values)
+        self._write(list(zip(self.files, texts)))
+        self.count += len(ids)
+
+    def extend(self, rows):
+        """Write (element_id, temp_kelvin, htc_value) rows in blocks."""
+        rows = iter(rows)
+        while True:
+            block = list(islice(rows, self.batch_rows))
+            if not block:
+                return
+            self.write_block(*map(list, zip(*block)))
+
+    def _close_files(self):
+        for f in self.files:
+            f.close()
+        self.files = []
+
+    def close(self):
+        try:
+            if self.thread is not None:
+                thread, self.thread = self.thread, None
+                thread.close()
+        finally:
+            self._close_files()
@@ -0,0 +1,393 @@
+##############################################
+### IN-PLACE HTC PATCHER FOR RESULT FILES
+##############################################
+### Overwrites the HTC value (last number) of the lines whose element ID
+### is in an ID set, without re-writing the untouched lines:
+###   - a line index (leading ID, start / end of every line that can hold
+###     an element ID) is built once per result file and cached next to
+###     it (mesh_cache), so re-patching the same file skips the scan
+###   - only the indexed lines of the target IDs are decoded and matched
+###     with HTC_LINE (the regex of the old update_htc) / TEMP_LINE
+###   - Corrections: per-ID / per-group SET and SCALE rules for TEMP and
+###     HTC, composed per ID and applied in the same single pass
+###   - when every new value fits the width of the old HTC field, the
+###     fields are overwritten through a memory map (right-aligned, padded
+###     with blanks), in a copy of the file or in the file itself
+###   - otherwise the file is streamed: the untouched runs between the
+###     HTC fields are written as memoryview slices of the mapped input
+### Untouched bytes (line ends, trailing blanks, ...) are kept as they are.
+### A film store folder (film_store) is patched column-wise into a new
+### store instead (values kept exact, no text formatting).
+##############################################
+### Update: 18/10/2026
+##############################################
+
+import mmap
+import os
+import re
+import shutil
+
+try:
+    import numpy as np
+    import mesh_cache
+except ImportError:
+    np = mesh_cache = None
+
+from line_scan import ID_OK, UNSURE, IdSet, iter_chunks, scan_leading_ids
+
+
+INDEX_TAG = "htc_lines"
+FILE_BUFFER = 1 << 20
+
+# group(1): element ID
+# group(2): middle content
+# group(3): delimiter before HTC
+# group(4): HTC value (last number)
+HTC_LINE = re.compile(r'^(\s*\d+)(.*?)([,\s]+)([-+0-9.Ee]+)\s*$')
+
+# TEMP: the number before the HTC value (group 4 as well)
+TEMP_LINE = re.compile(r'^(\s*\d+)(.*?)([,\s]+)([-+0-9.Ee]+)([,\s]+)[-+0-9.Ee]+\s*$')
+
+QUANTITIES = ("TEMP", "HTC")
+VALUE_LINE = {"TEMP": TEMP_LINE, "HTC": HTC_LINE}
+SET, SCALE = "SET", "SCALE"
+FIELD_FORMAT = "%.6e"           # same text as f"{value:.6e}"
+
+# Element ID of HTC_LINE: leading digits after optional whitespace
+LEADING_ID = re.compile(r'\s*(\d+)')
+
+
+def _line_text(line):
+    # Same text as the text-mode loop of the old update_htc
+    return line.decode('utf-8', errors='ignore')
+
+
+def _regex_id(line):
+    m = LEADING_ID.match(_line_text(line))
+    if m is None:
+        return None
+    eid = int(m.group(1))
+    return eid if eid.bit_length() < 63 else None
+
+
+# ============================================================
+# LINE INDEX
+# ============================================================
+def _index_python(data, offset):
+    ids, starts, ends = [], [], []
+    pos = offset
+    # bytes.splitlines() ends lines at \n, \r\n and \r like text mode
+    for line in data.splitlines(keepends=True):
+        content = line.rstrip(b'\r\n')
+        eid = _regex_id(content)
+        if eid is not None:
+            ids.append(eid)
+            starts.append(pos)
+            ends.append(pos + len(content))
+        pos += len(line)
+    return ids, starts, ends
+
+
+def _index_numpy(data, offset):
+    starts, ends, ids, status, _ = scan_leading_ids(data)
+    # negative IDs: HTC_LINE has no sign, these lines never match
+    keep = (status == ID_OK) & (ids >= 0)
+    for k in np.flatnonzero(status == UNSURE).tolist():
+        eid = _regex_id(data[starts[k]:ends[k]])
+        if eid is not None:
+            keep[k] = True
+            ids[k] = eid
+    return ids[keep], starts[keep] + offset, ends[keep] + offset
+
+
+def build_line_index(path):
+    """{"ids", "starts", "ends"}: leading ID and content bounds (line end
+    excluded) of every line of `path` that can match HTC_LINE."""
+    index_chunk = _index_python if np is None else _index_numpy
+    parts = []
+    offset = 0
+    for data in iter_chunks(path):
+        parts.append(index_chunk(data, offset))
+        offset += len(data)
+
+    if np is None:
+        return {name: [v for part in parts for v in part[i]]
+                for i, name in enumerate(("ids", "starts", "ends"))}
+    if not parts:
+        parts = [(np.zeros(0, dtype=np.int64),) * 3]
+    return {name: np.concatenate([part[i] for part in parts])
+            for i, name in enumerate(("ids", "starts", "ends"))}
+
+
+def load_line_index(path, use_cache=True):
+    """Line index of `path`, memory-mapped from the cache when valid."""
+    if mesh_cache is None:
+        return build_line_index(path)
+    return mesh_cache.load_file_arrays(path, INDEX_TAG, lambda: build_line_index(path),
+                                       use_cache)
+
+
+# ============================================================
+# CORRECTION TABLES
+# ============================================================
+class Corrections:
+    """Ordered SET / SCALE rules for TEMP and HTC.
+
+    compile() composes the rules of every ID, in the order they were
+    added, into one map v -> a * v + b per quantity, stored against a
+    sorted unique ID array (one searchsorted per result line instead of
+    one pass per rule). Without NumPy a dict is used.
+    """
+
+    def __init__(self):
+        self.rules = []                 # (quantity, mode, ids, values)
+        self.ids = None
+
+    def __len__(self):
+        return len(self.rules)
+
+    def add(self, quantity, mode, ids, values):
+        if quantity not in QUANTITIES or mode not in (SET, SCALE):
+            raise ValueError(f"Unknown rule {quantity} {mode}")
+        self.rules.append((quantity, mode, list(ids), list(values)))
+        self.ids = None
+
+    def compile(self):
+        if np is None:
+            self.maps = {}
+            for q, mode, ids, values in self.rules:
+                for eid, v in zip(ids, values):
+                    a, b = self.maps.setdefault(eid, {}).get(q, (1.0, 0.0))
+                    self.maps[eid][q] = (0.0, v) if mode == SET else (a * v, b * v)
+            self.ids = sorted(self.maps)
+            return self
+
+        arrays = [np.asarray(r[2], dtype=np.int64) for r in self.rules]
+        self.ids = np.unique(np.concatenate(arrays)) if arrays else np.zeros(0, np.int64)
+        n = self.ids.size
+        self.a = {q: np.ones(n) for q in QUANTITIES}
+        self.b = {q: np.zeros(n) for q in QUANTITIES}
+        self.hit = {q: np.zeros(n, dtype=bool) for q in QUANTITIES}
+
+        for (q, mode, _, values), ids in zip(self.rules, arrays):
+            idx = np.searchsorted(self.ids, ids)
+            values = np.asarray(values, dtype=np.float64)
+            self.hit[q][idx] = True
+            if mode == SET:
+                # repeated IDs: the last row wins
+                _, last = np.unique(idx[::-1], return_index=True)
+                keep = idx.size - 1 - last
+                self.a[q][idx[keep]] = 0.0
+                self.b[q][idx[keep]] = values[keep]
+            else:
+                np.multiply.at(self.a[q], idx, values)
+                np.multiply.at(self.b[q], idx, values)
+        return self
+
+    def rows(self, line_ids):
+        """(rows of line_ids with a rule, their position in self.ids)."""
+        if np is None:
+            rows = [k for k, eid in enumerate(line_ids) if eid in self.maps]
+            return rows, [line_ids[k] for k in rows]
+        line_ids = np.asarray(line_ids)
+        if not self.ids.size:
+            return np.zeros(0, dtype=np.int64), []
+        pos = np.minimum(np.searchsorted(self.ids, line_ids), self.ids.size - 1)
+        rows = np.flatnonzero(self.ids[pos] == line_ids)
+        return rows, pos[rows].tolist()
+
+    def maps_at(self, p):
+        """{quantity: (a, b)} of the ID at position p (from rows())."""
+        if np is None:
+            return self.maps[p]
+        return {q: (float(self.a[q][p]), float(self.b[q][p]))
+                for q in QUANTITIES if self.hit[q][p]}
+
+
+# ============================================================
+# PATCHES
+# ============================================================
+def _index_rows(index, rows):
+    if np is None:
+        return [index["starts"][k] for k in rows], [index["ends"][k] for k in rows]
+    return index["starts"][rows].tolist(), index["ends"][rows].tolist()
+
+
+def line_patches(data, starts, ends, edits_of):
+    """Patches [(start, end, replacement bytes), ...] in file order.
+
+    edits_of(k, text) gives the edits [(start, end, new text), ...] of
+    line k (ascending, str offsets in the line). ASCII lines get each
+    field replaced, other lines the whole line content (decoded as the
+    old text-mode loop did). Returns (patches, number of edited lines).
+    """
+    patches = []
+    count = 0
+    for k, (a, b) in enumerate(zip(starts, ends)):
+        line = data[a:b]
+        is_ascii = line.isascii()
+        text = line.decode('ascii') if is_ascii else _line_text(line)
+        edits = edits_of(k, text)
+        if not edits:
+            continue
+        count += 1
+        if is_ascii:
+            patches += [(a + s, a + e, new.encode('ascii')) for s, e, new in edits]
+        else:
+            for s, e, new in reversed(edits):
+                text = text[:s] + new + text[e:]
+            patches.append((a, b, text.encode('utf-8')))
+    return patches, count
+
+
+def _patch_mapped(path, patches):
+    """Overwrite the patch ranges of `path` (every replacement fits)."""
+    with open(path, 'r+b') as f, mmap.mmap(f.fileno(), 0) as mm:
+        for a, b, new in patches:
+            mm[a:b] = new.rjust(b - a)
+        mm.flush()
+
+
+def _write_streamed(data, out_path, patches):
+    """Copy of `data` (mapped input) with the patch ranges replaced."""
+    with open(out_path, 'wb', buffering=FILE_BUFFER) as fout, memoryview(data) as view:
+        pos = 0
+        for a, b, new in patches:
+            fout.write(view[pos:a])
+            fout.write(new)
+            pos = b
+        fout.write(view[pos:])
+
+
+# ============================================================
+# PATCH A RESULT FILE
+# ============================================================
+def _same_file(a, b):
+    if os.path.normcase(os.path.abspath(a)) == os.path.normcase(os.path.abspath(b)):
+        return True
+    return os.path.exists(b) and os.path.samefile(a, b)
+
+
+def rewrite_lines(result_file, out_file, find, use_cache=True):
+    """Write `result_file` to `out_file` (may be the same file) with the
+    patches of find(data, line index) -> (patches, count). Returns count."""
+    in_place = _same_file(result_file, out_file)
+
+    if os.path.getsize(result_file) == 0:           # mmap needs >= 1 byte
+        if not in_place:
+            shutil.copyfile(result_file, out_file)
+        return 0
+
+    index = load_line_index(result_file, use_cache)
+    with open(result_file, 'rb') as f, \
+         mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        patches, count = find(data, index)
+        fits = all(len(new) <= b - a for a, b, new in patches)
+        if not fits:
+            target = out_file + ".tmp" if in_place else out_file
+            _write_streamed(data, target, patches)
+
+    # The input is unmapped here (a mapped file cannot be replaced on Windows)
+    if not fits:
+        if in_place:
+            os.replace(target, result_file)
+        return count
+
+    if not in_place:
+        shutil.copyfile(result_file, out_file)
+    if patches:
+        _patch_mapped(out_file, patches)
+        if in_place and use_cache and mesh_cache is not None:
+            mesh_cache.update_key(result_file)       # same line offsets
+    return count
+
+
+def patch_store(store_dir, corrections, out_dir):
+    """Apply a Corrections table to the temp / htc columns of a film store,
+    written as the store `out_dir` (may be store_dir itself).
+    Returns the number of rows changed."""
+    from film_store import load_film_store, write_film_store
+
+    corrections.compile()
+    store = load_film_store(store_dir)
+    float32 = store.temp.dtype == np.float32
+    columns = {"TEMP": np.array(store.temp, dtype=np.float64),
+               "HTC": np.array(store.htc, dtype=np.float64)}
+    ids = np.array(store.ids)
+    rows, pos = corrections.rows(ids.astype(np.int64))
+    pos = np.asarray(pos, dtype=np.int64)
+
+    for q, values in columns.items():
+        hit = corrections.hit[q][pos]
+        r, p = rows[hit], pos[hit]
+        a, b = corrections.a[q][p], corrections.b[q][p]
+        values[r] = np.where(a == 0.0, b, a * values[r] + b)
+
+    # in memory only from here, the store may be rewritten in place
+    patched = type(store)(out_dir, ids, np.array(store.faces), columns["TEMP"],
+                          columns["HTC"], store.labels)
+    del store
+    write_film_store(patched, out_dir, float32)
+    return len(rows)
+
+
+def patch_htc(result_file, ids, new_text, out_file, use_cache=True):
+    """Write `result_file` to `out_file` with the HTC field of the lines of
+    `ids` (iterable or IdSet) set to `new_text`. out_file may be
+    result_file itself. Returns the number of patched lines."""
+    id_set = ids if isinstance(ids, IdSet) else IdSet(ids)
+
+    if os.path.isdir(result_file):
+        corrections = Corrections()
+        corrections.add("HTC", SET, id_set.ids, [float(new_text)] * len(id_set))
+        return patch_store(result_file, corrections, out_file)
+
+    def edits_of(k, text):
+        m = HTC_LINE.match(text)
+        return [(m.start(4), m.end(4), new_text)] if m else None
+
+    def find(data, index):
+        if np is None:
+            rows = [k for k, eid in enumerate(index["ids"]) if eid in id_set]
+        else:
+            rows = np.flatnonzero(id_set.contains(np.asarray(index["ids"])))
+        return line_patches(data, *_index_rows(index, rows), edits_of)
+
+    return rewrite_lines(result_file, out_file, find, use_cache)
+
+
+def _field_edit(text, quantity, a, b):
+    m = VALUE_LINE[quantity].match(text)
+    if m is None:
+        return None
+    if a == 0.0:
+        value = b
+    else:
+        try:
+            value = a * float(m.group(4)) + b
+        except ValueError:
+            return None
+    return m.start(4), m.end(4), FIELD_FORMAT % value
+
+
+def patch_values(result_file, corrections, out_file, use_cache=True):
+    """Apply a Corrections table to the TEMP / HTC fields of `result_file`
+    in one pass, written to `out_file` (may be result_file itself).
+    New values are written as FIELD_FORMAT. Returns the number of lines
+    changed."""
+    if os.path.isdir(result_file):
+        return patch_store(result_file, corrections, out_file)
+
+    corrections.compile()
+
+    def find(data, index):
+        rows, pos = corrections.rows(index["ids"])
+        maps = [corrections.maps_at(p) for p in pos]
+
+        def edits_of(k, text):
+            edits = [_field_edit(text, q, a, b) for q, (a, b) in maps[k].items()]
+            return sorted(e for e in edits if e is not None)
+
+        return line_patches(data, *_index_rows(index, rows), edits_of)
+
+    return rewrite_lines(result_file, out_file, find, use_cache)
@@ -0,0 +1,432 @@
+##############################################
+### STREAMING LINTER FOR LARGE ABAQUS .INP FILES
+##############################################
+### One pass over memory-mapped 32 MB chunks per file. Line kinds
+### (blank / comment / keyword / data), leading IDs and block state are
+### found with NumPy on the raw bytes (line_scan); only keyword lines and
+### a few odd lines are decoded in Python. Checks:
+###   blank          blank lines (Abaqus ends data blocks at them)
+###   orphan         data lines before the first keyword line
+###   film_header    'id, FACE, temp, htc' rows outside *FILM / *SFILM
+###                  (before the first keyword or in a model data block)
+###   dup_node       repeated node IDs in *NODE blocks
+###   dup_element    repeated element IDs in *ELEMENT blocks
+###   dup_film       repeated (element ID, face) rows in *FILM blocks
+### Each check reports a count and the first N locations, never a list
+### of every hit. lint_files() checks several files on a process pool.
+### Without NumPy the same rules are applied line by line.
+##############################################
+### Update: 18/10/2026
+##############################################
+
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from inp_reader import FACE_LABELS, leading_int, parse_keyword, split_fields
+from line_scan import CHUNK_SIZE, ID_OK, UNSURE, scan_leading_ids, skip_whitespace
+
+
+MAX_LOCATIONS = 20              # locations kept per check
+
+CHECKS = (
+    ("blank", "blank lines"),
+    ("orphan", "data lines before the first keyword"),
+    ("film_header", "*FILM rows without a *FILM header"),
+    ("dup_node", "duplicate node IDs"),
+    ("dup_element", "duplicate element IDs"),
+    ("dup_film", "duplicate *FILM rows (same element and face)"),
+)
+
+# Block categories
+NO_BLOCK, NODE, ELEMENT, FILM, MODEL, OTHER = range(6)
+BLOCKS = {"NODE": NODE, "ELEMENT": ELEMENT, "FILM": FILM, "SFILM": FILM,
+          "ELSET": MODEL, "NSET": MODEL, "SURFACE": MODEL}
+DUPLICATE_CHECKS = {NODE: "dup_node", ELEMENT: "dup_element", FILM: "dup_film"}
+
+# Line kinds
+BLANK, COMMENT, KEYWORD, DATA = range(4)
+
+_FACES = frozenset(FACE_LABELS)
+
+
+# ============================================================
+# REPORT
+# ============================================================
+class LintReport:
+    """Counts and first locations [(line, text), ...] per check."""
+
+    def __init__(self, path, max_locations=MAX_LOCATIONS):
+        self.path = path
+        self.max_locations = max_locations
+        self.lines = 0
+        self.counts = {name: 0 for name, _ in CHECKS}
+        self.locations = {name: [] for name, _ in CHECKS}
+
+    def add(self, check, line_numbers, texts=None):
+        """Record hits at the given (ascending) line numbers."""
+        self.counts[check] += len(line_numbers)
+        room = self.max_locations - len(self.locations[check])
+        if room > 0:
+            texts = texts or [""] * len(line_numbers)
+            self.locations[check] += list(zip(line_numbers[:room], texts[:room]))
+
+    @property
+    def issues(self):
+        return sum(self.counts.values())
+
+    def summary(self):
+        if not self.issues:
+            return f"✅ {self.path}: {self.lines} lines, no issues found."
+        out = [f"🔍 {self.path}: {self.lines} lines, {self.issues} issues"]
+        for name, title in CHECKS:
+            n = self.counts[name]
+            if not n:
+                continue
+            out.append(f"  {title}: {n}")
+            for line, text in self.locations[name]:
+                out.append(f"    - Line {line}" + (f": {text}" if text else ""))
+            if n > len(self.locations[name]):
+                out.append(f"    ... {n - len(self.locations[name])} more")
+        return "\n".join(out)
+
+
+# ============================================================
+# LINE RULES (shared by both scanners)
+# ============================================================
+def _film_like(stripped):
+    """'id, FACE, temp, htc' data line."""
+    fields = split_fields(stripped)
+    if len(fields) != 4 or fields[1].upper() not in _FACES:
+        return False
+    try:
+        int(fields[0])
+        float(fields[2])
+        float(fields[3])
+    except ValueError:
+        return False
+    return True
+
+
+def _face(stripped):
+    fields = split_fields(stripped)
+    return fields[1].upper() if len(fields) > 1 else ""
+
+
+def _line_kind(stripped):
+    if not stripped:
+        return BLANK
+    if stripped.startswith('**'):
+        return COMMENT
+    return KEYWORD if stripped.startswith('*') else DATA
+
+
+def _block_of(stripped):
+    return BLOCKS.get(parse_keyword(stripped)[0], OTHER)
+
+
+def _duplicates(report, check, ids, lines, faces=None):
+    """Report every repeat of an ID (or ID + face) after its first line."""
+    if np is not None:
+        ids = np.asarray(ids, dtype=np.int64)
+        lines = np.asarray(lines, dtype=np.int64)
+        if faces is None:
+            order = np.argsort(ids, kind='stable')
+            key = ids[order]
+            repeat = np.flatnonzero(key[1:] == key[:-1]) + 1
+        else:
+            faces = np.asarray(faces, dtype=np.int64)
+            order = np.lexsort((faces, ids))
+            k1, k2 = ids[order], faces[order]
+            repeat = np.flatnonzero((k1[1:] == k1[:-1]) & (k2[1:] == k2[:-1])) + 1
+        # first line of each repeated key: walk back to the group start
+        group_start = np.ones(order.size, dtype=bool)
+        group_start[repeat] = False
+        first = np.maximum.accumulate(np.where(group_start, np.arange(order.size), 0))
+        rep = order[repeat]
+        first_line = lines[order[first[repeat]]]
+        by_line = np.argsort(lines[rep], kind='stable')
+        rep, first_line = rep[by_line], first_line[by_line]
+        hits = lines[rep].tolist()
+        shown = min(len(hits), max(0, report.max_locations - len(report.locations[check])))
+        texts = [f"ID {i} (first at line {f})"
+                 for i, f in zip(ids[rep[:shown]].tolist(), first_line[:shown].tolist())]
+        report.add(check, hits, texts)
+        return
+
+    seen = {}
+    hits, texts = [], []
+    for k, (eid, line) in enumerate(zip(ids, lines)):
+        key = eid if faces is None else (eid, faces[k])
+        if key in seen:
+            hits.append(line)
+            texts.append(f"ID {eid} (first at line {seen[key]})")
+        else:
+            seen[key] = line
+    report.add(check, hits, texts)
+
+
+# ============================================================
+# PYTHON SCANNER
+# ============================================================
+def _lint_python(path, report):
+    block = NO_BLOCK
+    pending = False                     # previous data line ended with ','
+    found = {name: [] for name, _ in CHECKS}
+    ids = {NODE: ([], []), ELEMENT: ([], []), FILM: ([], [], [])}
+
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for lineno, line in enumerate(f, 1):
+            report.lines = lineno
+            stripped = line.strip()
+            kind = _line_kind(stripped)
+            if kind == BLANK:
+                found["blank"].append(lineno)
+                continue
+            if kind == COMMENT:
+                continue
+            if kind == KEYWORD:
+                block = _block_of(stripped)
+                pending = False
+                continue
+
+            continued, pending = pending, stripped.endswith(',')
+            if block in (NO_BLOCK, MODEL):
+                if _film_like(stripped):
+                    found["film_header"].append(lineno)
+                elif block == NO_BLOCK:
+                    found["orphan"].append(lineno)
+            if continued or block not in ids:
+                continue
+            eid = leading_int(stripped)
+            if eid is not None and eid.bit_length() < 64:
+                ids[block][0].append(eid)
+                ids[block][1].append(lineno)
+                if block == FILM:
+                    ids[block][2].append(_face(stripped))
+
+    for name in ("blank", "orphan", "film_header"):
+        report.add(name, found[name])
+    for block, check in DUPLICATE_CHECKS.items():
+        _duplicates(report, check, *ids[block])
+
+
+# ============================================================
+# NUMPY SCANNER
+# ============================================================
+def _iter_mapped_chunks(path, chunk_size):
+    """Chunks of the memory-mapped file that end at a line end."""
+    if os.path.getsize(path) == 0:
+        return
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        pos, size = 0, len(mm)
+        while pos < size:
+            end = mm.find(b'\n', min(pos + chunk_size, size) - 1) + 1 or size
+            yield mm[pos:end]
+            pos = end
+
+
+def _decode(data, a, b):
+    # Same text as a text-mode line, stripped
+    return data[a:b].decode('utf-8', errors='replace').strip()
+
+
+def _face_key(face):
+    # First 4 bytes of a face text (up to a blank / control byte)
+    key = 0
+    for i, c in enumerate(face.encode('utf-8')[:4]):
+        if c <= 32:
+            break
+        key |= c << (8 * i)
+    return key
+
+
+def _face_keys(ext, commas, starts, ends):
+    """_face_key() of the field after the first comma of each line: equal
+    faces give equal keys. Lines with non-ASCII bytes there are decoded."""
+    pos = ends.copy()
+    if commas.size:
+        c = commas[np.minimum(np.searchsorted(commas, starts), commas.size - 1)]
+        inside = (c >= starts) & (c < ends)
+        pos[inside] = c[inside] + 1
+    pos, unsure = skip_whitespace(ext, pos, ends)
+
+    at = pos[:, None] + np.arange(4)
+    win = ext[at].astype(np.int64)
+    keep = np.logical_and.accumulate((win > 32) & (win != 44) & (at < ends[:, None]), axis=1)
+    win = np.where((win >= 97) & (win <= 122), win - 32, win) * keep
+    keys = (win << (np.arange(4) * 8)).sum(axis=1)
+
+    odd = np.zeros(keys.size, dtype=bool)
+    odd[unsure] = True
+    odd |= (win >= 128).any(axis=1)
+    for j in np.flatnonzero(odd).tolist():
+        line = bytes(ext[starts[j]:ends[j]]).decode('utf-8', errors='replace')
+        keys[j] = _face_key(_face(line.strip()))
+    return keys
+
+
+class _State:
+
+    def __init__(self):
+        self.lines = 0
+        self.offset = 0                 # file offset of the chunk
+        self.block = NO_BLOCK
+        self.pending = False
+        self.found = {name: [] for name, _ in CHECKS}
+        # NODE / ELEMENT: (ids, lines); FILM: + (face keys, line starts, ends)
+        self.ids = {NODE: ([], []), ELEMENT: ([], []), FILM: ([], [], [], [], [])}
+
+
+def _lint_chunk(data, st):
+    buf = np.frombuffer(data, dtype=np.uint8)
+    commas = np.flatnonzero(buf == 44)
+    ext = np.frombuffer(data + b'\n' * 8, dtype=np.uint8)
+    starts, ends, ids, status, _ = scan_leading_ids(data)
+    n = starts.size
+    line_no = st.lines + 1 + np.arange(n)
+
+    # line kinds from the first non-blank byte; odd lines in Python
+    first, long_ws = skip_whitespace(ext, starts, ends)
+    c0, c1 = ext[first], ext[np.minimum(first + 1, ext.size - 1)]
+    kind = np.full(n, DATA, dtype=np.int8)
+    kind[c0 == 42] = KEYWORD
+    kind[(c0 == 42) & (c1 == 42) & (first + 1 < ends)] = COMMENT
+    kind[first == ends] = BLANK
+    odd = np.zeros(n, dtype=bool)
+    odd[long_ws] = True
+    odd |= (c0 >= 128) & (first < ends)
+    for k in np.flatnonzero(odd).tolist():
+        kind[k] = _line_kind(_decode(data, starts[k], ends[k]))
+
+    # last non-blank byte: data lines ending with ',' continue on the next
+    last, long_tail = skip_whitespace(ext, ends - 1, starts - 1, step=-1)
+    comma = ext[np.maximum(last, 0)] == 44
+    odd_tail = np.zeros(n, dtype=bool)
+    odd_tail[long_tail] = True
+    odd_tail |= (ext[np.maximum(last, 0)] >= 128) & (last >= starts)
+    for k in np.flatnonzero(odd_tail).tolist():
+        comma[k] = _decode(data, starts[k], ends[k]).endswith(',')
+
+    # block of every line: the last keyword line at or before it
+    kw = np.flatnonzero(kind == KEYWORD)
+    kw_block = np.array([_block_of(_decode(data, starts[k], ends[k])) for k in kw.tolist()],
+                        dtype=np.int8)
+    at = np.searchsorted(kw, np.arange(n), side='right') - 1
+    block = np.where(at >= 0, kw_block[np.maximum(at, 0)] if kw.size else 0, st.block)
+
+    # continuation: previous data / keyword line is data ending with ','
+    seq = np.flatnonzero((kind == DATA) | (kind == KEYWORD))
+    data_rows = seq[kind[seq] == DATA]
+    continued = np.zeros(n, dtype=bool)
+    if seq.size:
+        prev_comma = np.r_[st.pending, (kind[seq[:-1]] == DATA) & comma[seq[:-1]]]
+        continued[seq] = prev_comma & (kind[seq] == DATA)
+
+    st.found["blank"].append(line_no[kind == BLANK])
+
+    # film rows outside *FILM: the field after the first comma starts with
+    # F / S -> checked in Python
+    loose = data_rows[(block[data_rows] == NO_BLOCK) | (block[data_rows] == MODEL)]
+    if loose.size:
+        key = _face_keys(ext, commas, starts[loose], ends[loose]) & 0xFF
+        maybe = (key == 70) | (key == 83)
+        film = np.zeros(loose.size, dtype=bool)
+        for j in np.flatnonzero(maybe).tolist():
+            k = loose[j]
+            film[j] = _film_like(_decode(data, starts[k], ends[k]))
+        st.found["film_header"].append(line_no[loose[film]])
+        orphan = loose[~film]
+        st.found["orphan"].append(line_no[orphan[block[orphan] == NO_BLOCK]])
+
+    # IDs of NODE / ELEMENT / FILM data lines (not continuation lines)
+    for b in DUPLICATE_CHECKS:
+        rows = data_rows[(block[data_rows] == b) & ~continued[data_rows]]
+        if not rows.size:
+            continue
+        eid = ids[rows].copy()
+        ok = status[rows] == ID_OK
+        for j in np.flatnonzero(status[rows] == UNSURE).tolist():
+            value = leading_int(_decode(data, starts[rows[j]], ends[rows[j]]))
+            if value is not None and value.bit_length() < 64:
+                eid[j], ok[j] = value, True
+        st.ids[b][0].append(eid[ok])
+        st.ids[b][1].append(line_no[rows[ok]])
+        if b == FILM:
+            rows = rows[ok]
+            st.ids[b][2].append(_face_keys(ext, commas, starts[rows], ends[rows]))
+            st.ids[b][3].append(starts[rows] + st.offset)
+            st.ids[b][4].append(ends[rows] + st.offset)
+
+    st.lines += n
+    st.offset += len(data)
+    if kw.size:
+        st.block = int(kw_block[-1])
+    if seq.size:
+        st.pending = bool(kind[seq[-1]] == DATA and comma[seq[-1]])
+
+
+def _film_duplicates(report, path, ids, lines, keys, starts, ends):
+    """Duplicate (ID, face) rows: candidates by (ID, 4-byte face key), the
+    exact face of the candidates is decoded from the file."""
+    order = np.lexsort((keys, ids))
+    k1, k2 = ids[order], keys[order]
+    same = (k1[1:] == k1[:-1]) & (k2[1:] == k2[:-1])
+    cand = np.zeros(order.size, dtype=bool)
+    cand[1:] |= same
+    cand[:-1] |= same
+    rows = np.sort(order[cand])
+    if not rows.size:
+        return
+
+    codes = {}
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        faces = [codes.setdefault(_face(_decode(mm, a, b)), len(codes))
+                 for a, b in zip(starts[rows].tolist(), ends[rows].tolist())]
+    _duplicates(report, "dup_film", ids[rows], lines[rows], faces)
+
+
+def _lint_numpy(path, report, chunk_size):
+    st = _State()
+    for data in _iter_mapped_chunks(path, chunk_size):
+        _lint_chunk(data, st)
+    report.lines = st.lines
+
+    for name in ("blank", "orphan", "film_header"):
+        if st.found[name]:
+            report.add(name, np.concatenate(st.found[name]).tolist())
+
+    def joined(parts):
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+
+    for b in (NODE, ELEMENT):
+        _duplicates(report, DUPLICATE_CHECKS[b], joined(st.ids[b][0]), joined(st.ids[b][1]))
+    if st.ids[FILM][0]:
+        _film_duplicates(report, path, *[joined(parts) for parts in st.ids[FILM]])
+
+
+# ============================================================
+# ENTRY POINTS
+# ============================================================
+def lint_file(path, max_locations=MAX_LOCATIONS, chunk_size=CHUNK_SIZE):
+    """LintReport of one .inp file."""
+    report = LintReport(path, max_locations)
+    if np is None:
+        _lint_python(path, report)
+    else:
+        _lint_numpy(path, report, chunk_size)
+    return report
+
+
+def lint_files(paths, jobs=None, max_locations=MAX_LOCATIONS):
+    """LintReports of several files, in order, on `jobs` processes."""
+    jobs = max(1, min(jobs or os.cpu_count() or 1, len(paths)))
+    if jobs == 1:
+        return [lint_file(p, max_locations) for p in paths]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(lint_file, paths, [max_locations] * len(paths)))
@@ -0,0 +1,363 @@
+##############################################
+### SHARED ABAQUS .INP / *FILM READER
+##############################################
+### Single streaming pass over an Abaqus/PSJ input deck or a CFD
+### mapping result file. Used by every mapping tool.
+### Supported:
+###   *NODE, *ELEMENT (any number of blocks), *ELSET (incl. GENERATE),
+###   *SURFACE, *FILM / *SFILM, *INCLUDE, continuation lines
+###   (data line ending with ',' continues on the next line)
+### Tables are stored in array.array columns, so a row costs a few
+### machine words instead of a dict entry + list + boxed floats.
+##############################################
+### Update: 18/10/2026
+##############################################
+
+import os
+from array import array
+
+
+# Face labels used in *FILM / *SFILM / *SURFACE data lines.
+# FilmTable stores the index into this tuple (1 byte per row).
+FACE_LABELS = (
+    "FPOS", "FNEG", "SPOS", "SNEG",
+    "F1", "F2", "F3", "F4", "F5", "F6",
+    "S1", "S2", "S3", "S4", "S5", "S6",
+)
+
+DEFAULT_KEYWORDS = ("NODE", "ELEMENT", "ELSET", "SURFACE", "FILM")
+
+
+# ============================================================
+# LOW LEVEL HELPERS
+# ============================================================
+def leading_int(text):
+    """Return the first integer field of a data line, or None.
+
+    Fields may be separated by ',' or whitespace. No regex is used.
+    """
+    head = text.split(',', 1)[0].split(None, 1)
+    if not head:
+        return None
+    try:
+        return int(head[0])
+    except ValueError:
+        return None
+
+
+def parse_keyword(line):
+    """'*ELEMENT, TYPE=S6, ELSET=WJ' -> ('ELEMENT', {'TYPE': 'S6', 'ELSET': 'WJ'})"""
+    parts = line.strip()[1:].split(',')
+    name = ' '.join(parts[0].split()).upper()
+    params = {}
+    for p in parts[1:]:
+        if not p.strip():
+            continue
+        key, sep, value = p.partition('=')
+        params[key.strip().upper()] = value.strip() if sep else True
+    return name, params
+
+
+def split_fields(text):
+    fields = [f.strip() for f in text.split(',')]
+    while fields and not fields[-1]:
+        fields.pop()
+    return fields
+
+
+def iter_records(inp_file, join_continuations=True):
+    """Stream (keyword, params, fields) records from an .inp file.
+
+    - keyword line   : fields is None
+    - data line      : keyword/params of the enclosing block
+                       (keyword is None before the first keyword line)
+    Comments ('**') and blank lines are skipped, *INCLUDE files are read
+    in place (the enclosing block continues inside them), and with
+    join_continuations a data line ending with ',' is joined with the next
+    data line.
+    """
+    stack = []
+    keyword, params = None, {}
+    pending = ''
+
+    def push(path):
+        f = open(path, 'r', encoding='utf-8', errors='replace')
+        stack.append((f, os.path.dirname(os.path.abspath(path))))
+
+    push(inp_file)
+    try:
+        while stack:
+            f, base_dir = stack[-1]
+            line = f.readline()
+            if not line:
+                f.close()
+                stack.pop()
+                continue
+
+            stripped = line.strip()
+            if not stripped or stripped.startswith('**'):
+                continue
+
+            if stripped.startswith('*'):
+                if pending:
+                    yield keyword, params, split_fields(pending)
+                    pending = ''
+
+                name, kw_params = parse_keyword(stripped)
+                if name == 'INCLUDE':
+                    target = kw_params.get('INPUT')
+                    if isinstance(target, str) and target:
+                        push(os.path.join(base_dir, target.strip('"')))
+                    continue
+
+                keyword, params = name, kw_params
+                yield keyword, params, None
+                continue
+
+            if join_continuations and stripped.endswith(','):
+                pending += stripped
+                continue
+
+            yield keyword, params, split_fields(pending + stripped)
+            pending = ''
+
+        if pending:
+            yield keyword, params, split_fields(pending)
+    finally:
+        for f, _ in stack:
+            f.close()
+
+
+# ============================================================
+# ARRAY-BACKED TABLES
+# ============================================================
+class NodeTable:
+    """Node IDs + flat xyz coordinates."""
+
+    __slots__ = ('ids', 'coords')
+
+    def __init__(self):
+        self.ids = array('q')
+        self.coords = array('d')
+
+    def __len__(self):
+        return len(self.ids)
+
+    def append(self, nid, x, y, z):
+        self.ids.append(nid)
+        self.coords.extend((x, y, z))
+
+    def as_dict(self):
+        c = self.coords
+        return {nid: [c[3 * i], c[3 * i + 1], c[3 * i + 2]]
+                for i, nid in enumerate(self.ids)}
+
+
+class ElementBlock:
+    """One *ELEMENT block with a fixed number of nodes per element."""
+
+    __slots__ = ('type', 'elset', 'width', 'ids', 'conn')
+
+    def __init__(self, elem_type, elset, width):
+        self.type = elem_type
+        self.elset = elset
+        self.width = width
+        self.ids = array('q')
+        self.conn = array('q')
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class ElementTable:
+    """All *ELEMENT blocks of a model, in file order."""
+
+    def __init__(self):
+        self.blocks = []
+
+    def __len__(self):
+        return sum(len(b) for b in self.blocks)
+
+    def append(self, elem_type, elset, eid, nids):
+        last = self.blocks[-1] if self.blocks else None
+        if (last is None or last.type != elem_type or last.elset != elset
+                or last.width != len(nids)):
+            last = ElementBlock(elem_type, elset, len(nids))
+            self.blocks.append(last)
+        last.ids.append(eid)
+        last.conn.extend(nids)
+
+    def as_dict(self):
+        out = {}
+        for b in self.blocks:
+            w, conn = b.width, b.conn
+            for i, eid in enumerate(b.ids):
+                out[eid] = list(conn[w * i:w * (i + 1)])
+        return out
+
+
+class FilmTable:
+    """*FILM rows: element ID, face label, sink temperature, film coefficient."""
+
+    __slots__ = ('ids', 'faces', 'temp', 'htc', 'labels')
+
+    def __init__(self):
+        self.ids = array('q')
+        self.faces = array('B')
+        self.temp = array('d')
+        self.htc = array('d')
+        self.labels = list(FACE_LABELS)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def face_code(self, label):
+        label = label.upper()
+        try:
+            return self.labels.index(label)
+        except ValueError:
+            self.labels.append(label)
+            return len(self.labels) - 1
+
+    def append(self, eid, label, temp, htc):
+        self.ids.append(eid)
+        self.faces.append(self.face_code(label))
+        self.temp.append(temp)
+        self.htc.append(htc)
+
+    def as_dict(self):
+        """{eid: (temp, htc)} - last row wins, like the old read_results()."""
+        return {eid: (t, h) for eid, t, h in zip(self.ids, self.temp, self.htc)}
+
+
+class InpModel:
+
+    def __init__(self):
+        self.nodes = NodeTable()
+        self.elements = ElementTable()
+        self.elsets = {}
+        self.surfaces = {}
+        self.films = FilmTable()
+        self.skipped = 0
+
+
+# ============================================================
+# READERS
+# ============================================================
+def _int_list(fields, generate=False):
+    if generate:
+        start, stop = int(fields[0]), int(fields[1])
+        step = int(fields[2]) if len(fields) > 2 else 1
+        return range(start, stop + 1, step)
+    return [int(f) for f in fields]
+
+
+def read_inp(inp_file, keywords=DEFAULT_KEYWORDS, headerless_film=False):
+    """Read the requested keyword blocks of an .inp file in one pass.
+
+    keywords        : block names to keep, other blocks are skipped without
+                      converting their fields
+    headerless_film : treat data lines before the first keyword as *FILM
+                      rows (CSV mapping results without a header)
+    """
+    keywords = {k.upper() for k in keywords}
+    want_film = 'FILM' in keywords
+    model = InpModel()
+    nodes, elements, films = model.nodes, model.elements, model.films
+
+    for keyword, params, fields in iter_records(inp_file):
+
+        if fields is None:
+            continue
+
+        if keyword is None:
+            keyword = 'FILM' if headerless_film else None
+        if keyword not in keywords and not (want_film and keyword == 'SFILM'):
+            continue
+
+        try:
+            if keyword == 'NODE':
+                if len(fields) < 3:
+                    raise ValueError
+                z = float(fields[3]) if len(fields) > 3 else 0.0
+                nodes.append(int(fields[0]), float(fields[1]), float(fields[2]), z)
+
+            elif keyword == 'ELEMENT':
+                if len(fields) < 2:
+                    raise ValueError
+                elements.append(params.get('TYPE'), params.get('ELSET'),
+                                int(fields[0]), [int(f) for f in fields[1:]])
+
+            elif keyword == 'ELSET':
+                name = params.get('ELSET')
+                ids = model.elsets.setdefault(name, array('q'))
+                ids.extend(_int_list(fields, 'GENERATE' in params))
+
+            elif keyword == 'SURFACE':
+                name = params.get('NAME')
+                target = fields[0]
+                if target.lstrip('-').isdigit():
+                    target = int(target)
+                face = fields[1].upper() if len(fields) > 1 else None
+                model.surfaces.setdefault(name, []).append((target, face))
+
+            elif keyword in ('FILM', 'SFILM'):
+                if len(fields) < 4:
+                    raise ValueError
+                films.append(int(fields[0]), fields[1],
+                             float(fields[2]), float(fields[3]))
+
+        except ValueError:
+            model.skipped += 1
+
+    return model
+
+
+def read_film(result_file):
+    """Read CFD mapping results ('id,FPOS,temp,htc' with or without *FILM).
+    A film store folder (film_store) is memory-mapped instead."""
+    if os.path.isdir(result_file):
+        from film_store import load_film_store
+        return load_film_store(result_file)
+    return read_inp(result_file, ('FILM',), headerless_film=True).films
+
+
+def read_ids(id_file):
+    """Read an ID list file.
+
+    Inside *ELSET / *NSET blocks every integer is an ID (GENERATE aware);
+    any other data line contributes its first integer field.
+    Returns array('q') in file order (duplicates kept).
+    """
+    ids = array('q')
+    for keyword, params, fields in iter_records(id_file, join_continuations=False):
+        if not fields:
+            continue
+        try:
+            if keyword in ('ELSET', 'NSET'):
+                ids.extend(_int_list(fields, 'GENERATE' in params))
+                continue
+        except ValueError:
+            pass
+        eid = leading_int(fields[0])
+        if eid is not None:
+            ids.append(eid)
+    return ids
+
+
+def read_id_groups(id_files):
+    """Named ID groups from several ID files.
+
+    A file with *ELSET blocks gives one group per ELSET (named after it),
+    any other file is one group named after the file.
+    Returns [(name, array('q')), ...] in input order.
+    """
+    groups = []
+    for id_file in id_files:
+        elsets = read_inp(id_file, ('ELSET',)).elsets
+        if elsets:
+            groups += [(name, ids) for name, ids in elsets.items()]
+        else:
+            name = os.path.splitext(os.path.basename(id_file))[0]
+            groups.append((name, read_ids(id_file)))
+    return groups
@@ -0,0 +1,710 @@
+##############################################
+### FAST LINE SCANNER FOR ID-FILTERED EXTRACTION
+##############################################
+### Reads a text file in large byte chunks (cut at line ends) and finds
+### the leading integer of every line with NumPy (no regex, no per-line
+### Python objects). The IDs are matched against a compiled ID set
+### (bitmap or sorted array) and the selected lines are copied straight
+### from the input buffer.
+###
+### Leading ID rule (same as the old re.split(r'[,\s]+', line.strip())[0]):
+###   optional whitespace, optional sign, digits, then ',' / whitespace /
+###   end of line. Lines the vectorised scan cannot decide (non-ASCII,
+###   '1_000', ...) are checked with inp_reader.leading_int.
+### Without NumPy the same rule is applied line by line.
+###
+### GroupIndex / scan_groups: many ID groups (ports, cylinders, decks)
+### in one pass. Every line is routed by an ID -> group bitmask lookup
+### to the output file and TEMP / HTC sums of each group it belongs to.
+###
+### A film store folder (film_store) is scanned from its memory-mapped
+### columns instead; selected rows are formatted as 'id, FACE, temp, htc'.
+##############################################
+### Update: 18/10/2026
+##############################################
+
+import csv
+import math
+import os
+import warnings
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from inp_reader import leading_int
+
+
+CHUNK_SIZE = 32 << 20           # bytes per chunk
+BITMAP_MAX_ID = 1 << 27         # largest ID for the bitmap lookup (128 MB)
+MAX_DIGITS = 18                 # longer digit runs do not fit int64 safely
+MAX_LEAD_WS = 64                # longer indentation is checked in Python
+SHORT_WINDOW = 8                # digits read per line in the first pass
+
+# Bytes removed by str.strip() / matched by \s (ASCII part)
+WHITESPACE = b" \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f"
+
+# scan_leading_ids status
+NO_ID, ID_OK, UNSURE = 0, 1, 2
+
+
+# ============================================================
+# COMPILED ID SET
+# ============================================================
+class IdSet:
+    """ID membership for single IDs and whole NumPy ID columns.
+
+    Small non-negative IDs use a bitmap (one byte per ID up to the largest
+    one), others a sorted unique array + searchsorted.
+    """
+
+    def __init__(self, ids):
+        self.ids = set(ids)
+        self.bitmap = None
+        self.sorted = None
+        if np is None:
+            return
+        arr = np.fromiter(self.ids, dtype=np.int64, count=len(self.ids))
+        arr.sort()
+        self.sorted = arr
+        if arr.size and arr[0] >= 0 and arr[-1] < BITMAP_MAX_ID:
+            self.bitmap = np.zeros(int(arr[-1]) + 1, dtype=bool)
+            self.bitmap[arr] = True
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, eid):
+        return eid in self.ids
+
+    def contains(self, ids):
+        """Boolean mask of `ids` (int64 array) in the set."""
+        if self.bitmap is not None:
+            hit = (ids >= 0) & (ids < self.bitmap.size)
+            hit[hit] = self.bitmap[ids[hit]]
+            return hit
+        if not self.sorted.size:
+            return np.zeros(ids.shape, dtype=bool)
+        pos = np.searchsorted(self.sorted, ids)
+        pos = np.minimum(pos, self.sorted.size - 1)
+        return self.sorted[pos] == ids
+
+
+# ============================================================
+# CHUNKS
+# ============================================================
+def iter_chunks(path, chunk_size=CHUNK_SIZE):
+    """Yield the file content in pieces that end at a line end."""
+    with open(path, 'rb') as f:
+        rest = b''
+        while True:
+            block = f.read(chunk_size)
+            if not block:
+                if rest:
+                    yield rest
+                return
+            block = rest + block
+            cut = block.rfind(b'\n') + 1
+            if cut == 0:
+                rest = block
+                continue
+            rest = block[cut:]
+            yield block[:cut]
+
+
+def _text(data):
+    # Same text as reading the lines with open(..., 'r', encoding='utf-8')
+    return data.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+
+
+# ============================================================
+# VECTORISED LEADING ID
+# ============================================================
+_IS_WS = np.zeros(256, dtype=bool) if np is not None else None
+_IS_DIGIT = np.zeros(256, dtype=bool) if np is not None else None
+if np is not None:
+    _IS_WS[list(WHITESPACE)] = True
+    _IS_DIGIT[48:58] = True
+_PLACE_VALUES = {}
+
+
+def line_bounds(data):
+    """(starts, ends) of the lines of `data` (bytes): line k is
+    data[starts[k]:ends[k]], ends[k] is its line end byte or len(data).
+    '\\n', '\\r\\n' and a lone '\\r' end a line, like text mode."""
+    buf = np.frombuffer(data, dtype=np.uint8)
+    n = buf.size
+    newlines = np.flatnonzero(buf == 10)
+    if b'\r' in data:
+        cr = np.flatnonzero(buf == 13)
+        nxt = np.append(buf, np.uint8(0))[cr + 1]
+        lone = cr[nxt != 10]
+        if lone.size:
+            newlines = np.union1d(newlines, lone)
+    starts = np.concatenate(([0], newlines + 1))
+    ends = np.concatenate((newlines, [n]))
+    if starts[-1] == n:                 # no partial line after the last end
+        starts, ends = starts[:-1], ends[:-1]
+    return starts, ends
+
+
+def _place_values(width):
+    # row n: 10^(n-1-j) for the first n digits of a window, 0 after them
+    table = np.zeros((width + 1, width), dtype=np.int64)
+    for n in range(1, width + 1):
+        table[n, :n] = 10 ** np.arange(n - 1, -1, -1, dtype=np.int64)
+    return table
+
+
+def _digit_runs(ext, pos, width):
+    """(digit count, value, byte after the digits) of the digit runs
+    starting at `pos`, read from a (len(pos), width) byte window.
+    A count == width means the run may be longer than the window."""
+    win = ext[pos[:, None] + np.arange(width)]
+    non_digit = ~_IS_DIGIT[win]
+    ndig = np.where(non_digit.any(axis=1), non_digit.argmax(axis=1), width)
+    term = win[np.arange(pos.size), np.minimum(ndig, width - 1)]
+    if width not in _PLACE_VALUES:
+        _PLACE_VALUES[width] = _place_values(width)
+    value = ((win.astype(np.int64) - 48) * _PLACE_VALUES[width][ndig]).sum(axis=1)
+    return ndig, value, term
+
+
+def skip_whitespace(ext, pos, stop, step=1):
+    """Move every pos by `step` over whitespace bytes of ext, never onto
+    stop (the line end, or the line start - 1 with step=-1).
+    Returns (pos, rows): rows still on whitespace after MAX_LEAD_WS steps."""
+    pos = pos.copy()
+    rows = np.flatnonzero(pos != stop)
+    for _ in range(MAX_LEAD_WS):
+        rows = rows[_IS_WS[ext[pos[rows]]]]
+        if not rows.size:
+            break
+        pos[rows] += step
+        rows = rows[pos[rows] != stop[rows]]
+    return pos, rows
+
+
+def scan_leading_ids(data):
+    """Leading integer of every line of `data` (bytes).
+
+    Returns (starts, ends, ids, status, id_end) with the line bounds of
+    line_bounds(), status NO_ID / ID_OK / UNSURE per line, ids valid
+    where status == ID_OK and id_end the position after the ID digits.
+    Work is per line (a few vector passes over the leading bytes), not
+    per byte.
+    """
+    starts, ends = line_bounds(data)
+    # line ends after len(data), so every position read below is valid
+    ext = np.frombuffer(data + b'\n' * (MAX_DIGITS + 2), dtype=np.uint8)
+    status = np.zeros(starts.size, dtype=np.int8)
+
+    # skip leading whitespace
+    first, rows = skip_whitespace(ext, starts, ends)
+    status[rows] = UNSURE               # very long indentation
+    has_text = (first < ends) & (status == NO_ID)
+
+    firstc = ext[first]
+    sign = (firstc == 43) | (firstc == 45)          # '+' / '-'
+    pos = first + sign
+
+    # digit run and its value: short window first, long runs again
+    rows = np.flatnonzero(has_text)
+    ndig = np.zeros(starts.size, dtype=np.int64)
+    ids = np.zeros(starts.size, dtype=np.int64)
+    term = np.zeros(starts.size, dtype=np.uint8)
+    for width in (SHORT_WINDOW, MAX_DIGITS + 1):
+        ndig[rows], ids[rows], term[rows] = _digit_runs(ext, pos[rows], width)
+        rows = rows[ndig[rows] == width]
+        if not rows.size:
+            break
+
+    clean_end = (term == 44) | _IS_WS[term]
+    ok = has_text & (ndig > 0) & (ndig <= MAX_DIGITS) & clean_end
+    status[ok] = ID_OK
+    neg = ok & (firstc == 45)
+    ids[neg] = -ids[neg]
+
+    # Lines decided here as "no ID": no text, or a first byte that int()
+    # always rejects ('*', letters, ...). Everything else that is not a
+    # plain ID ('1.5', '1_000', non-ASCII, ...) is UNSURE.
+    sure_reject = (firstc < 128) & ~_IS_DIGIT[firstc] & ~sign
+    status[has_text & ~ok & ~sure_reject] = UNSURE
+
+    return starts, ends, ids, status, pos + ndig
+
+
+def _gather_lines(data, starts, ends):
+    """Bytes of the given lines (each including its line end if present)."""
+    stops = np.minimum(ends + 1, len(data)).tolist()
+    return b''.join([data[a:b] for a, b in zip(starts.tolist(), stops)])
+
+
+# ============================================================
+# EXTRACTION
+# ============================================================
+def _extract_python(path, id_set):
+    with open(path, 'r', encoding='utf-8') as fin:
+        for line in fin:
+            stripped = line.strip()
+            if not stripped:
+                continue
+            if leading_int(stripped) in id_set:
+                yield (line if line.endswith("\n") else line + "\n"), 1
+
+
+def _select_chunk(data, id_set):
+    starts, ends, ids, status, _ = scan_leading_ids(data)
+
+    hit = np.zeros(starts.size, dtype=bool)
+    ok = status == ID_OK
+    hit[ok] = id_set.contains(ids[ok])
+    for k in np.flatnonzero(status == UNSURE):
+        line = _text(data[starts[k]:ends[k]]).strip()
+        hit[k] = leading_int(line) in id_set
+
+    rows = np.flatnonzero(hit)
+    text = _text(_gather_lines(data, starts[rows], ends[rows]))
+    if text and not text.endswith("\n"):
+        text += "\n"
+    return text, rows.size
+
+
+def extract_lines(path, ids, chunk_size=CHUNK_SIZE):
+    """Yield (text, count) blocks of the lines of `path` whose leading
+    integer is in `ids` (iterable or IdSet), in file order.
+
+    Text is returned with '\\n' line ends, as the text-mode line loop did.
+    """
+    id_set = ids if isinstance(ids, IdSet) else IdSet(ids)
+
+    if os.path.isdir(path):
+        from film_store import load_film_store
+        store = load_film_store(path)
+        for lo, hi in store.blocks():
+            rows = np.flatnonzero(id_set.contains(np.asarray(store.ids[lo:hi], dtype=np.int64)))
+            if rows.size:
+                yield store.format_rows(rows + lo), rows.size
+        return
+
+    if np is None:
+        yield from _extract_python(path, id_set)
+        return
+
+    for data in iter_chunks(path, chunk_size):
+        yield _select_chunk(data, id_set)
+
+
+# ============================================================
+# MANY GROUPS IN ONE PASS
+# ============================================================
+class GroupIndex:
+    """ID -> bitmask of the groups containing the ID.
+
+    groups : [(name, ids), ...]; an ID may belong to several groups.
+    NumPy: sorted unique IDs + (n_ids, n_words) uint64 bit rows.
+    Without NumPy: dict ID -> Python int bitmask.
+    """
+
+    def __init__(self, groups):
+        self.names = [str(name) for name, _ in groups]
+        self.masks = {}
+        for g, (_, ids) in enumerate(groups):
+            bit = 1 << g
+            for eid in ids:
+                self.masks[eid] = self.masks.get(eid, 0) | bit
+        self.keys = None
+        if np is None:
+            return
+
+        n_words = max(1, (len(groups) + 63) // 64)
+        self.keys = np.fromiter(self.masks, dtype=np.int64, count=len(self.masks))
+        self.keys.sort()
+        self.bits = np.zeros((self.keys.size, n_words), dtype=np.uint64)
+        keys = self.keys.tolist()
+        for w in range(n_words):
+            word = [(self.masks[k] >> (64 * w)) & 0xFFFFFFFFFFFFFFFF for k in keys]
+            self.bits[:, w] = np.array(word, dtype=np.uint64)
+
+    def __len__(self):
+        return len(self.names)
+
+    def rows(self, ids):
+        """Row in keys / bits of every ID, -1 where it is in no group."""
+        if not self.keys.size:
+            return np.full(ids.shape, -1, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self.keys, ids), self.keys.size - 1)
+        return np.where(self.keys[pos] == ids, pos, -1)
+
+    def members(self, rows, g):
+        """Mask of `rows` (valid rows) that belong to group g."""
+        word = self.bits[rows, g // 64]
+        return (word >> np.uint64(g % 64)) & np.uint64(1) != 0
+
+
+def _running_sum(total, values):
+    if np is None:
+        for v in values:
+            total += v
+        return total
+    return float(np.cumsum(np.concatenate(([total], values)))[-1])
+
+
+class RunningStats:
+    """Streaming statistics of one quantity, constant memory.
+
+    count / total / mean : total is summed sequentially (np.cumsum, not
+                           pairwise), so mean == sum(list) / len(list)
+    min / max            : NaN when a NaN value was seen
+    std                  : sample standard deviation (Welford, blocks
+                           merged with Chan's formula)
+    weighted_mean        : sum(w * x) / sum(w) over values with a finite
+                           weight > 0 (element areas)
+    """
+
+    __slots__ = ('count', 'total', 'min', 'max', '_mean', '_m2',
+                 'w_count', 'w_total', 'wx_total')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self._mean = 0.0
+        self._m2 = 0.0
+        self.w_count = 0
+        self.w_total = 0.0
+        self.wx_total = 0.0
+
+    def add(self, values, weights=None):
+        n = len(values)
+        if not n:
+            return
+        if np is None:
+            for k, x in enumerate(values):
+                self._add_one(x, None if weights is None else weights[k])
+            return
+
+        values = np.asarray(values, dtype=np.float64)
+        self.total = _running_sum(self.total, values)
+        lo, hi = values.min(), values.max()
+        self.min = float(lo) if lo != lo or lo < self.min else self.min
+        self.max = float(hi) if hi != hi or hi > self.max else self.max
+        if self.min != self.min or self.max != self.max:
+            self.min = self.max = math.nan
+
+        # Chan: merge the block mean / M2 into the running ones
+        mean_b = float(values.mean())
+        m2_b = float(((values - mean_b) ** 2).sum())
+        total_n = self.count + n
+        delta = mean_b - self._mean
+        self._mean += delta * n / total_n
+        self._m2 += m2_b + delta * delta * self.count * n / total_n
+        self.count = total_n
+
+        if weights is not None:
+            weights = np.asarray(weights, dtype=np.float64)
+            use = np.isfinite(weights) & (weights > 0.0)
+            if use.any():
+                self.w_count += int(use.sum())
+                self.w_total += float(weights[use].sum())
+                self.wx_total += float((weights[use] * values[use]).sum())
+
+    def _add_one(self, x, w):
+        self.count += 1
+        self.total += x
+        if x != x or self.min != self.min:
+            self.min = self.max = math.nan
+        else:
+            self.min = min(self.min, x)
+            self.max = max(self.max, x)
+        delta = x - self._mean
+        self._mean += delta / self.count
+        self._m2 += delta * (x - self._mean)
+        if w is not None and math.isfinite(w) and w > 0.0:
+            self.w_count += 1
+            self.w_total += w
+            self.wx_total += w * x
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    @property
+    def std(self):
+        if self.count < 2:
+            return None
+        return math.sqrt(max(self._m2, 0.0) / (self.count - 1))
+
+    @property
+    def weighted_mean(self):
+        return self.wx_total / self.w_total if self.w_total > 0.0 else None
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "std": self.std,
+            "weighted_mean": self.weighted_mean,
+            "weighted_count": self.w_count,
+            "weight": self.w_total,
+        }
+
+
+class GroupStats:
+    """Per group: extracted line count and running TEMP / HTC statistics."""
+
+    def __init__(self, names):
+        self.names = names
+        self.lines = [0] * len(names)
+        self.temp = [RunningStats() for _ in names]
+        self.htc = [RunningStats() for _ in names]
+
+    def add(self, g, temps, htcs, weights=None):
+        self.temp[g].add(temps, weights)
+        self.htc[g].add(htcs, weights)
+
+    def average(self, g):
+        """(avg_temp, avg_htc, n) - (None, None, 0) when nothing matched."""
+        n = self.temp[g].count
+        if not n:
+            return None, None, 0
+        return self.temp[g].mean, self.htc[g].mean, n
+
+
+class AreaTable:
+    """Element ID -> area (or any per-element weight), NaN when unknown."""
+
+    def __init__(self, ids, areas):
+        self.lookup = dict(zip(ids, areas)) if np is None else None
+        if np is not None:
+            ids = np.asarray(ids, dtype=np.int64)
+            order = np.argsort(ids, kind='stable')
+            self.ids = ids[order]
+            self.areas = np.asarray(areas, dtype=np.float64)[order]
+
+    def get(self, ids):
+        if np is None:
+            return [self.lookup.get(eid, math.nan) for eid in ids]
+        ids = np.asarray(ids, dtype=np.int64)
+        if not self.ids.size:
+            return np.full(ids.shape, np.nan)
+        pos = np.minimum(np.searchsorted(self.ids, ids), self.ids.size - 1)
+        return np.where(self.ids[pos] == ids, self.areas[pos], np.nan)
+
+
+def csv_values(line):
+    """(eid, temp, htc) of a result line read as CSV (the average rule of
+    Main_Code_average), or None."""
+    row = next(csv.reader([line]), [])
+    if len(row) < 4:
+        return None
+    try:
+        return int(row[0]), float(row[2]), float(row[3])
+    except ValueError:
+        return None
+
+
+_BLANK_BYTES = (9, 10, 11, 12, 13, 32)
+
+
+def parse_floats(buf, starts, ends):
+    """float64 values of the byte fields buf[starts:ends], or None when one
+    of them is not a plain number (the caller then uses float())."""
+    if not starts.size:
+        return np.zeros(0)
+    lengths = ends - starts + 1
+    firsts = np.cumsum(lengths) - lengths
+    offsets = np.repeat(firsts, lengths)
+    idx = np.repeat(starts, lengths) + (np.arange(lengths.sum()) - offsets)
+    data = buf[np.minimum(idx, buf.size - 1)].copy()
+    data[np.cumsum(lengths) - 1] = 44               # ','
+    # fromstring reads an empty / blank field as -1.0, float() rejects it
+    filled = ~np.isin(data, _BLANK_BYTES)
+    filled[np.cumsum(lengths) - 1] = False
+    if not np.add.reduceat(filled, firsts).all():
+        return None
+    try:
+        with warnings.catch_warnings():
+            # older NumPy warns and stops at bad data, newer raises
+            warnings.simplefilter("ignore", DeprecationWarning)
+            values = np.fromstring(data[:-1].tobytes().decode('ascii', 'replace'),
+                                   dtype=np.float64, sep=',')
+    except ValueError:
+        return None
+    return values if values.size == starts.size else None
+
+
+def _film_values(data, buf, starts, ends, id_end, rows):
+    """(eid-valid mask, temp, htc) of the lines `rows` by the CSV rule.
+
+    Fast path: the ID field ends at a ',' and the line has >= 4 fields
+    of plain numbers; other lines go through csv_values().
+    """
+    n = rows.size
+    valid = np.zeros(n, dtype=bool)
+    temp = np.zeros(n)
+    htc = np.zeros(n)
+    if not n:
+        return valid, temp, htc
+
+    commas = np.flatnonzero(buf == 44)
+    s, e, c1 = starts[rows], ends[rows], id_end[rows]
+    i = np.searchsorted(commas, c1)
+    get = lambda k: np.append(commas, buf.size)[np.minimum(i + k, commas.size)]
+    c2, c3, c4 = get(1), get(2), get(3)
+    fast = (get(0) == c1) & (c3 < e)
+    c4 = np.where(c4 < e, c4, e)
+    c4 -= (c4 == e) & (buf[np.maximum(c4 - 1, 0)] == 13)       # CRLF
+
+    f = np.flatnonzero(fast)
+    t = parse_floats(buf, c2[f] + 1, c3[f])
+    h = parse_floats(buf, c3[f] + 1, c4[f])
+    if t is None or h is None:
+        f = f[:0]
+    else:
+        valid[f], temp[f], htc[f] = True, t, h
+
+    slow = np.ones(n, dtype=bool)
+    slow[f] = False
+    for k in np.flatnonzero(slow):
+        values = csv_values(_text(data[s[k]:e[k]]))
+        if values is not None:
+            valid[k] = True
+            _, temp[k], htc[k] = values
+    return valid, temp, htc
+
+
+def _group_id(text, averages):
+    """Leading ID of a stripped line; with averages a line whose first
+    CSV field is a quoted ID ('"1",FPOS,...') counts as well, as it did
+    for the csv.reader of Main_Code_average. None beyond int64."""
+    eid = leading_int(text)
+    if eid is None and averages:
+        values = csv_values(text)
+        eid = None if values is None else values[0]
+    return eid if eid is not None and eid.bit_length() < 63 else None
+
+
+def _scan_groups_python(path, index, outputs, stats, averages, areas):
+    with open(path, 'r', encoding='utf-8') as fin:
+        for line in fin:
+            stripped = line.strip()
+            if not stripped:
+                continue
+            # output lines by the leading ID, statistics by the CSV rule
+            mask = index.masks.get(_group_id(stripped, False), 0)
+            stat_mask = index.masks.get(_group_id(stripped, True), 0) if averages else 0
+            if not (mask or stat_mask):
+                continue
+            values = csv_values(line.rstrip('\n')) if stat_mask else None
+            weight = None if areas is None or values is None else areas.get([values[0]])
+            text = line if line.endswith("\n") else line + "\n"
+            for g in range(len(index)):
+                if (mask >> g) & 1:
+                    stats.lines[g] += 1
+                    if outputs is not None and outputs[g] is not None:
+                        outputs[g].write(text)
+                if values is not None and (stat_mask >> g) & 1:
+                    stats.add(g, [values[1]], [values[2]], weight)
+
+
+def _scan_groups_store(path, index, outputs, stats, averages, areas):
+    from film_store import load_film_store
+    store = load_film_store(path)
+    for lo, hi in store.blocks():
+        ids = np.asarray(store.ids[lo:hi], dtype=np.int64)
+        row = index.rows(ids)
+        lines = np.flatnonzero(row >= 0)
+        if averages:
+            temp = np.asarray(store.temp[lo:hi][lines], dtype=np.float64)
+            htc = np.asarray(store.htc[lo:hi][lines], dtype=np.float64)
+            weight = None if areas is None else areas.get(ids[lines])
+
+        for g in range(len(index)):
+            sel = index.members(row[lines], g)
+            if not sel.any():
+                continue
+            stats.lines[g] += int(sel.sum())
+            if outputs is not None and outputs[g] is not None:
+                outputs[g].write(store.format_rows(lines[sel] + lo))
+            if averages:
+                stats.add(g, temp[sel], htc[sel], None if weight is None else weight[sel])
+
+
+def scan_groups(path, groups, outputs=None, averages=True, areas=None,
+                chunk_size=CHUNK_SIZE):
+    """One pass over `path` for many ID groups.
+
+    groups   : [(name, ids), ...] or a GroupIndex
+    outputs  : optional list of text files (one per group, None to skip);
+               each gets the lines of its group, as extract_lines() would
+    averages : accumulate TEMP / HTC statistics (Main_Code_average rule)
+    areas    : optional AreaTable for the area-weighted means
+    Returns a GroupStats. Memory does not grow with the file.
+    """
+    index = groups if isinstance(groups, GroupIndex) else GroupIndex(groups)
+    stats = GroupStats(index.names)
+
+    if os.path.isdir(path):
+        _scan_groups_store(path, index, outputs, stats, averages, areas)
+        return stats
+
+    if np is None:
+        _scan_groups_python(path, index, outputs, stats, averages, areas)
+        return stats
+
+    for data in iter_chunks(path, chunk_size):
+        buf = np.frombuffer(data, dtype=np.uint8)
+        starts, ends, ids, status, id_end = scan_leading_ids(data)
+        check = status == UNSURE
+        if averages and buf.size:
+            # csv.reader rule of the statistics: a quoted first field
+            # ('"1",...') may hold the ID; output lines keep the leading ID
+            quoted = (status == NO_ID) & (starts < ends)
+            quoted[quoted] = buf[starts[quoted]] == 34
+            check |= quoted
+
+        # row: group row of the line by its leading ID (outputs, line
+        # counts); stat_row: by the CSV rule of the averages
+        row = np.full(starts.size, -1, dtype=np.int64)
+        ok = status == ID_OK
+        row[ok] = index.rows(ids[ok])
+        stat_row = row.copy() if averages else row
+        for k in np.flatnonzero(check):
+            text = _text(data[starts[k]:ends[k]]).strip()
+            eid = _group_id(text, False) if status[k] == UNSURE else None
+            if eid is not None:
+                ids[k] = eid
+                row[k] = index.rows(np.array([eid], dtype=np.int64))[0]
+            if averages:
+                sid = _group_id(text, True)
+                if sid is not None:
+                    ids[k] = sid
+                    stat_row[k] = index.rows(np.array([sid], dtype=np.int64))[0]
+
+        lines = np.flatnonzero((row >= 0) | (stat_row >= 0))
+        if averages:
+            # a line valid by the CSV rule has int(row[0]) == its ID in ids
+            valid, temp, htc = _film_values(data, buf, starts, ends, id_end, lines)
+            weight = None if areas is None else areas.get(ids[lines])
+
+        for g in range(len(index)):
+            sel = (row[lines] >= 0) & index.members(np.maximum(row[lines], 0), g)
+            if sel.any():
+                rows = lines[sel]
+                stats.lines[g] += rows.size
+                if outputs is not None and outputs[g] is not None:
+                    text = _text(_gather_lines(data, starts[rows], ends[rows]))
+                    outputs[g].write(text if text.endswith("\n") else text + "\n")
+            if averages:
+                use = (stat_row[lines] >= 0) & index.members(np.maximum(stat_row[lines], 0), g)
+                use &= valid
+                if use.any():
+                    stats.add(g, temp[use], htc[use],
+                              None if weight is None else weight[use])
+
+    return stats
@@ -0,0 +1,422 @@
+##############################################
+### HEADLESS BATCH CLI FOR THE MAPPING TOOLS
+##############################################
+### Runs the same core functions as the PSJ dialogs, without pyjdg / Tk.
+### Inputs can be files, globs or @manifest files (one path or glob per
+### line, '#' comments, relative to the manifest folder). Independent
+### input files are spread over a process pool (-j / --jobs).
+###
+### Examples:
+###   python mapping_cli.py to-store "cases/*_mapping_WJ.inp"
+###   python mapping_cli.py wj "cases/*_mapping_WJ.film" -o out -j 8
+###   python mapping_cli.py wj case_mapping_WJ.inp --compact --htc-tol 0.02
+###   python mapping_cli.py copy --model engine.inp @cases.txt
+###   python mapping_cli.py extract --ids port1.inp results/*.inp
+###   python mapping_cli.py average --ids port1.inp results/*.inp
+###   python mapping_cli.py groups --ids ports.inp cyl*.inp -- results/*.inp
+###   python mapping_cli.py stats --ids ports.inp --model engine.inp results/*.inp
+###   python mapping_cli.py adjust-htc --ids ids.inp --htc htc.txt res.inp
+###   python mapping_cli.py adjust-htc --ids ids.inp --htc htc.txt --in-place res.inp
+###   python mapping_cli.py adjust-htc --table corrections.inp res.inp
+###   python mapping_cli.py lint --max-locations 50 "models/*.inp"
+###   python mapping_cli.py split-sets --format xlsx ALL_RESULTS.csv
+###   python mapping_cli.py remap --cfd-mesh cfd.inp --cfd-result cfd_res.inp fe_*.inp
+###   python mapping_cli.py preview --model engine.inp results/*.inp
+###   python mapping_cli.py copy --model engine.inp res.inp --perf-log perf.jsonl --profile
+##############################################
+### Update: 18/10/2026
+##############################################
+
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+
+# ============================================================
+# INPUT EXPANSION
+# ============================================================
+def expand_inputs(patterns):
+    """Files from paths, globs and @manifest files, in order, no duplicates."""
+    out, seen = [], set()
+
+    def add(pattern, base_dir):
+        pattern = os.path.join(base_dir, os.path.expanduser(pattern))
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        if not matches:
+            print(f"WARNING: no file matches {pattern}", file=sys.stderr)
+        for path in matches:
+            key = os.path.normcase(os.path.abspath(path))
+            if key not in seen:
+                seen.add(key)
+                out.append(path)
+
+    for pattern in patterns:
+        if pattern.startswith('@'):
+            manifest = pattern[1:]
+            base_dir = os.path.dirname(os.path.abspath(manifest))
+            with open(manifest, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if line and not line.startswith('#'):
+                        add(line, base_dir)
+        else:
+            add(pattern, '')
+
+    return out
+
+
+def _output_path(out_dir, input_path, suffix):
+    stem = os.path.splitext(os.path.basename(input_path))[0]
+    folder = out_dir or os.path.dirname(os.path.abspath(input_path))
+    os.makedirs(folder, exist_ok=True)
+    return os.path.join(folder, stem + suffix)
+
+
+# ============================================================
+# JOBS (one input file each, top level so they can be pickled)
+# ============================================================
+def job_to_store(path, opts):
+    import film_store
+    out_dir = _output_path(opts["out_dir"], path, film_store.STORE_SUFFIX)
+    out_dir, n = film_store.convert_to_store(path, out_dir, opts["float32"])
+    return f"{n} rows -> {out_dir}"
+
+
+def job_to_inp(path, opts):
+    import film_store
+    out_file = _output_path(opts["out_dir"], os.path.normpath(path), "_FILM.inp")
+    out_file, n = film_store.write_film_inp(film_store.load_film_store(path), out_file)
+    return f"{n} rows -> {out_file}"
+
+
+def job_wj(path, opts):
+    import MAIN_PSJ_WJ
+    folder = _output_path(opts["out_dir"], path, "_HEAT")
+    n = MAIN_PSJ_WJ.generate_heat_files(path, folder, opts["compact"],
+                                        opts["htc_tol"], opts["temp_tol"])
+    return f"{n} elements -> {folder}"
+
+
+def job_copy(path, opts):
+    import COpy_no_pattern
+    out_file = _output_path(opts["out_dir"], path, "_COPIED.inp")
+    n = COpy_no_pattern.export_copied_results(opts["model"], path, out_file)
+    return f"{n} elements -> {out_file}"
+
+
+def job_preview(path, opts):
+    import COpy_no_pattern
+    mesh, results = COpy_no_pattern.load_propagated(opts["model"], path)
+    out_files = []
+    for index, title in enumerate(("TEMPERATURE", "HTC")):
+        out_file = _output_path(opts["out_dir"], path, f"_{title}.png")
+        COpy_no_pattern.plot_results(mesh, results, index, title, out_file=out_file,
+                                     labels=opts["labels"], max_faces=opts["max_faces"])
+        out_files.append(out_file)
+    return f"{len(mesh)} elements -> {', '.join(out_files)}"
+
+
+def job_extract(path, opts):
+    import Select_element_results
+    out_file = None
+    if opts["out_dir"]:
+        out_file = _output_path(opts["out_dir"], path, "_EXTRACT.inp")
+    out_file, n = Select_element_results.extract_to_inp(opts["ids"], path, out_file)
+    return f"{n} elements -> {out_file}"
+
+
+def job_average(path, opts):
+    import Main_Code_average
+    avg_temp, avg_htc, n = Main_Code_average.compute_average(opts["ids"], path)
+    if avg_temp is None:
+        return "no matching elements"
+    return f"{n} elements, TEMP {avg_temp:.4f}, HTC {avg_htc:.4f}"
+
+
+def job_groups(path, opts):
+    import Select_element_results
+    report = Select_element_results.extract_groups(opts["ids"], path, opts["out_dir"])
+    lines = sum(r[2] for r in report)
+    return f"{len(report)} groups, {lines} lines extracted"
+
+
+def job_stats(path, opts):
+    import Main_Code_average
+    rows = Main_Code_average.compute_statistics(opts["ids"], path, opts["model"],
+                                                opts["by_elset"])
+    out_file = _output_path(opts["out_dir"], path, "_STATS.csv")
+    Main_Code_average.write_statistics_csv(rows, out_file)
+    return f"{len(rows)} groups -> {out_file}"
+
+
+def job_adjust_htc(path, opts):
+    import Adjust_HTC_average
+    suffix = "_CORRECTED" if opts["table"] else "_HTC_UPDATED"
+    out_file = None
+    if opts["out_dir"] and not opts["in_place"]:
+        ext = os.path.splitext(path)[1]
+        out_file = _output_path(opts["out_dir"], path, suffix + ext)
+    if opts["table"]:
+        out_file, n = Adjust_HTC_average.apply_corrections(opts["table"], path, out_file,
+                                                           opts["in_place"])
+    elif opts["ids"] and opts["htc"]:
+        out_file, n = Adjust_HTC_average.update_htc(opts["ids"], path, opts["htc"], out_file,
+                                                    opts["in_place"])
+    else:
+        raise ValueError("adjust-htc needs --table, or --ids and --htc")
+    return f"{n} elements -> {out_file}"
+
+
+def job_lint(path, opts):
+    import inp_lint
+    report = inp_lint.lint_file(path, opts["max_locations"])
+    if not report.issues:
+        return f"{report.lines} lines, no issues"
+    return "\n" + report.summary()
+
+
+def job_split_sets(path, opts):
+    import split_by_setid
+    outputs, rows = split_by_setid.split_by_setid(path, opts["out_dir"], opts["format"],
+                                                  opts["by_subcase"], opts["skip_step0"],
+                                                  opts["sets"])
+    return f"{sum(rows.values())} rows, {len(rows)} sets -> {', '.join(outputs)}"
+
+
+def job_remap(path, opts):
+    import cfd_remap
+    out_file = None
+    if opts["out_dir"]:
+        out_file = _output_path(opts["out_dir"], path, "_REMAP.film" if opts["store"] else "_REMAP.inp")
+    kw = {"k": opts["k"], "power": opts["power"]} if opts["method"] == "idw" else {}
+    out_file, mapped, unmapped = cfd_remap.remap_files(
+        opts["cfd_mesh"], opts["cfd_result"], path, out_file, opts["method"], opts["face"],
+        opts["max_distance"], opts["store"], **kw)
+    return f"{mapped} faces mapped, {unmapped} unmapped -> {out_file}"
+
+
+JOBS = {
+    "to-store": job_to_store,
+    "to-inp": job_to_inp,
+    "wj": job_wj,
+    "copy": job_copy,
+    "preview": job_preview,
+    "extract": job_extract,
+    "average": job_average,
+    "groups": job_groups,
+    "stats": job_stats,
+    "adjust-htc": job_adjust_htc,
+    "lint": job_lint,
+    "split-sets": job_split_sets,
+    "remap": job_remap,
+}
+
+
+def _timed(job, path, opts):
+    t0 = time.perf_counter()
+    msg = job(path, opts)
+    return msg, time.perf_counter() - t0
+
+
+# ============================================================
+# RUNNER
+# ============================================================
+def run_jobs(job, inputs, opts, jobs=None):
+    """Run `job` for every input file, in parallel when jobs > 1.
+
+    Returns the number of failed files.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    jobs = max(1, min(jobs, len(inputs)))
+    failed = 0
+
+    def report(path, fut_result=None, error=None):
+        if error is None:
+            msg, dt = fut_result
+            print(f"[ OK ] {path}: {msg} ({dt:.1f} s)")
+        else:
+            print(f"[FAIL] {path}: {error}", file=sys.stderr)
+
+    if jobs == 1:
+        for path in inputs:
+            try:
+                report(path, _timed(job, path, opts))
+            except Exception as e:
+                report(path, error=e)
+                failed += 1
+        return failed
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(_timed, job, path, opts): path for path in inputs}
+        for fut in as_completed(futures):
+            path = futures[fut]
+            try:
+                report(path, fut.result())
+            except Exception as e:
+                report(path, error=e)
+                failed += 1
+    return failed
+
+
+# ============================================================
+# COMMAND LINE
+# ============================================================
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="mapping_cli.py",
+        description="Batch runner for the CFD mapping tools (no PSJ / Tk needed).")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def add(name, help_text):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("inputs", nargs="+",
+                       help="input files, globs or @manifest files")
+        p.add_argument("-j", "--jobs", type=int, default=None,
+                       help="parallel processes (default: CPU count)")
+        p.add_argument("--perf-log", default=None,
+                       help="perf_trace: JSON timing records file (default "
+                            "MAPPING_PERF_LOG or ~/mapping_perf.jsonl, 'off' = none)")
+        p.add_argument("--profile", action="store_true",
+                       help="perf_trace: cProfile capture next to the timing records")
+        return p
+
+    p = add("to-store", "film_store: parse result files once into binary .film stores "
+                        "(accepted by every command instead of the text file)")
+    p.add_argument("-o", "--out-dir", default=None,
+                   help="folder for <input>.film (default: next to the input)")
+    p.add_argument("--float32", action="store_true",
+                   help="store TEMP / HTC as float32 (default float64)")
+
+    p = add("to-inp", "film_store: write a .film store as *FILM text")
+    p.add_argument("-o", "--out-dir", default=None,
+                   help="folder for <input>_FILM.inp (default: next to the input)")
+
+    p = add("wj", "MAIN_PSJ_WJ: write _HEAT_* files for each mapping_WJ file")
+    p.add_argument("-o", "--out-dir", default=None,
+                   help="output root, one <input>_HEAT folder per input "
+                        "(default: next to the input)")
+    p.add_argument("--compact", action="store_true",
+                   help="shared film properties and grouped surfaces")
+    p.add_argument("--htc-tol", type=float, default=0.01,
+                   help="compact: relative HTC tolerance (default 0.01)")
+    p.add_argument("--temp-tol", type=float, default=0.0,
+                   help="compact: absolute TEMP tolerance in C (default 0 = exact)")
+
+    p = add("copy", "COpy_no_pattern: copy results into unmapped elements")
+    p.add_argument("--model", required=True, help="INP file with nodes and elements")
+    p.add_argument("-o", "--out-dir", default=None,
+                   help="folder for <input>_COPIED.inp (default: next to the input)")
+
+    p = add("preview", "COpy_no_pattern: TEMP / HTC preview images (offscreen PNG)")
+    p.add_argument("--model", required=True, help="INP file with nodes and elements")
+    p.add_argument("--labels", type=int, default=20,
+                   help="value labels at most (default 20, 0 = none)")
+    p.add_argument("--max-faces", type=int, default=20000,
+                   help="triangles drawn before clustering (default 20000)")
+    p.add_argument("-o", "--out-dir", default=None,
+                   help="folder for <input>_TEMPERATURE.png / _HTC.png (default: next to the input)")
+
+    p = add("extract", "Select_element_results: extract ID subset to *FILM INP")
+    p.add_argument("--ids", required=True, help="ID file")
+    p.add_argument("-o", "--out-dir", default=None,
+                   help="folder for <input>_EXTRACT.inp (default: next to the input)")
+
+    p = add("average", "Main_Code_average: average TEMP / HTC of an ID subset")
+    p.add_argument("--ids", required=True, help="INP / ID file with element IDs")
+    p.set_defaults(out_dir=None)
+
+    p = add("groups", "extract + average many ID groups in one pass per result file")
+    p.add_argument("--ids", required=True, nargs="+",
+                   help="ID files; files with *ELSET blocks give one group per ELSET")
+    p.add_argument("-o", "--out-dir", default=None,
+                   help="folder for <input>_<group>_EXTRACT.inp and "
+                        "<input>_GROUP_AVERAGES.csv (default: next to the input)")
+
+    p = add("stats", "count / mean / min / max / std and area-weighted means per group")
+    p.add_argument("--ids", nargs="*", default=[],
+                   help="ID files (groups as for 'groups')")
+    p.add_argument("--model", default=None,
+                   help="INP model with nodes and elements (element areas)")
+    p.add_argument("--by-elset", action="store_true",
+                   help="also one group per ELSET of the model")
+    p.add_argument("-o", "--out-dir", default=None,
+                   help="folder for <input>_STATS.csv (default: next to the input)")
+
+    p = add("adjust-htc", "Adjust_HTC_average: overwrite HTC of an ID subset, "
+                          "or apply a TEMP / HTC correction table")
+    p.add_argument("--ids", default=None, help="ID file")
+    p.add_argument("--htc", default=None, help="HTC file")
+    p.add_argument("--table", default=None,
+                   help="correction table (*HTC / *TEMP / SCALE / *GROUPS), "
+                        "replaces --ids / --htc")
+    p.add_argument("-o", "--out-dir", default=None,
+                   help="folder for <input>_HTC_UPDATED / _CORRECTED "
+                        "(default: next to the input)")
+    p.add_argument("--in-place", action="store_true",
+                   help="patch the input files themselves")
+
+    p = add("lint", "6_Check_blank_lines: blank lines, orphan data lines, *FILM rows "
+                    "without header, duplicate node / element / film IDs")
+    p.add_argument("--max-locations", type=int, default=20,
+                   help="locations listed per check (default 20)")
+
+    p = add("split-sets", "split_by_setid: split ALL_RESULTS.csv (HypeTCL) per SetID")
+    p.add_argument("--format", choices=("csv", "bin", "xlsx"), default="csv",
+                   help="per-set CSV, float64 .bin or one xlsx workbook (default csv)")
+    p.add_argument("--by-subcase", action="store_true",
+                   help="one output per SetID and subcase")
+    p.add_argument("--skip-step0", action="store_true",
+                   help="drop the step 0 rows of subcases > 1")
+    p.add_argument("--sets", type=int, nargs="+", default=None,
+                   help="only these SetIDs (default: all)")
+    p.add_argument("-o", "--out-dir", default=None,
+                   help="output folder (default: next to the input)")
+
+    p = add("remap", "cfd_remap: map CFD TEMP / HTC onto target .inp meshes by position "
+                     "(no matching IDs needed)")
+    p.add_argument("--cfd-mesh", required=True, help="CFD surface mesh (.inp nodes + elements)")
+    p.add_argument("--cfd-result", required=True, help="CFD result (*FILM rows or .film store)")
+    p.add_argument("--method", choices=("nearest", "idw", "barycentric"), default="nearest",
+                   help="interpolation (default nearest)")
+    p.add_argument("-k", type=int, default=4, help="idw: neighbours (default 4)")
+    p.add_argument("--power", type=float, default=2.0, help="idw: distance power (default 2)")
+    p.add_argument("--max-distance", type=float, default=None,
+                   help="leave target faces further than this unmapped")
+    p.add_argument("--face", default="FPOS", help="face label of the output rows (default FPOS)")
+    p.add_argument("--store", action="store_true", help="write a .film store instead of *FILM text")
+    p.add_argument("-o", "--out-dir", default=None,
+                   help="folder for <input>_REMAP.inp / .film (default: next to the input)")
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    inputs = expand_inputs(args.inputs)
+    if not inputs:
+        print("No input files.", file=sys.stderr)
+        return 2
+
+    # Timing records (perf_trace), inherited by the worker processes
+    if args.perf_log:
+        os.environ["MAPPING_PERF_LOG"] = args.perf_log
+    if args.profile:
+        os.environ["MAPPING_PROFILE"] = "1"
+    os.environ.setdefault("MAPPING_PERF_PRINT", "0")
+
+    opts = {k: v for k, v in vars(args).items()
+            if k not in ("command", "inputs", "jobs", "perf_log", "profile")}
+
+    t0 = time.perf_counter()
+    failed = run_jobs(JOBS[args.command], inputs, opts, args.jobs)
+    print(f"{len(inputs) - failed}/{len(inputs)} files done "
+          f"in {time.perf_counter() - t0:.1f} s")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
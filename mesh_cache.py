@@ -0,0 +1,281 @@
+##############################################
+### ON-DISK CACHE FOR PARSED MESHES AND PROPAGATED RESULTS
+##############################################
+### Parsed meshes, propagated results and other arrays derived from a
+### file (line indexes, ...) are stored as .npy files in a hidden folder
+### next to the input file:
+###     <folder>/.<file name>.npcache/
+### They are memory-mapped on load (no parsing). The cache entry is keyed
+### by path, size, mtime and a content hash of the source file and is
+### dropped as soon as the source changes.
+##############################################
+### Update: 18/10/2026
+##############################################
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from mesh_store import Mesh
+
+
+CACHE_VERSION = 2
+
+MESH_ARRAYS = ("node_ids", "coords", "elem_ids", "conn", "node_order", "elem_order",
+               "corners")
+
+# Content hash: files up to HASH_SAMPLES * HASH_BLOCK bytes are hashed
+# completely, larger files through HASH_SAMPLES evenly spaced blocks
+# (always including the first and the last block).
+HASH_BLOCK = 1 << 20
+HASH_SAMPLES = 16
+
+
+# ============================================================
+# SOURCE KEY
+# ============================================================
+def content_hash(path, full=False):
+    if os.path.isdir(path):                 # film store: all its files
+        h = hashlib.blake2b(digest_size=16)
+        for name in sorted(os.listdir(path)):
+            h.update(name.encode())
+            h.update(content_hash(os.path.join(path, name), full).encode())
+        return h.hexdigest()
+
+    h = hashlib.blake2b(digest_size=16)
+    size = os.path.getsize(path)
+    h.update(str(size).encode())
+
+    with open(path, 'rb') as f:
+        if full or size <= HASH_SAMPLES * HASH_BLOCK:
+            for block in iter(lambda: f.read(HASH_BLOCK), b''):
+                h.update(block)
+        else:
+            step = (size - HASH_BLOCK) // (HASH_SAMPLES - 1)
+            for i in range(HASH_SAMPLES):
+                f.seek(i * step)
+                h.update(f.read(HASH_BLOCK))
+
+    return h.hexdigest()
+
+
+def source_key(path, full_hash=False):
+    st = os.stat(path)
+    return {
+        "path": os.path.normcase(os.path.abspath(path)),
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "hash": content_hash(path, full_hash),
+    }
+
+
+def cache_dir(path):
+    folder, name = os.path.split(os.path.abspath(path))
+    return os.path.join(folder, "." + name + ".npcache")
+
+
+def _digest(obj):
+    text = json.dumps(obj, sort_keys=True).encode()
+    return hashlib.blake2b(text, digest_size=8).hexdigest()
+
+
+# ============================================================
+# LOW LEVEL STORE
+# ============================================================
+def _read_json(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path, obj):
+    tmp = path + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(obj, f, indent=1)
+    os.replace(tmp, path)
+
+
+def _save_array(folder, name, arr):
+    # np.save appends '.npy' to names that do not end with it
+    tmp = os.path.join(folder, name + ".tmp.npy")
+    np.save(tmp, np.ascontiguousarray(arr))
+    os.replace(tmp, os.path.join(folder, name + ".npy"))
+
+
+def _load_array(folder, name):
+    return np.load(os.path.join(folder, name + ".npy"), mmap_mode='r')
+
+
+def clear_cache(path):
+    """Remove the cache folder of `path` (key file first, so a partly
+    removed folder is never seen as valid)."""
+    folder = cache_dir(path)
+    if not os.path.isdir(folder):
+        return
+    names = sorted(os.listdir(folder), key=lambda n: n != "key.json")
+    for name in names:
+        try:
+            os.remove(os.path.join(folder, name))
+        except OSError:
+            pass
+    try:
+        os.rmdir(folder)
+    except OSError:
+        pass
+
+
+def _valid_folder(path, key):
+    """Cache folder of `path` if it belongs to `key`, else drop it."""
+    folder = cache_dir(path)
+    stored = _read_json(os.path.join(folder, "key.json"))
+    if stored == {"version": CACHE_VERSION, "source": key}:
+        return folder
+    if stored is not None or os.path.isdir(folder):
+        clear_cache(path)
+    return None
+
+
+# ============================================================
+# MESH
+# ============================================================
+def load_mesh(inp_file, use_cache=True):
+    """Mesh of `inp_file`, memory-mapped from the cache when valid.
+
+    On a miss the file is parsed and the cache is written. If the cache
+    folder cannot be written (read-only share, ...) the parsed mesh is
+    returned anyway.
+    """
+    if not use_cache:
+        return Mesh.from_inp(inp_file)
+
+    key = source_key(inp_file)
+    folder = _valid_folder(inp_file, key)
+    if folder is not None:
+        try:
+            arrays = {name: _load_array(folder, name) for name in MESH_ARRAYS}
+            return Mesh(**arrays)
+        except (OSError, ValueError):
+            clear_cache(inp_file)
+
+    mesh = Mesh.from_inp(inp_file)
+    try:
+        folder = cache_dir(inp_file)
+        os.makedirs(folder, exist_ok=True)
+        arrays = {
+            "node_ids": mesh.node_ids,
+            "coords": mesh.coords,
+            "elem_ids": mesh.elem_ids,
+            "conn": mesh.conn,
+            "node_order": mesh.node_index.order,
+            "elem_order": mesh.elem_index.order,
+            "corners": mesh.surface_corners,
+        }
+        for name, arr in arrays.items():
+            _save_array(folder, name, arr)
+        _write_json(os.path.join(folder, "key.json"),
+                    {"version": CACHE_VERSION, "source": key})
+    except OSError as e:
+        print(f"Mesh cache not written ({e})")
+    return mesh
+
+
+# ============================================================
+# RESULTS DERIVED FROM A MESH
+# ============================================================
+def load_results(inp_file, result_file, compute, tag="results", use_cache=True):
+    """Array derived from a mesh and a result file, e.g. propagated results.
+
+    compute() is called on a miss and must return a NumPy array.
+    The entry is stored in the mesh cache folder, so it is dropped
+    together with the mesh, and it is keyed by the result file as well.
+    A cached array is returned read-only (memory-mapped).
+    """
+    if not use_cache:
+        return compute()
+
+    mesh_key = source_key(inp_file)
+    folder = _valid_folder(inp_file, mesh_key)
+    res_key = {"tag": tag, "source": source_key(result_file)}
+    name = f"{tag}_{_digest(res_key['source']['path'])}"
+
+    if folder is not None:
+        stored = _read_json(os.path.join(folder, name + ".json"))
+        if stored == res_key:
+            try:
+                return _load_array(folder, name)
+            except (OSError, ValueError):
+                pass
+
+    values = compute()
+    # compute() usually loads the mesh itself - reuse its folder if valid
+    folder = _valid_folder(inp_file, mesh_key)
+    if folder is None:
+        return values
+    try:
+        meta = os.path.join(folder, name + ".json")
+        if os.path.exists(meta):
+            os.remove(meta)
+        _save_array(folder, name, values)
+        _write_json(meta, res_key)
+    except OSError as e:
+        print(f"Result cache not written ({e})")
+    return values
+
+
+# ============================================================
+# ARRAYS DERIVED FROM ONE FILE
+# ============================================================
+def load_file_arrays(path, tag, compute, use_cache=True):
+    """Dict of arrays derived from `path` alone, e.g. a line index.
+
+    compute() is called on a miss and must return {name: NumPy array}.
+    The arrays are stored as <tag>_<name>.npy in the cache folder of
+    `path` and returned memory-mapped while the folder is valid.
+    """
+    if not use_cache:
+        return compute()
+
+    key = source_key(path)
+    folder = _valid_folder(path, key)
+    meta = os.path.join(cache_dir(path), tag + ".json")
+
+    if folder is not None:
+        names = _read_json(meta)
+        if isinstance(names, list):
+            try:
+                return {name: _load_array(folder, f"{tag}_{name}") for name in names}
+            except (OSError, ValueError):
+                pass
+
+    arrays = compute()
+    try:
+        folder = cache_dir(path)
+        os.makedirs(folder, exist_ok=True)
+        if os.path.exists(meta):
+            os.remove(meta)
+        for name, arr in arrays.items():
+            _save_array(folder, f"{tag}_{name}", arr)
+        _write_json(meta, sorted(arrays))
+        key_file = os.path.join(folder, "key.json")
+        if _read_json(key_file) != {"version": CACHE_VERSION, "source": key}:
+            _write_json(key_file, {"version": CACHE_VERSION, "source": key})
+    except OSError as e:
+        print(f"Index cache not written ({e})")
+    return arrays
+
+
+def update_key(path):
+    """Re-key the cache folder of `path` after an edit that keeps every
+    cached entry valid (values overwritten in place, same line offsets).
+    Must only follow a load from a valid folder."""
+    key_file = os.path.join(cache_dir(path), "key.json")
+    if _read_json(key_file) is None:
+        return
+    try:
+        _write_json(key_file, {"version": CACHE_VERSION, "source": source_key(path)})
+    except OSError:
+        clear_cache(path)
@@ -0,0 +1,191 @@
+##############################################
+### FAST RESULT PREVIEW FOR LARGE MESHES
+##############################################
+### Triangles and colours are taken from the Mesh arrays in one go.
+### Above max_faces the elements are clustered on a voxel grid and each
+### cluster is drawn as its largest triangle, scaled to the cluster area
+### and coloured with the area-weighted mean of the cluster, so the
+### preview cost stays flat.
+### Value labels are optional and capped (min, max and an even sample).
+### With out_file the figure is rendered offscreen (Agg, no pyplot
+### window), optionally on a background thread (export_previews_async).
+##############################################
+### Update: 18/10/2026
+##############################################
+
+import threading
+
+import numpy as np
+
+
+MAX_FACES = 20000               # triangles drawn before clustering
+MAX_LABELS = 20                 # value labels drawn at most
+EDGE_FACES = 5000               # element edges drawn up to this count
+DPI = 150
+
+_RENDER_LOCK = threading.Lock()     # one offscreen render at a time
+
+
+# ============================================================
+# FACES
+# ============================================================
+def _areas(xyz):
+    n = np.cross(xyz[:, 1] - xyz[:, 0], xyz[:, 2] - xyz[:, 0])
+    return 0.5 * np.sqrt(np.einsum('mi,mi->m', n, n))
+
+
+def _cluster(centers, target):
+    """Cluster id per face on a voxel grid with about `target` cells."""
+    lo = centers.min(axis=0)
+    extent = np.maximum(centers.max(axis=0) - lo, 1e-12)
+    e = np.sort(extent)[::-1]
+    cell = np.sqrt(e[0] * e[1] / target)           # surface: ~2D spread
+    for _ in range(8):
+        cells = np.floor((centers - lo) / cell).astype(np.int64)
+        dims = cells.max(axis=0) + 1
+        key = cells[:, 0] + dims[0] * (cells[:, 1] + dims[1] * cells[:, 2])
+        uniq, inverse = np.unique(key, return_inverse=True)
+        if uniq.size <= target:
+            return inverse.ravel(), uniq.size
+        cell *= np.sqrt(uniq.size / target) * 1.05
+    return inverse.ravel(), uniq.size
+
+
+def preview_faces(mesh, values, max_faces=MAX_FACES):
+    """(triangles (F, 3, 3), colours (F,)) to draw for one result column;
+    at most max_faces triangles (clustered above that)."""
+    rows = np.flatnonzero(mesh.is_tri)
+    xyz = mesh.corner_xyz()[rows]
+    colors = np.asarray(values, dtype=np.float64)[rows]
+    if rows.size <= max_faces:
+        return xyz, colors
+
+    group, n_groups = _cluster(xyz.mean(axis=1), max_faces)
+    area = _areas(xyz)
+    ok = np.isfinite(colors)
+    weight = np.bincount(group, np.where(ok, area, 0.0), minlength=n_groups)
+    total = np.bincount(group, np.where(ok, area * np.where(ok, colors, 0.0), 0.0),
+                        minlength=n_groups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(weight > 0, total / weight, np.nan)
+
+    # largest triangle of each cluster, scaled to the cluster area and
+    # moved to its centre so the clusters cover the surface
+    order = np.lexsort((-area, group))
+    first = order[np.r_[True, group[order][1:] != group[order][:-1]]]
+    cluster_area = np.bincount(group, area, minlength=n_groups)
+    centers = np.stack([np.bincount(group, area * xyz[:, :, i].mean(axis=1), minlength=n_groups)
+                        for i in range(3)], axis=1) / np.maximum(cluster_area, 1e-300)[:, None]
+    rep = xyz[first]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        scale = np.sqrt(cluster_area[group[first]] / area[first])
+    scale = np.where(np.isfinite(scale), scale, 1.0)[:, None, None]
+    rep = centers[group[first]][:, None, :] + (rep - rep.mean(axis=1, keepdims=True)) * scale
+    return rep, mean[group[first]]
+
+
+def _label_rows(colors, n_labels):
+    """Rows to label: min, max, then an even sample of the finite values."""
+    finite = np.flatnonzero(np.isfinite(colors))
+    if not n_labels or not finite.size:
+        return np.zeros(0, dtype=np.int64)
+    picks = [finite[np.argmin(colors[finite])], finite[np.argmax(colors[finite])]]
+    picks += finite[np.linspace(0, finite.size - 1, max(n_labels - 2, 0)).astype(np.int64)].tolist()
+    return np.unique(picks)[:n_labels]
+
+
+# ============================================================
+# DRAWING
+# ============================================================
+def _colormap(name):
+    try:
+        from matplotlib import colormaps
+        cmap = colormaps[name]
+    except ImportError:
+        # matplotlib < 3.5
+        from matplotlib import cm
+        cmap = cm.get_cmap(name)
+    return cmap.with_extremes(bad='lightgrey')
+
+
+def _draw(fig, triangles, colors, title, cmap, labels):
+    from mpl_toolkits.mplot3d.art3d import Poly3DCollection
+
+    ax = fig.add_subplot(111, projection='3d')
+    many = len(triangles) > EDGE_FACES
+    poly = Poly3DCollection(triangles, edgecolors='none' if many else 'k',
+                            linewidths=0.5)
+    poly.set_array(np.ma.masked_invalid(colors))
+    poly.set_cmap(_colormap(cmap))
+    finite = colors[np.isfinite(colors)]
+    if finite.size:
+        poly.set_clim(finite.min(), finite.max())
+    ax.add_collection3d(poly)
+
+    if len(triangles):
+        pts = triangles.reshape(-1, 3)
+        lo, hi = np.nanmin(pts, axis=0), np.nanmax(pts, axis=0)
+        span = np.maximum(hi - lo, 1e-9 * max(float((hi - lo).max()), 1.0))
+        ax.set_xlim(lo[0], lo[0] + span[0])
+        ax.set_ylim(lo[1], lo[1] + span[1])
+        ax.set_zlim(lo[2], lo[2] + span[2])
+        ax.set_box_aspect(span)
+
+        centers = triangles.mean(axis=1)
+        for k in _label_rows(colors, labels).tolist():
+            c = centers[k]
+            ax.text(c[0], c[1], c[2], f"{colors[k]:.2f}", fontsize=8)
+
+    ax.set_title(title)
+    fig.colorbar(poly, ax=ax)
+    return ax
+
+
+def render_preview(mesh, values, title='VALUE', cmap='jet', out_file=None,
+                   max_faces=MAX_FACES, labels=MAX_LABELS):
+    """Preview one result column (values per mesh element row).
+
+    Without out_file the figure is shown (pyplot, blocking); with it the
+    image is rendered offscreen and saved. Returns the number of drawn
+    triangles.
+    """
+    triangles, colors = preview_faces(mesh, values, max_faces)
+    if out_file:
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+        fig = Figure(figsize=(10, 8))
+        FigureCanvasAgg(fig)
+        _draw(fig, triangles, colors, title, cmap, labels)
+        fig.tight_layout()
+        fig.savefig(out_file, dpi=DPI)
+    else:
+        import matplotlib.pyplot as plt
+        fig = plt.figure(figsize=(10, 8))
+        _draw(fig, triangles, colors, title, cmap, labels)
+        plt.tight_layout()
+        plt.show()
+    return len(triangles)
+
+
+def export_previews_async(mesh, images, cmap='jet', max_faces=MAX_FACES,
+                          labels=MAX_LABELS, done=None):
+    """render_preview(..., out_file) for [(values, out_file, title), ...]
+    one after the other on a daemon thread, so the calling session is not
+    blocked. matplotlib is not thread-safe: renders of all calls share one
+    lock. done(out_file, error) is called per image, error None when it
+    was written, else the exception."""
+    def run():
+        for values, out_file, title in images:
+            try:
+                with _RENDER_LOCK:
+                    render_preview(mesh, values, title, cmap, out_file, max_faces, labels)
+            except Exception as e:
+                error = e
+            else:
+                error = None
+            if done is not None:
+                done(out_file, error)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
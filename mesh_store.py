@@ -0,0 +1,261 @@
+##############################################
+### NUMPY MESH STORE
+##############################################
+### Node IDs / coordinates and element IDs / connectivity in contiguous
+### NumPy arrays, with a sorted-ID index for id -> row lookup.
+### Geometry (corner coordinates, edge lengths, longest edge, centroid,
+### area) is computed for all elements at once.
+##############################################
+### Update: 18/10/2026
+##############################################
+
+import numpy as np
+
+from inp_reader import read_inp
+
+
+# Element types with a surface (area): shells, membranes, 2D / axisymmetric
+# solids, surface / rigid / fluid elements. Solids (C3D4, C3D8, ...),
+# continuum shells (SC6R, SC8R) and springs get no area.
+SURFACE_TYPES = ("S", "M3D", "CPS", "CPE", "CAX", "CGAX", "DS", "DC2D", "DCAX",
+                 "SFM", "R3D", "F3D")
+NOT_SURFACE_TYPES = ("SC", "SPRING")
+SURFACE_CORNERS = {3: 3, 6: 3, 4: 4, 8: 4, 9: 4}     # nodes -> corner nodes
+
+
+def surface_corners(elem_type, width):
+    """Corner nodes (3 / 4) of a surface element type, 0 for any other."""
+    name = (elem_type or "").strip().upper()
+    if not name.startswith(SURFACE_TYPES) or name.startswith(NOT_SURFACE_TYPES):
+        return 0
+    return SURFACE_CORNERS.get(width, 0)
+
+
+def _id_dtype(*arrays):
+    # int32 halves the connectivity size for every realistic model
+    if all(a.dtype == np.int32 for a in arrays):
+        return np.int32
+    hi = max((int(a.max()) for a in arrays if a.size), default=0)
+    lo = min((int(a.min()) for a in arrays if a.size), default=0)
+    info = np.iinfo(np.int32)
+    return np.int32 if info.min < lo and hi <= info.max else np.int64
+
+
+class SortedIndex:
+    """ID -> row lookup through a sorted copy of the ID column."""
+
+    def __init__(self, ids, order=None):
+        self.order = np.argsort(ids, kind='stable') if order is None else order
+        self.sorted_ids = ids[self.order]
+
+    def rows(self, ids, missing=None):
+        """Rows of `ids`. Unknown IDs raise KeyError, or get `missing`."""
+        ids = np.asarray(ids)
+        n = self.sorted_ids.size
+        pos = np.searchsorted(self.sorted_ids, ids)
+        pos_c = np.minimum(pos, max(n - 1, 0))
+        found = (pos < n) & (self.sorted_ids[pos_c] == ids) if n else np.zeros(ids.shape, bool)
+        if not found.all():
+            if missing is None:
+                raise KeyError(int(ids[~found].flat[0]))
+            rows = np.full(ids.shape, missing, dtype=np.int64)
+            rows[found] = self.order[pos_c[found]]
+            return rows
+        return self.order[pos_c]
+
+
+class Mesh:
+    """Array-backed nodes + elements.
+
+    node_ids : (N,)   coords : (N, 3) float64
+    elem_ids : (M,)   conn   : (M, W) node IDs, rows shorter than W padded with -1
+    Element rows keep the file order.
+    corners : (M,) int8 corner nodes of surface elements (3 / 4), 0 for
+    other types (see surface_corners); None = from the node count only.
+    node_order / elem_order : optional precomputed argsort of the IDs
+    (e.g. loaded from mesh_cache) so the index is not sorted again.
+    """
+
+    def __init__(self, node_ids, coords, elem_ids, conn, node_order=None, elem_order=None,
+                 corners=None):
+        node_ids = np.asarray(node_ids)
+        elem_ids = np.asarray(elem_ids)
+        conn = np.asarray(conn)
+        dtype = _id_dtype(node_ids, elem_ids, conn)
+
+        self.node_ids = np.ascontiguousarray(node_ids, dtype=dtype)
+        self.coords = np.ascontiguousarray(coords, dtype=np.float64).reshape(-1, 3)
+        self.elem_ids = np.ascontiguousarray(elem_ids, dtype=dtype)
+        self.conn = np.ascontiguousarray(conn, dtype=dtype).reshape(self.elem_ids.size, -1)
+        if corners is None:
+            n_nodes = (self.conn >= 0).sum(axis=1)
+            corners = np.zeros(n_nodes.size, dtype=np.int8)
+            for width, count in SURFACE_CORNERS.items():
+                corners[n_nodes == width] = count
+        self.surface_corners = np.ascontiguousarray(corners, dtype=np.int8)
+
+        self.node_index = SortedIndex(self.node_ids, node_order)
+        self.elem_index = SortedIndex(self.elem_ids, elem_order)
+        self._corner_rows = None
+
+    # --------------------------------------------------------
+    @classmethod
+    def from_model(cls, model):
+        nodes = model.nodes
+        node_ids = np.frombuffer(nodes.ids, dtype=np.int64) if len(nodes) else np.zeros(0, np.int64)
+        coords = np.frombuffer(nodes.coords, dtype=np.float64) if len(nodes) else np.zeros(0)
+
+        blocks = model.elements.blocks
+        width = max((b.width for b in blocks), default=3)
+        n_elem = sum(len(b) for b in blocks)
+        elem_ids = np.empty(n_elem, dtype=np.int64)
+        conn = np.full((n_elem, width), -1, dtype=np.int64)
+        corners = np.zeros(n_elem, dtype=np.int8)
+        row = 0
+        for b in blocks:
+            n = len(b)
+            elem_ids[row:row + n] = np.frombuffer(b.ids, dtype=np.int64)
+            conn[row:row + n, :b.width] = np.frombuffer(b.conn, dtype=np.int64).reshape(n, b.width)
+            corners[row:row + n] = surface_corners(b.type, b.width)
+            row += n
+
+        return cls(node_ids, coords, elem_ids, conn, corners=corners)
+
+    @classmethod
+    def from_inp(cls, inp_file):
+        return cls.from_model(read_inp(inp_file, ('NODE', 'ELEMENT')))
+
+    def __len__(self):
+        return self.elem_ids.size
+
+    @property
+    def nbytes(self):
+        return (self.node_ids.nbytes + self.coords.nbytes
+                + self.elem_ids.nbytes + self.conn.nbytes + self.surface_corners.nbytes)
+
+    # --------------------------------------------------------
+    # ID LOOKUP
+    # --------------------------------------------------------
+    def node_rows(self, ids, missing=None):
+        return self.node_index.rows(ids, missing)
+
+    def elem_rows(self, ids, missing=None):
+        return self.elem_index.rows(ids, missing)
+
+    # --------------------------------------------------------
+    # GEOMETRY (all elements at once)
+    # --------------------------------------------------------
+    @property
+    def is_tri(self):
+        """Elements with at least 3 corner nodes (T3 / T6)."""
+        if self.conn.shape[1] < 3:
+            return np.zeros(len(self), dtype=bool)
+        return self.conn[:, 2] >= 0
+
+    @property
+    def corners(self):
+        """(M, 3) corner node IDs - the first 3 nodes of a T3 / T6."""
+        return self.conn[:, :3]
+
+    @property
+    def corner_rows(self):
+        if self._corner_rows is None:
+            rows = np.full((len(self), 3), -1, dtype=np.int64)
+            tri = self.is_tri
+            rows[tri] = self.node_rows(self.corners[tri])
+            self._corner_rows = rows
+        return self._corner_rows
+
+    def corner_xyz(self):
+        """(M, 3, 3) corner coordinates, NaN for non-triangles."""
+        xyz = self.coords[self.corner_rows]
+        xyz[~self.is_tri] = np.nan
+        return xyz
+
+    def edge_lengths(self):
+        """(M, 3) lengths of the corner edges (c0,c1), (c1,c2), (c2,c0)."""
+        xyz = self.corner_xyz()
+        d = xyz - np.roll(xyz, -1, axis=1)
+        return np.sqrt(np.einsum('mki,mki->mk', d, d))
+
+    def longest_edge_local(self):
+        """(M,) index 0..2 of the longest corner edge (first one on ties)."""
+        lengths = self.edge_lengths()
+        lengths[~self.is_tri] = 0.0
+        return np.argmax(lengths, axis=1)
+
+    def longest_edges(self):
+        """(M, 2) sorted node-ID pair of the longest corner edge."""
+        k = self.longest_edge_local()
+        c = self.corners
+        rows = np.arange(len(self))
+        a = c[rows, k]
+        b = c[rows, (k + 1) % 3]
+        return np.sort(np.stack([a, b], axis=1), axis=1)
+
+    def centroids(self, rows=None):
+        """(M, 3) mean of the corner nodes of surface elements (3 / 4
+        corners), NaN for other elements. `rows`: only these rows."""
+        rows = np.arange(len(self)) if rows is None else np.asarray(rows)
+        corners = self.surface_corners[rows]
+        out = np.full((rows.size, 3), np.nan)
+        for count in (3, 4):
+            part = np.flatnonzero(corners == count)
+            if part.size:
+                nodes = self.node_rows(self.conn[rows[part], :count])
+                out[part] = self.coords[nodes].mean(axis=1)
+        return out
+
+    def face_triangles(self, rows=None):
+        """(M, 2, 3) node rows of the corner triangles of surface elements:
+        c0-c1-c2 and c0-c2-c3 for quads (as areas()), c0-c1-c2 twice for
+        triangles. Other elements give -1. `rows`: only these rows."""
+        rows = np.arange(len(self)) if rows is None else np.asarray(rows)
+        corners = self.surface_corners[rows]
+        out = np.full((rows.size, 2, 3), -1, dtype=np.int64)
+        tri = np.flatnonzero(corners == 3)
+        if tri.size:
+            out[tri] = self.node_rows(self.conn[rows[tri], :3])[:, None, :]
+        quad = np.flatnonzero(corners == 4)
+        if quad.size:
+            nodes = self.node_rows(self.conn[rows[quad], :4])
+            out[quad, 0] = nodes[:, [0, 1, 2]]
+            out[quad, 1] = nodes[:, [0, 2, 3]]
+        return out
+
+    def areas(self):
+        """Flat area of surface elements from their corners (midside nodes
+        ignored). Quads are split into the triangles c0-c1-c2 and c0-c2-c3.
+        NaN for solids and other elements without a surface."""
+        xyz = self.corner_xyz()
+        n = np.cross(xyz[:, 1] - xyz[:, 0], xyz[:, 2] - xyz[:, 0])
+        area = 0.5 * np.sqrt(np.einsum('mi,mi->m', n, n))
+        area[self.surface_corners == 0] = np.nan
+
+        quad = np.flatnonzero(self.surface_corners == 4)
+        if quad.size:
+            c = self.conn[quad]
+            p0, p2, p3 = (self.coords[self.node_rows(c[:, k])] for k in (0, 2, 3))
+            n = np.cross(p2 - p0, p3 - p0)
+            area[quad] += 0.5 * np.sqrt(np.einsum('mi,mi->m', n, n))
+        return area
+
+    # --------------------------------------------------------
+    # RESULTS
+    # --------------------------------------------------------
+    def result_table(self, films):
+        """(M, 2) [temp, htc] per element row, NaN where not mapped.
+
+        Film rows for IDs that are not in the mesh are ignored; when an ID
+        appears twice the last row wins.
+        """
+        values = np.full((len(self), 2), np.nan)
+        if not len(films):
+            return values
+        # FilmTable (array columns) or FilmStore (memory-mapped NumPy columns)
+        ids = np.asarray(films.ids, dtype=np.int64)
+        rows = self.elem_rows(ids, missing=-1)
+        hit = rows >= 0
+        values[rows[hit], 0] = np.asarray(films.temp, dtype=np.float64)[hit]
+        values[rows[hit], 1] = np.asarray(films.htc, dtype=np.float64)[hit]
+        return values
@@ -0,0 +1,329 @@
+##############################################
+### TIMING / MEMORY RECORDS OF THE MAPPING TOOLS
+##############################################
+### traced(tool, **inputs) wraps one run of a tool; phase(name) blocks
+### inside it time one step (parse, propagate, join, write ...), also
+### from helper functions, through the active run of the thread. Phases
+### of the same name are summed (per-chunk loops give one entry).
+### Per phase: seconds, calls, rows and rows/s, bytes and MB/s, process
+### peak RSS at its end and, with tracemalloc on, its allocation peak.
+### Each run appends one JSON line to the log file:
+###   MAPPING_PERF_LOG     log file (default ~/mapping_perf.jsonl,
+###                        "off" = no records, no profiling)
+###   MAPPING_PROFILE=1    cProfile capture: <log>_<tool>_<time>.prof
+###                        next to the log, top functions in the record
+###   MAPPING_TRACEMALLOC=1  Python allocation peaks (slows down
+###                        allocation-heavy code, off by default)
+###   MAPPING_PERF_PRINT=0 no one-line summary on stdout
+### A run inside another run is recorded as one phase of the outer run.
+### Without an active run phase() does nothing but yield.
+##############################################
+### Update: 18/10/2026
+##############################################
+
+import cProfile
+import json
+import os
+import platform
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+LOG_ENV = "MAPPING_PERF_LOG"
+PROFILE_ENV = "MAPPING_PROFILE"
+TRACEMALLOC_ENV = "MAPPING_TRACEMALLOC"
+PRINT_ENV = "MAPPING_PERF_PRINT"
+DEFAULT_LOG = os.path.join(os.path.expanduser("~"), "mapping_perf.jsonl")
+PROFILE_TOP = 15                # functions kept in the record (cumulative time)
+
+MB = 1 << 20
+
+_state = threading.local()      # .run = active Run, .stack = open phase names
+
+
+def _env_flag(name, default=False):
+    value = os.environ.get(name, "").strip().lower()
+    if not value:
+        return default
+    return value in ("1", "true", "yes", "on")
+
+
+def log_file():
+    """Record file of this process, None when records are off."""
+    value = os.environ.get(LOG_ENV, "").strip()
+    if value.lower() in ("off", "0", "no", "none"):
+        return None
+    return value or DEFAULT_LOG
+
+
+# ============================================================
+# MEMORY
+# ============================================================
+def peak_rss_mb():
+    """Peak resident memory of this process in MB (None if unknown)."""
+    # Linux: VmHWM belongs to this address space, ru_maxrss is kept
+    # across exec (a spawned worker would report its parent's peak)
+    try:
+        with open("/proc/self/status", 'r') as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / MB if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        pass
+    if os.name == "nt":
+        try:
+            import ctypes
+            from ctypes import wintypes
+
+            class _Counters(ctypes.Structure):
+                _fields_ = [("cb", wintypes.DWORD),
+                            ("PageFaultCount", wintypes.DWORD),
+                            ("PeakWorkingSetSize", ctypes.c_size_t),
+                            ("WorkingSetSize", ctypes.c_size_t),
+                            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                            ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                            ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                            ("PagefileUsage", ctypes.c_size_t),
+                            ("PeakPagefileUsage", ctypes.c_size_t)]
+
+            counters = _Counters()
+            counters.cb = ctypes.sizeof(counters)
+            process = ctypes.windll.kernel32.GetCurrentProcess()
+            if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters),
+                                                        counters.cb):
+                return counters.PeakWorkingSetSize / MB
+        except (AttributeError, OSError):
+            pass
+    return None
+
+
+# ============================================================
+# PHASES / RUNS
+# ============================================================
+def _rate(amount, seconds, scale=1):
+    if amount is None or seconds <= 0:
+        return None
+    return round(amount / scale / seconds, 1)
+
+
+class Phase:
+    """One timed step. rows / nbytes may be set inside the block."""
+
+    def __init__(self, name, rows=None, nbytes=None):
+        self.name = name
+        self.rows = rows
+        self.nbytes = nbytes
+        self.seconds = 0.0
+        self.calls = 0
+        self.rss_mb = None
+        self.traced_peak_mb = None
+
+    def merge(self, other):
+        self.seconds += other.seconds
+        self.calls += other.calls
+        for attr in ("rows", "nbytes"):
+            value = getattr(other, attr)
+            if value is not None:
+                setattr(self, attr, (getattr(self, attr) or 0) + value)
+        self.rss_mb = other.rss_mb
+        if other.traced_peak_mb is not None:
+            self.traced_peak_mb = max(self.traced_peak_mb or 0.0, other.traced_peak_mb)
+
+    def record(self):
+        return {
+            "name": self.name,
+            "seconds": round(self.seconds, 6),
+            "calls": self.calls,
+            "rows": self.rows,
+            "rows_per_s": _rate(self.rows, self.seconds),
+            "bytes": self.nbytes,
+            "mb_per_s": _rate(self.nbytes, self.seconds, MB),
+            "peak_rss_mb": None if self.rss_mb is None else round(self.rss_mb, 1),
+            "traced_peak_mb": None if self.traced_peak_mb is None
+                              else round(self.traced_peak_mb, 1),
+        }
+
+
+class Run(Phase):
+    """A tool run: Phase totals plus its phases, in first-seen order."""
+
+    def __init__(self, tool, inputs):
+        super().__init__(tool)
+        self.inputs = inputs
+        self.phases = {}
+
+    def add(self, phase):
+        known = self.phases.get(phase.name)
+        if known is None:
+            self.phases[phase.name] = phase
+        else:
+            known.merge(phase)
+
+    def summary(self, status="ok"):
+        steps = ", ".join(f"{p.name} {p.seconds:.2f} s" for p in self.phases.values())
+        text = f"[perf] {self.name}: {self.seconds:.2f} s"
+        if status != "ok":
+            text += " FAILED"
+        if steps:
+            text += f" ({steps})"
+        if self.rows is not None:
+            text += f", {self.rows} rows"
+        if self.rss_mb is not None:
+            text += f", peak {self.rss_mb:.0f} MB"
+        return text
+
+
+def _describe(inputs):
+    """JSON-able inputs; existing files / folders get their size."""
+    out = {}
+    for key, value in inputs.items():
+        if isinstance(value, (str, os.PathLike)) and os.path.exists(value):
+            path = os.fspath(value)
+            if os.path.isdir(path):
+                size = sum(e.stat().st_size for e in os.scandir(path) if e.is_file())
+            else:
+                size = os.path.getsize(path)
+            out[key] = {"path": os.path.abspath(path), "bytes": size}
+        elif value is None or isinstance(value, (bool, int, float, str)):
+            out[key] = value
+        else:
+            out[key] = str(value)
+    return out
+
+
+@contextmanager
+def phase(name, rows=None, nbytes=None):
+    """Time one step of the active run (no-op without one)."""
+    p = Phase(name, rows, nbytes)
+    run = getattr(_state, "run", None)
+    if run is None:
+        yield p
+        return
+
+    stack = _state.stack
+    stack.append(name)
+    p.name = "/".join(stack)
+    tracing = tracemalloc.is_tracing()
+    if tracing and hasattr(tracemalloc, "reset_peak"):
+        tracemalloc.reset_peak()
+    t0 = time.perf_counter()
+    try:
+        yield p
+    finally:
+        p.seconds = time.perf_counter() - t0
+        p.calls = 1
+        p.rss_mb = peak_rss_mb()
+        if tracing:
+            p.traced_peak_mb = tracemalloc.get_traced_memory()[1] / MB
+        stack.pop()
+        run.add(p)
+
+
+def _profile_record(profiler, log_path, tool, stamp):
+    prof_file = f"{os.path.splitext(log_path)[0]}_{tool}_{stamp}_{os.getpid()}.prof"
+    profiler.dump_stats(prof_file)
+    stats = pstats.Stats(profiler).stats
+    top = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:PROFILE_TOP]
+    return {
+        "file": prof_file,
+        "top": [{"function": f"{os.path.basename(path)}:{line}({func})",
+                 "calls": calls, "tottime": round(tottime, 6), "cumtime": round(cumtime, 6)}
+                for (path, line, func), (_, calls, tottime, cumtime, _) in top],
+    }
+
+
+def _write(path, record):
+    try:
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + "\n")
+    except OSError as e:
+        print(f"[perf] could not write {path}: {e}", file=sys.stderr)
+
+
+@contextmanager
+def traced(tool, **inputs):
+    """One run of `tool`; yields the Run (set .rows / .nbytes on it)."""
+    if getattr(_state, "run", None) is not None:
+        # called from another tool: one phase of the outer run
+        with phase(tool) as p:
+            yield p
+        return
+
+    log_path = log_file()
+    run = Run(tool, inputs)
+    _state.run, _state.stack = run, []
+    profiler = cProfile.Profile() if log_path and _env_flag(PROFILE_ENV) else None
+    own_tracemalloc = _env_flag(TRACEMALLOC_ENV) and not tracemalloc.is_tracing()
+    if own_tracemalloc:
+        tracemalloc.start()
+    started = time.time()
+    status = "ok"
+    t0 = time.perf_counter()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield run
+    except BaseException as e:
+        status = f"error: {type(e).__name__}: {e}"
+        raise
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        run.seconds = time.perf_counter() - t0
+        run.calls = 1
+        run.rss_mb = peak_rss_mb()
+        if tracemalloc.is_tracing():
+            # phases reset the peak: the run peak is the largest of all
+            peaks = [p.traced_peak_mb or 0.0 for p in run.phases.values()]
+            run.traced_peak_mb = max([tracemalloc.get_traced_memory()[1] / MB] + peaks)
+        if own_tracemalloc:
+            tracemalloc.stop()
+        _state.run = _state.stack = None
+
+        if log_path:
+            stamp = time.strftime("%Y%m%d_%H%M%S", time.localtime(started))
+            record = {
+                "tool": tool,
+                "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(started)),
+                "status": status,
+                "host": platform.node(),
+                "python": platform.python_version(),
+                "pid": os.getpid(),
+                "inputs": _describe(inputs),
+            }
+            record.update(run.record())
+            del record["name"], record["calls"]
+            record["phases"] = [p.record() for p in run.phases.values()]
+            if profiler is not None:
+                record["profile"] = _profile_record(profiler, log_path, tool, stamp)
+            _write(log_path, record)
+        if _env_flag(PRINT_ENV, default=True):
+            print(run.summary(status))
+
+
+def read_records(path=None, tool=None):
+    """Records of a log file (default: the current one), optionally of one tool."""
+    path = path or log_file() or DEFAULT_LOG
+    records = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if tool is None or record.get("tool") == tool:
+                records.append(record)
+    return records
@@ -0,0 +1,347 @@
+##############################################
+### SPLIT ALL_RESULTS.csv BY SET ID
+##############################################
+### Replaces the Excel macros Split_By_SetID_Strict (example.txt,
+### example_01.txt): ALL_RESULTS.csv of the HyperView export (HypeTCL)
+### is read once, row by row, and every row goes to the output of its
+### SetID (and subcase with by_subcase). Outputs:
+###   csv   <stem>_SET_<id>.csv, header + rows
+###   bin   <stem>_SET_<id>.bin, float64 little-endian rows (NaN = empty)
+###         + <stem>_SET_<id>.bin.columns.txt (as the femfat export)
+###   xlsx  <stem>_BY_SET.xlsx, one SUMMARY_SET_<id> sheet per set
+###         (openpyxl, continued on _2, _3 ... past the Excel row limit)
+### Lines are not re-parsed: only the key columns are split off, CSV
+### outputs get the lines as they are and .bin blocks are converted by
+### NumPy. Lines are buffered per set and appended in blocks, so the
+### number of open files does not grow with the number of sets; all sets
+### together buffer at most MAX_BUFFERED_ROWS lines (largest buffers are
+### written first), so memory does not grow with the number of sets.
+### read_set_series() gives the rows of each set as NumPy arrays.
+##############################################
+### Update: 18/10/2026
+##############################################
+
+import math
+import os
+import re
+import sys
+import warnings
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+SUBCASE_COLUMN = 1              # Model, Subcase, StepTime, SetID, values...
+STEP_COLUMN = 2
+SET_COLUMN = 3
+
+BUFFER_ROWS = 8192              # lines kept per set before an append
+MAX_BUFFERED_ROWS = 1 << 18     # lines kept over all sets
+EXCEL_MAX_ROWS = 1048576        # rows per sheet, header included
+FORMATS = ("csv", "bin", "xlsx")
+
+# empty or blank field (after a start / ',' / newline, before ',' / newline)
+_EMPTY_FIELD = re.compile(r'(?<![^,\n])[ \t]*(?=[,\n])')
+
+
+# ============================================================
+# ROWS
+# ============================================================
+def _number(text):
+    try:
+        return float(text)
+    except ValueError:
+        return math.nan
+
+
+def iter_result_rows(csv_file, skip_step0=False):
+    """(header, rows) of ALL_RESULTS.csv; rows yields (key, line) with
+    key = (set_id, subcase) and the line text ending with '\\n'. Lines
+    without an integer SetID are skipped. skip_step0 drops the step 0
+    rows of subcases > 1 (example_01.txt). HypeTCL writes no quoted
+    fields, so fields are plain comma separated."""
+    f = open(csv_file, 'r', encoding='utf-8', errors='replace')
+    # HypeTCL continues the header line with '\\', which leaves blanks
+    header = [name.strip() for name in f.readline().rstrip('\n').split(',')]
+
+    def rows():
+        with f:
+            for line in f:
+                fields = line.split(',', SET_COLUMN + 1)
+                if len(fields) <= SET_COLUMN:
+                    continue
+                try:
+                    set_id = int(fields[SET_COLUMN])
+                    subcase = int(fields[SUBCASE_COLUMN])
+                except ValueError:
+                    continue
+                if skip_step0 and subcase > 1 and _number(fields[STEP_COLUMN]) == 0.0:
+                    continue
+                yield (set_id, subcase), line if line.endswith('\n') else line + '\n'
+
+    return header, rows()
+
+
+def _parse_block(text):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        try:
+            return np.fromstring(text.replace('\n', ','), dtype=np.float64, sep=',')
+        except ValueError:              # unparsable field (newer NumPy raises)
+            return np.empty(0)
+
+
+def parse_lines(lines, width):
+    """float64 values (array, len(lines) * width) of CSV lines; empty or
+    invalid fields are NaN, short rows padded, long rows cut."""
+    commas = width - 1
+    # the bulk parse only sees the value count: every row must have width fields
+    if np is not None and all(line.count(',') == commas for line in lines):
+        text = "".join(lines)
+        if ',,' in text or ',\n' in text:
+            text = _EMPTY_FIELD.sub('nan', text)
+        values = _parse_block(text)
+        if values.size == len(lines) * width and (values == -1.0).any():
+            # fromstring reads blank fields (' ', '\t') as -1.0
+            values = _parse_block(_EMPTY_FIELD.sub('nan', text))
+        if values.size == len(lines) * width:
+            return values
+    # ragged or non-numeric block: row by row
+    values = array('d')
+    for line in lines:
+        row = [_number(v) for v in line.rstrip('\n').split(',')[:width]]
+        values.extend(row + [math.nan] * (width - len(row)))
+    return values
+
+
+# ============================================================
+# WRITERS (one per output file / sheet group)
+# ============================================================
+class _CsvSink:
+
+    def __init__(self, path, header):
+        self.path = path
+        self.lines = []
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(",".join(header) + "\n")
+
+    @property
+    def buffered(self):
+        return len(self.lines)
+
+    def add(self, line):
+        self.lines.append(line)
+        if len(self.lines) >= BUFFER_ROWS:
+            self.flush()
+
+    def flush(self):
+        if self.lines:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.writelines(self.lines)
+            self.lines = []
+
+
+class _BinSink:
+
+    def __init__(self, path, header):
+        self.path = path
+        self.width = len(header)
+        self.lines = []
+        with open(path + ".columns.txt", 'w', encoding='utf-8') as f:
+            f.write("\n".join(header) + "\n")
+        open(path, 'wb').close()
+
+    @property
+    def buffered(self):
+        return len(self.lines)
+
+    def add(self, line):
+        self.lines.append(line)
+        if len(self.lines) >= BUFFER_ROWS:
+            self.flush()
+
+    def flush(self):
+        if self.lines:
+            values = parse_lines(self.lines, self.width)
+            if isinstance(values, array):
+                if sys.byteorder == 'big':
+                    values.byteswap()
+                with open(self.path, 'ab') as f:
+                    values.tofile(f)
+            else:
+                with open(self.path, 'ab') as f:
+                    values.astype('<f8').tofile(f)
+            self.lines = []
+
+
+class _SheetSink:
+    """Rows of one set in a write-only workbook, new sheet when full."""
+
+    def __init__(self, book, name, header):
+        self.book = book
+        self.name = name
+        self.header = header
+        self.sheets = 0
+        self._new_sheet()
+
+    buffered = 0                # rows go to the workbook at once
+
+    def _new_sheet(self):
+        self.sheets += 1
+        title = self.name if self.sheets == 1 else f"{self.name}_{self.sheets}"
+        self.sheet = self.book.create_sheet(title[:31])
+        self.sheet.append(self.header)
+        self.used = 1
+
+    def add(self, line):
+        if self.used >= EXCEL_MAX_ROWS:
+            self._new_sheet()
+        self.sheet.append([_cell(v.strip()) for v in line.rstrip('\n').split(',')])
+        self.used += 1
+
+    def flush(self):
+        pass
+
+
+def _cell(text):
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    try:
+        return float(text)
+    except ValueError:
+        return text
+
+
+# ============================================================
+# SPLIT
+# ============================================================
+def _flush_largest(sinks, buffered, limit=MAX_BUFFERED_ROWS):
+    """Flush the largest buffers until at most limit / 2 lines are left.
+    Returns the lines still buffered."""
+    for sink in sorted(sinks, key=lambda s: s.buffered, reverse=True):
+        if buffered <= limit // 2:
+            break
+        buffered -= sink.buffered
+        sink.flush()
+    return buffered
+
+
+def _out_name(stem, key, by_subcase):
+    set_id, subcase = key
+    return f"{stem}_SET_{set_id}_SUB_{subcase}" if by_subcase else f"{stem}_SET_{set_id}"
+
+
+def split_by_setid(csv_file, out_dir=None, fmt="csv", by_subcase=False,
+                   skip_step0=False, set_ids=None):
+    """Partition ALL_RESULTS.csv by SetID (and subcase) in one pass.
+
+    set_ids limits the output to these sets (default: every set found).
+    Returns (outputs, {name: rows}) with the written files / sheets.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt}, expected one of {FORMATS}")
+    stem = os.path.splitext(os.path.basename(csv_file))[0]
+    out_dir = out_dir or os.path.dirname(os.path.abspath(csv_file))
+    os.makedirs(out_dir, exist_ok=True)
+    wanted = None if set_ids is None else {int(s) for s in set_ids}
+
+    header, rows = iter_result_rows(csv_file, skip_step0)
+    book = None
+    if fmt == "xlsx":
+        try:
+            from openpyxl import Workbook
+        except ImportError:
+            raise ImportError("xlsx output needs openpyxl (pip install openpyxl)")
+        book = Workbook(write_only=True)
+
+    sinks, counts = {}, {}
+    buffered = 0
+    for key, line in rows:
+        if wanted is not None and key[0] not in wanted:
+            continue
+        sink_key = key if by_subcase else (key[0], None)
+        sink = sinks.get(sink_key)
+        if sink is None:
+            name = _out_name(stem, key, by_subcase)
+            if fmt == "csv":
+                sink = _CsvSink(os.path.join(out_dir, name + ".csv"), header)
+            elif fmt == "bin":
+                sink = _BinSink(os.path.join(out_dir, name + ".bin"), header)
+            else:
+                # same sheet names as the Excel macro
+                sink = _SheetSink(book, "SUMMARY" + name[len(stem):], header)
+            sinks[sink_key] = sink
+            counts[sink_key] = 0
+        before = sink.buffered
+        sink.add(line)
+        counts[sink_key] += 1
+        buffered += sink.buffered - before
+        if buffered >= MAX_BUFFERED_ROWS:
+            buffered = _flush_largest(sinks.values(), buffered)
+
+    for sink in sinks.values():
+        sink.flush()
+    if book is not None:
+        xlsx_file = os.path.join(out_dir, stem + "_BY_SET.xlsx")
+        book.save(xlsx_file)
+        outputs = [xlsx_file]
+    else:
+        outputs = [sink.path for sink in sinks.values()]
+
+    names = {(sink.path if book is None else sink.name): counts[k] for k, sink in sinks.items()}
+    return outputs, names
+
+
+# ============================================================
+# TIME SERIES
+# ============================================================
+def read_set_series(csv_file, set_ids=None, skip_step0=False):
+    """{set_id: (columns, values)} from ALL_RESULTS.csv in one pass,
+    values a (steps, columns) float64 array in file order (NaN = empty)."""
+    if np is None:
+        raise ImportError("read_set_series needs NumPy")
+    wanted = None if set_ids is None else {int(s) for s in set_ids}
+    header, rows = iter_result_rows(csv_file, skip_step0)
+    width = len(header)
+    lines, blocks = {}, {}
+
+    def flush(set_id):
+        blocks.setdefault(set_id, []).append(
+            np.asarray(parse_lines(lines[set_id], width), dtype=np.float64))
+        lines[set_id] = []
+
+    buffered = 0
+    for (set_id, _), line in rows:
+        if wanted is not None and set_id not in wanted:
+            continue
+        buf = lines.setdefault(set_id, [])
+        buf.append(line)
+        buffered += 1
+        if len(buf) >= BUFFER_ROWS:
+            buffered -= len(buf)
+            flush(set_id)
+        elif buffered >= MAX_BUFFERED_ROWS:
+            # largest sets first, as split_by_setid()
+            for key in sorted(lines, key=lambda k: len(lines[k]), reverse=True):
+                if buffered <= MAX_BUFFERED_ROWS // 2:
+                    break
+                buffered -= len(lines[key])
+                flush(key)
+    for set_id in lines:
+        if lines[set_id]:
+            flush(set_id)
+    return {set_id: (header, np.concatenate(parts).reshape(-1, width))
+            for set_id, parts in blocks.items()}
+
+
+def load_set_bin(bin_file):
+    """(columns, values) of a .bin output of split_by_setid()."""
+    with open(bin_file + ".columns.txt", 'r', encoding='utf-8') as f:
+        columns = [line.rstrip("\n") for line in f if line.strip()]
+    values = np.fromfile(bin_file, dtype='<f8').reshape(-1, len(columns))
+    return columns, values